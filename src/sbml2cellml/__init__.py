@@ -0,0 +1,3 @@
+"""sbml2cellml - SBML to CellML converter."""
+
+__version__ = "0.1.0"
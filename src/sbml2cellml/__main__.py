@@ -0,0 +1,5 @@
+"""Run the command line interface via `python -m sbml2cellml`."""
+
+from sbml2cellml.cli import main
+
+raise SystemExit(main())
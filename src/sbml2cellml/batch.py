@@ -0,0 +1,184 @@
+"""Batch conversion of SBML models with a process pool.
+
+Every model is converted and written in its own worker process; results are
+collected as soon as they are available so that a slow model does not block
+the others.
+"""
+
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from rich.table import Table
+
+from sbml2cellml.console import console
+
+
+@dataclass
+class ConversionResult:
+    """Result of the conversion of a single SBML model."""
+
+    sbml_path: Path
+    cellml_path: Path
+    time: float
+    error: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def convert_file(
+    sbml_path: Path,
+    cellml_path: Path,
+    use_cache: bool = True,
+    cache_dir: Optional[Path] = None,
+    options: Optional[dict[str, Any]] = None,
+) -> ConversionResult:
+    """Convert single SBML file and write CellML file.
+
+    `options` are passed as keyword arguments to `convert_sbml2cellml`.
+    If `use_cache` the CellML is taken from the conversion cache for unchanged
+    SBML files. Exceptions are not raised but stored in the result.
+    """
+    from sbml2cellml.cache import ConversionCache, conversion_key
+    from sbml2cellml.cellml2sbml import (
+        convert_sbml2cellml,
+        write_model_to_file,
+        write_model_to_string,
+    )
+
+    options = options or {}
+    t0 = time.perf_counter()
+    error = None
+    cached = False
+    try:
+        if use_cache:
+            cache = ConversionCache(cache_dir=cache_dir)
+            key = conversion_key(
+                Path(sbml_path).read_bytes(), options, name=Path(sbml_path).stem
+            )
+            cellml_str = cache.get(key)
+            cached = cellml_str is not None
+            if not cached:
+                model = convert_sbml2cellml(sbml_path=sbml_path, verbose=False, **options)
+                cellml_str = write_model_to_string(model)
+                cache.put(key, cellml_str)
+            with open(cellml_path, "w", encoding="utf-8") as f_cellml:
+                f_cellml.write(cellml_str)
+        else:
+            model = convert_sbml2cellml(sbml_path=sbml_path, verbose=False, **options)
+            write_model_to_file(model=model, cellml_path=cellml_path)
+    except Exception:
+        error = traceback.format_exc(limit=3)
+
+    return ConversionResult(
+        sbml_path=sbml_path,
+        cellml_path=cellml_path,
+        time=time.perf_counter() - t0,
+        error=error,
+        cached=cached,
+    )
+
+
+def convert_files(
+    sbml_paths: Iterable[Path],
+    cellml_dir: Optional[Path] = None,
+    processes: Optional[int] = None,
+    use_cache: bool = True,
+    cache_dir: Optional[Path] = None,
+    options: Optional[dict[str, Any]] = None,
+) -> list[ConversionResult]:
+    """Convert SBML files to CellML files in parallel.
+
+    CellML files are written to `cellml_dir` (next to the SBML files if not set)
+    with the stem of the SBML file. Results are returned in the order of
+    `sbml_paths`. Unchanged models are taken from the conversion cache unless
+    `use_cache` is False.
+    """
+    sbml_paths = [Path(p) for p in sbml_paths]
+    if cellml_dir is not None:
+        cellml_dir = Path(cellml_dir)
+        cellml_dir.mkdir(parents=True, exist_ok=True)
+
+    tasks: list[tuple[Path, Path]] = []
+    for sbml_path in sbml_paths:
+        out_dir = cellml_dir if cellml_dir is not None else sbml_path.parent
+        tasks.append((sbml_path, out_dir / f"{sbml_path.stem}.cellml"))
+
+    if not tasks:
+        return []
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    results: dict[int, ConversionResult] = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(
+                convert_file, sbml_path, cellml_path, use_cache, cache_dir, options
+            ): k
+            for k, (sbml_path, cellml_path) in enumerate(tasks)
+        }
+        for future in as_completed(futures):
+            k = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                # worker crashed, e.g. killed process
+                sbml_path, cellml_path = tasks[k]
+                result = ConversionResult(
+                    sbml_path=sbml_path,
+                    cellml_path=cellml_path,
+                    time=float("nan"),
+                    error=traceback.format_exc(limit=3),
+                )
+            results[k] = result
+            console.print(f"{_status(result)} {result.sbml_path.name} ({result.time:.3f} s)")
+
+    return [results[k] for k in range(len(tasks))]
+
+
+def convert_directory(
+    sbml_dir: Path,
+    cellml_dir: Optional[Path] = None,
+    pattern: str = "*.xml",
+    processes: Optional[int] = None,
+    use_cache: bool = True,
+    cache_dir: Optional[Path] = None,
+    options: Optional[dict[str, Any]] = None,
+) -> list[ConversionResult]:
+    """Convert all SBML files matching pattern in directory to CellML."""
+    sbml_paths = sorted(Path(sbml_dir).glob(pattern))
+    return convert_files(
+        sbml_paths,
+        cellml_dir=cellml_dir,
+        processes=processes,
+        use_cache=use_cache,
+        cache_dir=cache_dir,
+        options=options,
+    )
+
+
+def _status(result: ConversionResult) -> str:
+    """Rich markup for the status of a result."""
+    if not result.success:
+        return "[error]FAILED[/error]"
+    return "[success]CACHED[/success]" if result.cached else "[success]OK[/success]"
+
+
+def report_results(results: list[ConversionResult]) -> Table:
+    """Create table with wall time and status per model."""
+    table = Table(title="SBML to CellML conversion")
+    for column in ["model", "time [s]", "status"]:
+        table.add_column(column)
+    for result in results:
+        table.add_row(
+            result.sbml_path.name,
+            f"{result.time:.3f}",
+            _status(result),
+        )
+    return table
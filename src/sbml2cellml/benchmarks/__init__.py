@@ -0,0 +1,5 @@
+"""Benchmarks for the sbml2cellml conversion and simulation."""
+
+from pathlib import Path
+
+MODELS_DIR: Path = Path(__file__).parents[3] / "models"
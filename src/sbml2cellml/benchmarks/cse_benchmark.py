@@ -0,0 +1,78 @@
+"""Benchmark of reaction rate variables and common-subexpression elimination.
+
+Reports the kinetic law evaluations per RHS evaluation with the kinetic laws
+inlined in every species derivative (one per species term) and with reaction rate
+variables (one per reaction). All SBML models in `models/` are converted without
+and with common-subexpression elimination and the compiled RHS is timed for the
+models which can be analysed by libcellml.
+
+    python -m sbml2cellml.benchmarks.cse_benchmark
+"""
+
+import time
+
+from rich.table import Table
+
+from sbml2cellml.benchmarks import MODELS_DIR
+from sbml2cellml.cellml2sbml import convert_sbml2cellml, write_model_to_string
+from sbml2cellml.console import console
+from sbml2cellml.simulator.native_simulator import (
+    CellMLCodeGenerationError,
+    NativeModel,
+    parse_cellml,
+)
+
+
+def _rhs_time(model: NativeModel, repeats: int) -> float:
+    """Mean time of a RHS evaluation."""
+    y = model.states.copy()
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        model.rhs(0.0, y)
+    return (time.perf_counter() - t0) / repeats
+
+
+def benchmark_cse(repeats: int = 20000) -> Table:
+    """Kinetic law evaluations and RHS timings without and with CSE."""
+    table = Table(title=f"Common-subexpression elimination (mean of {repeats} RHS)")
+    for column in [
+        "model", "kinetic laws (inlined/variables)", "subexpressions",
+        "RHS [µs]", "RHS with CSE [µs]", "speedup",
+    ]:
+        table.add_column(column)
+
+    for sbml_path in sorted(MODELS_DIR.glob("*.xml")):
+        cse_model, stoichiometric_matrix = convert_sbml2cellml(
+            sbml_path, verbose=False, return_stoichiometry=True, cse=True
+        )
+        model = convert_sbml2cellml(sbml_path, verbose=False, cse=False)
+        n_subexpressions = (
+            cse_model.component(0).variableCount() - model.component(0).variableCount()
+        )
+
+        timings = []
+        for m in [model, cse_model]:
+            try:
+                native = NativeModel(
+                    parse_cellml(write_model_to_string(m)), use_cache=False
+                )
+            except CellMLCodeGenerationError:
+                break
+            native.states[:] = 1.0
+            timings.append(_rhs_time(native, repeats))
+
+        table.add_row(
+            sbml_path.stem,
+            f"{stoichiometric_matrix.matrix.nnz}/{len(stoichiometric_matrix.reactions)}",
+            str(n_subexpressions),
+            *(
+                [f"{timings[0] * 1e6:.2f}", f"{timings[1] * 1e6:.2f}",
+                 f"{timings[0] / timings[1]:.2f}x"]
+                if len(timings) == 2 else ["-", "-", "-"]
+            ),
+        )
+    return table
+
+
+if __name__ == "__main__":
+    console.print(benchmark_cse())
@@ -0,0 +1,63 @@
+"""Benchmark of the import (startup) time of the sbml2cellml modules.
+
+Every module is imported in a fresh interpreter with `python -X importtime`; the
+cumulative import time of the module and the heavy dependencies it loads are
+reported. The conversion must not load the simulation and plotting stack
+(scipy, pandas, matplotlib, libopencor).
+
+    python -m sbml2cellml.benchmarks.import_benchmark
+"""
+
+import subprocess
+import sys
+
+from rich.table import Table
+
+from sbml2cellml.console import console
+
+MODULES: list[str] = [
+    "sbml2cellml.cli",
+    "sbml2cellml.cellml2sbml",
+    "sbml2cellml.hierarchy",
+    "sbml2cellml.watch",
+    "sbml2cellml.simulator.native_simulator",
+    "sbml2cellml.simulator.cellml_simulator",
+]
+
+HEAVY_MODULES: list[str] = [
+    "libsbml", "libcellml", "numpy", "scipy", "pandas", "matplotlib", "libopencor",
+]
+
+
+def import_time(module: str) -> tuple[float, list[str]]:
+    """Cumulative import time [s] of module and the loaded heavy modules."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative: dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative[module] / 1e6, [m for m in HEAVY_MODULES if m in cumulative]
+
+
+def benchmark_imports(repeats: int = 5) -> Table:
+    """Best import time of every module over the repeats."""
+    table = Table(title=f"Import times (best of {repeats}, python -X importtime)")
+    for column in ["module", "import [ms]", "heavy dependencies"]:
+        table.add_column(column)
+
+    for module in MODULES:
+        timings = []
+        for _ in range(repeats):
+            t, heavy = import_time(module)
+            timings.append(t)
+        table.add_row(module, f"{min(timings) * 1000:.1f}", ", ".join(heavy))
+    return table
+
+
+if __name__ == "__main__":
+    console.print(benchmark_imports())
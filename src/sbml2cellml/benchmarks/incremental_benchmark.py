@@ -0,0 +1,63 @@
+"""Benchmark of incremental re-conversion after edits of a kinetic law.
+
+A copy of glimepiride_body_flat is converted once; afterwards a number in a kinetic
+law is edited repeatedly and the model re-converted incrementally and completely.
+
+    python -m sbml2cellml.benchmarks.incremental_benchmark
+"""
+
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from rich.table import Table
+
+from sbml2cellml.benchmarks import MODELS_DIR
+from sbml2cellml.console import console
+from sbml2cellml.incremental import IncrementalConverter
+
+
+def benchmark_incremental(name: str = "glimepiride_body_flat", edits: int = 20) -> Table:
+    """Time edit-convert cycles with incremental and full conversion."""
+    with tempfile.TemporaryDirectory() as tmp:
+        sbml_path = Path(tmp) / f"{name}.xml"
+        shutil.copy(MODELS_DIR / f"{name}.xml", sbml_path)
+        converter = IncrementalConverter(sbml_path, Path(tmp) / f"{name}.cellml")
+        converter.convert()
+
+        sbml_str = sbml_path.read_text(encoding="utf-8")
+        reactions = sbml_str.index("<listOfReactions")
+        match = re.compile(r"<cn[^>]*>\s*([0-9.]+)\s*</cn>").search(sbml_str, reactions)
+        if match is None:
+            raise ValueError(f"No number in the kinetic laws of '{name}'.")
+
+        timings: dict[bool, list[float]] = {False: [], True: []}
+        for k in range(edits):
+            for full in [False, True]:
+                edited = (
+                    f"{sbml_str[:match.start(1)]}{float(match.group(1)) + k + 1}"
+                    f"{sbml_str[match.end(1):]}"
+                )
+                sbml_path.write_text(edited, encoding="utf-8")
+                t0 = time.perf_counter()
+                converter.convert(full=full)
+                timings[full].append(time.perf_counter() - t0)
+
+    table = Table(title=f"Re-conversion of {name} after editing a kinetic law")
+    for column in ["edits", "incremental [ms]", "full [ms]", "speedup"]:
+        table.add_column(column)
+    t_incremental = sum(timings[False]) / edits
+    t_full = sum(timings[True]) / edits
+    table.add_row(
+        str(edits),
+        f"{t_incremental * 1000:.1f}",
+        f"{t_full * 1000:.1f}",
+        f"{t_full / t_incremental:.1f}x",
+    )
+    return table
+
+
+if __name__ == "__main__":
+    console.print(benchmark_incremental())
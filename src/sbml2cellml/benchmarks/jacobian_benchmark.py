@@ -0,0 +1,123 @@
+"""Benchmark of the analytic sparse Jacobian.
+
+Reports the size and sparsity of the symbolic Jacobians of all SBML models in
+`models/` and compares stiff integrations of the compiled models (all states
+starting at 1.0) with finite difference and analytic Jacobians. The solvers
+evaluate finite difference Jacobians with additional right hand side calls which
+are not included in `nfev`, so the calls of the right hand side are counted.
+
+Units of `cn` elements which are not defined in the converted models (e.g.
+`l_per_kg` of the body models) are declared dimensionless here, so that all
+models can be analysed by libcellml.
+
+    python -m sbml2cellml.benchmarks.jacobian_benchmark
+"""
+
+import re
+import time
+
+import libcellml
+import numpy as np
+from rich.table import Table
+
+from sbml2cellml.benchmarks import MODELS_DIR
+from sbml2cellml.console import console
+from sbml2cellml.jacobian import read_symbolic_jacobian
+from sbml2cellml.simulator.native_simulator import (
+    CellMLCodeGenerationError,
+    NativeModel,
+    parse_cellml,
+)
+
+STANDARD_UNITS = {"dimensionless", "second", "litre", "mole", "gram", "metre", "kilogram"}
+
+
+def _declare_cn_units(source: str) -> libcellml.Model:
+    """Parse CellML source and declare undefined units of numbers dimensionless."""
+    model = parse_cellml(source)
+    for name in sorted(set(re.findall(r'cellml:units="(\w+)"', source))):
+        if name not in STANDARD_UNITS and model.units(name) is None:
+            units = libcellml.Units(name)
+            units.addUnit("dimensionless")
+            model.addUnits(units)
+    return model
+
+
+def benchmark_jacobian(
+    methods: tuple[str, ...] = ("BDF", "Radau", "LSODA"), repeats: int = 5
+) -> tuple[Table, Table]:
+    """Sparsity of the Jacobians and integration with/without analytic Jacobian."""
+    sparsity_table = Table(title="Symbolic Jacobians")
+    for column in ["model", "states", "nonzeros", "density", "generation [ms]"]:
+        sparsity_table.add_column(column)
+    integration_table = Table(title=f"Stiff integration (best of {repeats})")
+    for column in [
+        "model", "method", "finite differences [ms]", "analytic [ms]", "speedup",
+        "rhs calls (fd/analytic)", "Jacobians (fd/analytic)",
+    ]:
+        integration_table.add_column(column)
+
+    for sbml_path in sorted(MODELS_DIR.glob("*.xml")):
+        t0 = time.perf_counter()
+        jacobian = read_symbolic_jacobian(sbml_path)
+        t_generation = time.perf_counter() - t0
+        n = len(jacobian.states)
+        sparsity_table.add_row(
+            sbml_path.stem,
+            str(n),
+            str(jacobian.nnz),
+            f"{jacobian.nnz / max(n * n, 1):.3f}",
+            f"{t_generation * 1000:.1f}",
+        )
+
+        cellml_path = sbml_path.with_suffix(".cellml")
+        try:
+            source = cellml_path.read_text(encoding="utf-8")
+            model = NativeModel(_declare_cn_units(source), source=source)
+        except (CellMLCodeGenerationError, FileNotFoundError):
+            continue
+
+        rhs = model.rhs
+        rhs_calls = 0
+
+        def count_rhs(t: float, y: np.ndarray) -> np.ndarray:
+            nonlocal rhs_calls
+            rhs_calls += 1
+            return rhs(t, y)
+
+        model.rhs = count_rhs
+        # nontrivial initial states
+        y0 = np.ones(len(model.state_names))
+        for method in methods:
+            timings = []
+            calls = []
+            njevs = []
+            for analytic in [False, True]:
+                model.set_jacobian(jacobian if analytic else None)
+                t_best = float("inf")
+                for _ in range(repeats):
+                    rhs_calls = 0
+                    t0 = time.perf_counter()
+                    solution = model.simulate(
+                        start=0, end=1000, steps=100, method=method, y0=y0
+                    )
+                    t_best = min(t_best, time.perf_counter() - t0)
+                timings.append(t_best)
+                calls.append(rhs_calls)
+                njevs.append(solution.njev)
+            integration_table.add_row(
+                sbml_path.stem,
+                method,
+                f"{timings[0] * 1000:.2f}",
+                f"{timings[1] * 1000:.2f}",
+                f"{timings[0] / timings[1]:.1f}x",
+                f"{calls[0]}/{calls[1]}",
+                f"{njevs[0]}/{njevs[1]}",
+            )
+
+    return sparsity_table, integration_table
+
+
+if __name__ == "__main__":
+    for table in benchmark_jacobian():
+        console.print(table)
@@ -0,0 +1,66 @@
+"""Benchmark of the MathML generation for rules and kinetic laws.
+
+Compares the legacy string round-trip (`formulaToL3String` -> `parseL3Formula` ->
+`writeMathMLToString` -> prefix stripping) with the direct AST walker
+`ast_to_cellml_mathml` on all SBML models in `models/`.
+
+    python -m sbml2cellml.benchmarks.mathml_benchmark
+"""
+
+import time
+from pathlib import Path
+
+import libsbml
+from rich.table import Table
+
+from sbml2cellml.benchmarks import MODELS_DIR
+from sbml2cellml.cellml2sbml import ast_to_cellml_mathml, process_mathml_for_cellml
+from sbml2cellml.console import console
+
+
+def collect_math(sbml_path: Path) -> list[libsbml.ASTNode]:
+    """Collect the math of all rules and kinetic laws."""
+    doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(sbml_path))
+    m_sbml: libsbml.Model = doc.getModel()
+    asts: list[libsbml.ASTNode] = []
+    for rule in m_sbml.getListOfRules():
+        asts.append(rule.getMath().deepCopy())
+    for r in m_sbml.getListOfReactions():
+        if r.isSetKineticLaw():
+            asts.append(r.getKineticLaw().getMath().deepCopy())
+    return asts
+
+
+def benchmark_mathml(repeats: int = 20) -> Table:
+    """Time legacy and direct MathML generation for all models."""
+    table = Table(title=f"MathML generation (best of {repeats})")
+    for column in ["model", "expressions", "round-trip [ms]", "ast [ms]", "speedup"]:
+        table.add_column(column)
+
+    for sbml_path in sorted(MODELS_DIR.glob("*.xml")):
+        asts = collect_math(sbml_path)
+        t_legacy = float("inf")
+        t_ast = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            for ast in asts:
+                process_mathml_for_cellml(libsbml.formulaToL3String(ast))
+            t_legacy = min(t_legacy, time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            for ast in asts:
+                ast_to_cellml_mathml(ast)
+            t_ast = min(t_ast, time.perf_counter() - t0)
+
+        table.add_row(
+            sbml_path.stem,
+            str(len(asts)),
+            f"{t_legacy * 1000:.2f}",
+            f"{t_ast * 1000:.2f}",
+            f"{t_legacy / t_ast:.1f}x",
+        )
+    return table
+
+
+if __name__ == "__main__":
+    console.print(benchmark_mathml())
@@ -0,0 +1,105 @@
+"""Benchmark of forward sensitivities against finite differences.
+
+Computes the sensitivities of all states of glimepiride_liver with respect to all
+constants via the forward sensitivity equations and via central finite differences
+(two simulations per parameter) at the same tolerances. Runtimes and errors
+relative to a tight tolerance finite difference reference are reported.
+
+    python -m sbml2cellml.benchmarks.sensitivity_benchmark
+"""
+
+import time
+
+import numpy as np
+from rich.table import Table
+
+from sbml2cellml.benchmarks import MODELS_DIR
+from sbml2cellml.console import console
+from sbml2cellml.jacobian import read_symbolic_jacobian
+from sbml2cellml.simulator.native_simulator import NativeModel
+from sbml2cellml.simulator.sensitivity import simulate_sensitivities
+
+
+def finite_difference_sensitivities(
+    model: NativeModel,
+    start: float,
+    end: float,
+    steps: int,
+    rel_step: float = 1e-4,
+    **kwargs,
+) -> np.ndarray:
+    """Sensitivities (n_time, n_states, n_constants) by central differences."""
+    y0 = model.states.copy()
+    constants = model.constants.copy()
+    sensitivities = np.empty((steps + 1, len(y0), len(constants)))
+    try:
+        for k in range(len(constants)):
+            h = rel_step * max(abs(constants[k]), 1e-3)
+            y = []
+            for sign in [1.0, -1.0]:
+                model.constants[:] = constants
+                model.constants[k] += sign * h
+                model.compute_computed_constants()
+                solution = model.simulate(start, end, steps, y0=y0, **kwargs)
+                y.append(solution.y.T)
+            sensitivities[:, :, k] = (y[0] - y[1]) / (2 * h)
+    finally:
+        model.constants[:] = constants
+        model.compute_computed_constants()
+    return sensitivities
+
+
+def benchmark_sensitivity(
+    name: str = "glimepiride_liver", end: float = 100, steps: int = 100,
+    repeats: int = 3,
+) -> Table:
+    """Time forward and finite difference sensitivities."""
+    jacobian = read_symbolic_jacobian(MODELS_DIR / f"{name}.xml")
+    model = NativeModel.from_file(MODELS_DIR / f"{name}.cellml")
+    model.states[:] = 1.0
+    parameters = model.constant_names
+    settings = dict(rtol=1e-8, atol=1e-10)
+
+    t_forward = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = simulate_sensitivities(
+            model, jacobian, parameters, start=0, end=end, steps=steps,
+            method="LSODA", **settings,
+        )
+        t_forward = min(t_forward, time.perf_counter() - t0)
+
+    t_fd = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fd = finite_difference_sensitivities(
+            model, start=0, end=end, steps=steps, method="LSODA", **settings
+        )
+        t_fd = min(t_fd, time.perf_counter() - t0)
+
+    reference = finite_difference_sensitivities(
+        model, start=0, end=end, steps=steps, method="Radau", rtol=1e-11, atol=1e-13
+    )
+    scale = np.abs(reference).max()
+    error_forward = np.abs(result.sensitivities - reference).max() / scale
+    error_fd = np.abs(fd - reference).max() / scale
+    table = Table(title=f"Sensitivities {name} (best of {repeats})")
+    for column in [
+        "states", "parameters", "forward [ms]", "finite differences [ms]", "speedup",
+        "error forward", "error finite differences",
+    ]:
+        table.add_column(column)
+    table.add_row(
+        str(len(model.state_names)),
+        str(len(parameters)),
+        f"{t_forward * 1000:.1f}",
+        f"{t_fd * 1000:.1f}",
+        f"{t_fd / t_forward:.1f}x",
+        f"{error_forward:.1e}",
+        f"{error_fd:.1e}",
+    )
+    return table
+
+
+if __name__ == "__main__":
+    console.print(benchmark_sensitivity())
@@ -0,0 +1,53 @@
+"""Benchmark of the per-run latency of libopencor simulations.
+
+Compares `run_cellml_timecourse`, which loads, instantiates and runs the model for
+every simulation, with repeated runs of a `CellMLSimulator` session.
+
+    python -m sbml2cellml.benchmarks.simulator_benchmark
+"""
+
+import time
+
+from rich.table import Table
+
+from sbml2cellml.benchmarks import MODELS_DIR
+from sbml2cellml.console import console
+from sbml2cellml.simulator.cellml_simulator import (
+    CellMLSimulator,
+    run_cellml_timecourse,
+)
+
+MODELS: list[str] = ["test_model", "glimepiride_liver"]
+
+
+def benchmark_simulator(runs: int = 50, end: float = 100, steps: int = 100) -> Table:
+    """Time repeated timecourse simulations per model."""
+    table = Table(title=f"libopencor simulation latency (mean of {runs} runs)")
+    for column in ["model", "run_cellml_timecourse [ms]", "session [ms]", "speedup"]:
+        table.add_column(column)
+
+    for name in MODELS:
+        cellml_path = MODELS_DIR / f"{name}.cellml"
+
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            run_cellml_timecourse(cellml_path, start=0, end=end, steps=steps)
+        t_function = (time.perf_counter() - t0) / runs
+
+        simulator = CellMLSimulator(cellml_path)
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            simulator.simulate(start=0, end=end, steps=steps)
+        t_session = (time.perf_counter() - t0) / runs
+
+        table.add_row(
+            name,
+            f"{t_function * 1000:.2f}",
+            f"{t_session * 1000:.2f}",
+            f"{t_function / t_session:.1f}x",
+        )
+    return table
+
+
+if __name__ == "__main__":
+    console.print(benchmark_simulator())
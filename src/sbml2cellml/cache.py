@@ -0,0 +1,191 @@
+"""Content-addressed on-disk cache for SBML to CellML conversions.
+
+Entries are keyed by the SHA-256 of the SBML bytes, the file name, the converter
+version (including a hash of the converter sources) and the conversion options,
+so unchanged models return the cached CellML string without reading the SBML
+with libsbml. The cache is bounded in size; least recently used entries are
+evicted first (entry access updates the modification time). The size is tracked
+on writes and the directory is only scanned if the limit is exceeded; eviction
+then frees space down to `low_water` of the limit, so that the following writes
+do not scan again. Entries are written atomically so the cache can be shared by
+worker processes (their writes are accounted for at the next eviction).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from sbml2cellml import __version__
+
+DEFAULT_CACHE_DIR: Path = Path(
+    os.environ.get(
+        "SBML2CELLML_CACHE_DIR",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "sbml2cellml",
+    )
+)
+DEFAULT_MAX_SIZE: int = 512 * 1024**2  # 512 MB
+
+
+@lru_cache(maxsize=None)
+def source_hash() -> str:
+    """Hash of the converter sources (all modules of the sbml2cellml package).
+
+    Changes of the conversion code change the output for the same SBML, so the
+    sources are part of the version instead of relying on version bumps.
+    """
+    package_dir = Path(__file__).parent
+    h = hashlib.sha256()
+    for path in sorted(package_dir.rglob("*.py")):
+        h.update(path.relative_to(package_dir).as_posix().encode("utf-8"))
+        h.update(b"\0")
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def converter_version() -> str:
+    """Version string of the converter and the libraries affecting the output."""
+    import libcellml
+    import libsbml
+
+    return (
+        f"sbml2cellml-{__version__}+{source_hash()};libcellml-{libcellml.versionString()};"
+        f"libsbml-{libsbml.getLibSBMLDottedVersion()}"
+    )
+
+
+def conversion_key(
+    sbml_bytes: bytes, options: Optional[dict[str, Any]] = None, name: str = ""
+) -> str:
+    """Cache key for the conversion of the SBML bytes with given options.
+
+    `name` is the stem of the SBML file, which is the model id of models without id.
+    """
+    h = hashlib.sha256()
+    h.update(sbml_bytes)
+    h.update(b"\0")
+    h.update(name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(converter_version().encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ConversionCache:
+    """Size-bounded LRU cache of CellML strings on disk."""
+
+    suffix = ".cellml"
+    # fraction of max_size which remains after eviction
+    low_water = 0.9
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # total size of the entries, scanned on the first write
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Get CellML string for key, None if not cached."""
+        path = self._path(key)
+        try:
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            # mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """Store CellML string for key and evict old entries if the cache is full."""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._written(path)
+
+    def _written(self, path: Path) -> None:
+        """Add the size of the written entry and evict if the size limit is exceeded."""
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += path.stat().st_size
+        if self._size > self.max_size:
+            self.evict(keep=path)
+
+    def evict(self, keep: Optional[Path] = None) -> list[Path]:
+        """Remove least recently used entries until the size is below `low_water`.
+
+        The entry `keep` (e.g. the entry just written) is never removed.
+        """
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            if path != keep:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed: list[Path] = []
+        for _, size, path in sorted(entries):
+            if total <= self.low_water * self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed.append(path)
+        self._size = total
+        return removed
+
+    def size(self) -> int:
+        """Total size of cached entries in bytes."""
+        return sum(p.stat().st_size for p in self.cache_dir.glob(f"*{self.suffix}"))
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for path in self.cache_dir.glob(f"*{self.suffix}"):
+            path.unlink(missing_ok=True)
+        self._size = 0
+
+
+def convert_sbml2cellml_cached(
+    sbml_path: Path,
+    cache: Optional[ConversionCache] = None,
+    options: Optional[dict[str, Any]] = None,
+) -> str:
+    """Convert SBML file to CellML string using the conversion cache.
+
+    `options` are passed as keyword arguments to `convert_sbml2cellml` and are part
+    of the cache key.
+    """
+    from sbml2cellml.cellml2sbml import convert_sbml2cellml, write_model_to_string
+
+    if cache is None:
+        cache = ConversionCache()
+    options = options or {}
+    sbml_path = Path(sbml_path)
+    key = conversion_key(sbml_path.read_bytes(), options, name=sbml_path.stem)
+
+    cellml_str = cache.get(key)
+    if cellml_str is None:
+        model = convert_sbml2cellml(sbml_path=sbml_path, verbose=False, **options)
+        cellml_str = write_model_to_string(model)
+        cache.put(key, cellml_str)
+    return cellml_str
@@ -15,12 +15,12 @@ pip install git+https://github.com/opencor/libopencor.git
 
 FIXME: issues in libopencor
 - [ ] "The linear solver's setup function failed in an unrecoverable manner." for glimeperide kidney.
-- [ ] cannot set start, end, steps on simulation
+- [x] cannot set start, end, steps on simulation
 - [ ] precompiled python packages
 
 TODO:
 - [ ] Convert units
-- [ ] Calculate initial values based on AssignmentRules & InitialAssignments (using libroadrunner)
+- [x] Calculate initial values based on AssignmentRules & InitialAssignments
 - [ ] Package in separate package
 - [ ] Add tests for functionality
 - [ ] Use SBML test suite models as test cases with simulator
@@ -28,16 +28,25 @@ TODO:
 
 Features currently not supported in the sbml2cellml conversion:
 - [ ] UnitDefinitions
-- [ ] InitialAssignments -> would be precalculated, i.e. libroadrunner to calculate initial state.
+- [x] InitialAssignments -> precalculated initial values, see `evaluate_initial_values`
 - [ ] FunctionDefinitions -> can be supported via inlining the function or addition assignments
 - [ ] Events -> Converted to resets; only subset of syntax supported, currently on support in simulator
+- [x] comp submodels -> CellML components, see `convert_sbml2cellml_hierarchical`
 """
+from math import isnan
 from pathlib import Path
-import numpy as np
+from typing import Collection, Iterable, Optional, Sequence
 
 import libsbml
 import libcellml
-from sbmlutils.console import console
+
+from sbml2cellml.console import console
+
+from sbml2cellml.cse import eliminate_common_subexpressions
+from sbml2cellml.initial_values import evaluate_initial_values
+from sbml2cellml.pruning import prune_variables
+from sbml2cellml.stoichiometry import StoichiometricMatrix, create_stoichiometric_matrix
+from sbml2cellml.writer import open_cellml, write_model
 
 
 class SBML2CellMLConversionError(IOError):
@@ -45,10 +54,23 @@ class SBML2CellMLConversionError(IOError):
     pass
 
 
-def convert_sbml2cellml(sbml_path: Path, verbose: bool = True) -> libcellml.Model:
+def convert_sbml2cellml(
+    sbml_path: Path,
+    verbose: bool = True,
+    return_stoichiometry: bool = False,
+    prune: bool = False,
+    outputs: Optional[Sequence[str]] = None,
+    cse: bool = True,
+) -> libcellml.Model | tuple[libcellml.Model, StoichiometricMatrix]:
     """Converter to convert SBML model into CellML.
 
     The verbose flag allows to get additional information during the conversion.
+    If `return_stoichiometry` the sparse stoichiometric matrix (species x reactions)
+    is returned in addition to the CellML model.
+    If `prune` all variables and assignment rules which neither the states nor the
+    `outputs` (ids or glob patterns) depend on are removed, see `prune_variables`.
+    Reaction rates are separate variables; if `cse` repeated subexpressions of the
+    rules and kinetic laws are computed once in additional variables.
     """
     # read SBML model
     doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(sbml_path))
@@ -66,36 +88,105 @@ def convert_sbml2cellml(sbml_path: Path, verbose: bool = True) -> libcellml.Mode
 
     # add units
     # FIXME: support unit definitions
+    add_units(m_cellml)
+
+    # dead-equation elimination
+    required: Optional[set[str]] = None
+    if prune:
+        report = prune_variables(m_sbml, outputs=outputs)
+        required = report.kept
+        if verbose:
+            console.print(report.table())
+        else:
+            console.print(f"Pruning removed {report.n_removed} elements", style="info")
+
+    stoichiometric_matrix, _ = convert_model_component(
+        m_sbml, component, verbose=verbose, required=required, cse=cse
+    )
+
+    if return_stoichiometry:
+        return m_cellml, stoichiometric_matrix
+    return m_cellml
+
+
+def set_component_math(component: libcellml.Component, mathml_parts: Iterable[str]) -> None:
+    """Set the equations as math of the component.
+
+    The MathML is appended part by part to avoid a second copy of the math.
+    """
+    component.setMath('<math xmlns="http://www.w3.org/1998/Math/MathML" xmlns:cellml="http://www.cellml.org/cellml/2.0#">\n')
+    for k, mathml_str in enumerate(mathml_parts):
+        component.appendMath(f"\n{mathml_str}" if k else mathml_str)
+    component.appendMath("</math>")
+
+
+def add_units(m_cellml: libcellml.Model) -> None:
+    """Add the units used by the converted components."""
     per_second = libcellml.Units("per_second")
     per_second.addUnit("second", -1)
     m_cellml.addUnits(per_second)
 
+
+def convert_model_component(
+    m_sbml: libsbml.Model,
+    component: libcellml.Component,
+    time_name: str = "time",
+    verbose: bool = True,
+    required: Optional[set[str]] = None,
+    cse: bool = True,
+    defined_elsewhere: Collection[str] = (),
+    influxes: Optional[dict[str, list[str]]] = None,
+    equations: Optional[dict[str, str]] = None,
+) -> tuple[StoichiometricMatrix, dict[str, str]]:
+    """Convert variables and math of the SBML model into the CellML component.
+
+    Only the variables in `required` are converted (all if None).
+    Variables `defined_elsewhere` are defined by an equivalent variable of another
+    component: they get no initial value, rules or derivatives. Instead the sum of
+    their reaction terms (amount/time) is exported as flux variable. `influxes` are
+    names of flux variables (created in this component) which are added to the
+    derivatives of the species.
+    If `equations` is given the MathML of every equation is stored in it by the key
+    of the SBML element ('rule:{id}', 'reaction:{id}', 'species:{id}', 'cse:{id}').
+    Returns the stoichiometric matrix and the exported flux variables per species.
+    """
+    influxes = influxes or {}
+
     # add time variable
-    time_name = "time"
     variable_time = libcellml.Variable(time_name)
     variable_time.setUnits("dimensionless")  # FIXME: correct units
     component.addVariable(variable_time)
 
-
-    def process_init_value(sid: str, value: float) -> float:
-        """Handling processing of NaN values.
-
-        These could be precalculated based on the rules."""
-        if np.isnan(value):
+    def is_required(sid: str) -> bool:
+        return required is None or sid in required
+
+    # initial values including InitialAssignments and AssignmentRules
+    initial_values: dict[str, float] = evaluate_initial_values(m_sbml)
+    # variables of assignment rules are computed, i.e. have no initial value
+    assigned: set[str] = {
+        rule.getVariable() for rule in m_sbml.getListOfRules()
+        if rule.getTypeCode() == libsbml.SBML_ASSIGNMENT_RULE
+    }
+
+    def set_initial_value(v: libcellml.Variable, sid: str) -> None:
+        """Set evaluated initial value, undetermined values are set to 1.0."""
+        if sid in assigned or sid in defined_elsewhere:
+            return
+        value = initial_values[sid]
+        if isnan(value):
             console.print(f"Initial value is nan: {sid}, setting to 1.0", style="warning")
             value = 1.0
-        return value
+        v.setInitialValue(value)
 
     # add compartments
     c: libsbml.Compartment
-    cdict: dict[str, float] = {}
     for c in m_sbml.getListOfCompartments():
         cid: str = c.getId()
-        cvalue: float = process_init_value(cid, c.getSize())
-        cdict[cid] = cvalue
+        if not is_required(cid):
+            continue
         v = libcellml.Variable(cid)
         v.setUnits("dimensionless")  # FIXME
-        v.setInitialValue(cvalue)
+        set_initial_value(v, cid)
         component.addVariable(v)
         if verbose:
             console.print(f"'{cid}' variable for 'compartment'")
@@ -104,10 +195,11 @@ def convert_sbml2cellml(sbml_path: Path, verbose: bool = True) -> libcellml.Mode
     p: libsbml.Parameter
     for p in m_sbml.getListOfParameters():
         pid: str = p.getId()
-        pvalue: float = process_init_value(pid, p.getValue())
+        if not is_required(pid):
+            continue
         v = libcellml.Variable(pid)
         v.setUnits("dimensionless")  # FIXME
-        v.setInitialValue(pvalue)
+        set_initial_value(v, pid)
         component.addVariable(v)
         if verbose:
             console.print(f"'{pid}' variable for 'parameter'")
@@ -117,125 +209,154 @@ def convert_sbml2cellml(sbml_path: Path, verbose: bool = True) -> libcellml.Mode
     species_types: dict[str, str] = {}
     for s in m_sbml.getListOfSpecies():
         sid: str = s.getId()
-        cid = s.getCompartment()
+        if not is_required(sid):
+            continue
         v = libcellml.Variable(sid)
         v.setUnits("dimensionless")  # FIXME
-
-        # process initial value
         species_types[sid] = "amount" if s.getHasOnlySubstanceUnits() else "concentration"
-        if s.isSetInitialAmount():
-            amount = process_init_value(sid, s.getInitialAmount())
-            vinit = amount if s.getHasOnlySubstanceUnits() else amount * cdict[cid]
-        elif s.isSetInitialConcentration():
-            concentration = process_init_value(sid, s.getInitialConcentration())
-            vinit = concentration * cdict[cid] if s.getHasOnlySubstanceUnits() else concentration
-        v.setInitialValue(vinit)
+        set_initial_value(v, sid)
 
         component.addVariable(v)
         if verbose:
             console.print(f"'{sid}' variable for 'species'")
 
     # collect rules
-    arules: dict[str, str] = {}
-    rrules: dict[str, str] = {}
+    arules: dict[str, libsbml.ASTNode] = {}
+    rrules: dict[str, libsbml.ASTNode] = {}
     rule: libsbml.AssignmentRule
     for rule in m_sbml.getListOfRules():
         vid: str = rule.getVariable()
         vmath: libsbml.ASTNode = rule.getMath()
         rule_type = rule.getTypeCode()
+        if vid in defined_elsewhere:
+            continue
         if rule_type == libsbml.SBML_ASSIGNMENT_RULE:
-            arules[vid] = libsbml.formulaToL3String(vmath)
+            if is_required(vid):
+                arules[vid] = vmath
         elif rule_type == libsbml.SBML_RATE_RULE:
-            rrules[vid] = libsbml.formulaToL3String(vmath)
+            rrules[vid] = vmath
 
     # collect math for reactions
-    reaction_terms: dict[str, str] = {}
+    # per species list of (reaction id, stoichiometry) from the rows of the
+    # stoichiometric matrix; every reaction rate is a variable
+    stoichiometric_matrix = create_stoichiometric_matrix(m_sbml)
+    klaws: dict[str, libsbml.ASTNode] = {}
     r: libsbml.Reaction
     for r in m_sbml.getListOfReactions():
-        klaw: libsbml.KineticLaw = r.getKineticLaw()
-        math = klaw.getMath()
-        formula = libsbml.formulaToL3String(math)
-        reactant: libsbml.SpeciesReference
-
-        # the updates have to be either in amount/time or concentration/time depending
-        # on the variable
-
-        for reactant in r.getListOfReactants():
-            reactant_id: str = reactant.getSpecies()
-            formula_str = f"- ({formula})"
-            if reactant_id in reaction_terms:
-                reaction_terms[reactant_id] = f"{reaction_terms[reactant_id]} {formula_str}"
-            else:
-                reaction_terms[reactant_id] = formula_str
-
-        product: libsbml.SpeciesReference
-        for product in r.getListOfProducts():
-            product_id: str = product.getSpecies()
-            formula_str = f"+ ({formula})"
-            if product_id in reaction_terms:
-                reaction_terms[product_id] = f"{reaction_terms[product_id]} {formula_str}"
-            else:
-                reaction_terms[product_id] = formula_str
-
-    # amount/concentration
-    reaction_terms_all = {}
-    for sid, formula_str in reaction_terms.items():
-        if species_types[sid] == "amount":
-            reaction_terms_all[sid] = formula_str
-        elif species_types[sid] == "concentration":
-            cid = m_sbml.getSpecies(sid).getCompartment()
-            reaction_terms_all[sid] = f"1.0 dimensionless/{cid} * ({formula_str})"
-    reaction_terms = reaction_terms_all
-    del reaction_terms_all
+        if not r.isSetKineticLaw():
+            console.print(f"Reaction without KineticLaw NOT converted: {r.getId()}", style="error")
+            continue
+        klaws[r.getId()] = r.getKineticLaw().getMath()
+
+    # the updates have to be either in amount/time or concentration/time depending
+    # on the variable
+    reaction_terms: dict[str, list[tuple[str, float]]] = {}
+    for sid in stoichiometric_matrix.species:
+        terms = [
+            (rid, stoichiometry)
+            for rid, stoichiometry in stoichiometric_matrix.row(sid)
+            if rid in klaws
+        ]
+        if terms or sid in influxes:
+            reaction_terms[sid] = terms
+
+    # common-subexpression elimination
+    subexpressions: dict[str, libsbml.ASTNode] = {}
+    if cse:
+        subexpressions, rewritten = eliminate_common_subexpressions(
+            {**arules, **rrules, **klaws},
+            reserved={component.variable(k).name() for k in range(component.variableCount())},
+        )
+        arules = {vid: rewritten[vid] for vid in arules}
+        rrules = {vid: rewritten[vid] for vid in rrules}
+        klaws = {rid: rewritten[rid] for rid in klaws}
+
+    fluxes: dict[str, str] = {
+        sid: f"{sid}_flux" for sid, terms in reaction_terms.items()
+        if sid in defined_elsewhere and terms
+    }
+    influx_names = [name for names in influxes.values() for name in names]
+    for vid in list(subexpressions) + list(klaws) + list(fluxes.values()) + influx_names:
+        v = libcellml.Variable(vid)
+        v.setUnits("dimensionless")  # FIXME
+        component.addVariable(v)
 
     # convert rules and reactions to mathml
-    mathml_parts: list[str] = []
-
-    if arules:
-        console.rule(f"assignment rules", style="white")
-        for vid, formula in arules.items():
-            mathml_str = mathml_for_assignment(vid=vid, formula=formula)
-            mathml_parts.append(mathml_str)
+    mathml_parts: dict[str, str] = {}
+
+    for title, prefix, definitions in [
+        ("common subexpressions", "cse", subexpressions),
+        ("assignment rules", "rule", arules),
+        ("reaction rates", "reaction", klaws),
+    ]:
+        if definitions and verbose:
+            console.rule(title, style="white")
+        for vid, math in definitions.items():
+            mathml_str = mathml_for_assignment(vid=vid, math=math, ivid=time_name)
+            mathml_parts[f"{prefix}:{vid}"] = mathml_str
             if verbose:
-                console.print(f"{vid} = {formula}", style="info")
+                console.print(f"{vid} = {libsbml.formulaToL3String(math)}", style="info")
                 # console.print(mathml_str)
 
     if rrules:
-        console.rule(f"rate rules", style="white")
-        for vid, formula in rrules.items():
-            mathml_str = mathml_for_diff(vid=vid, formula=formula, ivid=time_name)
-            mathml_parts.append(mathml_str)
+        if verbose:
+            console.rule(f"rate rules", style="white")
+        for vid, math in rrules.items():
+            mathml_str = mathml_for_diff(vid=vid, math=math, ivid=time_name)
+            mathml_parts[f"rule:{vid}"] = mathml_str
             if verbose:
-                console.print(f"{vid} = {formula}", style="info")
+                console.print(f"{vid} = {libsbml.formulaToL3String(math)}", style="info")
                 # console.print(mathml_str)
 
     if reaction_terms:
-        console.rule(f"reactions", style="white")
-        for vid, formula in reaction_terms.items():
-            mathml_str = mathml_for_diff(vid=vid, formula=formula, ivid=time_name)
-            mathml_parts.append(mathml_str)
+        if verbose:
+            console.rule(f"reactions", style="white")
+        for sid, terms in reaction_terms.items():
+            term_parts = [
+                mathml_for_term(stoichiometry, f"<ci>{rid}</ci>")
+                for rid, stoichiometry in terms
+            ]
+            term_parts.extend(f"<ci>{name}</ci>" for name in influxes.get(sid, []))
+            formula = " + ".join(
+                [f"{stoichiometry} * {rid}" for rid, stoichiometry in terms]
+                + influxes.get(sid, [])
+            )
+            if sid in defined_elsewhere:
+                if sid in fluxes:
+                    mathml_parts[f"species:{sid}"] = mathml_assignment_equation(
+                        vid=fluxes[sid], rhs_str=mathml_for_reaction_terms(term_parts)
+                    )
+                    if verbose:
+                        console.print(f"{fluxes[sid]} = {formula}", style="info")
+                continue
+
+            # amount/concentration
+            cid = None
+            if species_types[sid] == "concentration":
+                cid = m_sbml.getSpecies(sid).getCompartment()
+            rhs_str = mathml_for_reaction_terms(term_parts, cid=cid)
+            mathml_parts[f"species:{sid}"] = mathml_diff_equation(
+                vid=sid, rhs_str=rhs_str, ivid=time_name
+            )
             if verbose:
-                console.print(f"d{vid}/dt = {formula}", style="info")
-                # console.print(mathml_str)
+                if cid:
+                    formula = f"1/{cid} * ({formula})"
+                console.print(f"d{sid}/dt = {formula}", style="info")
 
-    console.rule(style="white")
+    if verbose:
+        console.rule(style="white")
 
-    # combine mathml
-    cellml_mathml = '<math xmlns="http://www.w3.org/1998/Math/MathML" xmlns:cellml="http://www.cellml.org/cellml/2.0#">\n'
-    cellml_mathml += "\n".join(mathml_parts)
-    cellml_mathml += "</math>"
-    component.setMath(cellml_mathml)
+    set_component_math(component, mathml_parts.values())
+    if equations is not None:
+        equations.update(mathml_parts)
+    del mathml_parts
     # console.print(cellml_mathml, style="white")
 
     event: libsbml.Event
     for event in m_sbml.getListOfEvents():
         console.print(f"Event NOT converted: {event}!", style="error")
 
-    assignment: libsbml.InitialAssignment
-    for assignment in m_sbml.getListOfInitialAssignments():
-        console.print(f"InitialAssignment NOT converted: {assignment}!", style="error")
-
-    return m_cellml
+    return stoichiometric_matrix, fluxes
 
 
 # --- MathML processing ---
@@ -251,6 +372,8 @@ def process_mathml_for_cellml(formula: str):
     """Process and cleanup Mathml.
     Removes prefix and suffix from the formula
 
+    Legacy string round-trip (infix -> AST -> MathML -> prefix stripping); the
+    converter uses `ast_to_cellml_mathml` instead. Kept for benchmarking.
     """
     ast: libsbml.ASTNode = libsbml.parseL3Formula(formula)
     mathml_str = libsbml.writeMathMLToString(ast)
@@ -272,12 +395,186 @@ def process_mathml_for_cellml(formula: str):
     return mathml_str
 
 
-def mathml_for_diff(vid, formula, ivid:str = "t"):
+# operators written as <apply><op/> children... </apply>
+mathml_operators: dict[int, str] = {
+    libsbml.AST_PLUS: "plus",
+    libsbml.AST_MINUS: "minus",
+    libsbml.AST_TIMES: "times",
+    libsbml.AST_DIVIDE: "divide",
+    libsbml.AST_POWER: "power",
+    libsbml.AST_FUNCTION_POWER: "power",
+    libsbml.AST_FUNCTION_ABS: "abs",
+    libsbml.AST_FUNCTION_EXP: "exp",
+    libsbml.AST_FUNCTION_LN: "ln",
+    libsbml.AST_FUNCTION_FLOOR: "floor",
+    libsbml.AST_FUNCTION_CEILING: "ceiling",
+    libsbml.AST_FUNCTION_MIN: "min",
+    libsbml.AST_FUNCTION_MAX: "max",
+    libsbml.AST_FUNCTION_REM: "rem",
+    libsbml.AST_FUNCTION_SIN: "sin",
+    libsbml.AST_FUNCTION_COS: "cos",
+    libsbml.AST_FUNCTION_TAN: "tan",
+    libsbml.AST_FUNCTION_SEC: "sec",
+    libsbml.AST_FUNCTION_CSC: "csc",
+    libsbml.AST_FUNCTION_COT: "cot",
+    libsbml.AST_FUNCTION_SINH: "sinh",
+    libsbml.AST_FUNCTION_COSH: "cosh",
+    libsbml.AST_FUNCTION_TANH: "tanh",
+    libsbml.AST_FUNCTION_SECH: "sech",
+    libsbml.AST_FUNCTION_CSCH: "csch",
+    libsbml.AST_FUNCTION_COTH: "coth",
+    libsbml.AST_FUNCTION_ARCSIN: "arcsin",
+    libsbml.AST_FUNCTION_ARCCOS: "arccos",
+    libsbml.AST_FUNCTION_ARCTAN: "arctan",
+    libsbml.AST_FUNCTION_ARCSEC: "arcsec",
+    libsbml.AST_FUNCTION_ARCCSC: "arccsc",
+    libsbml.AST_FUNCTION_ARCCOT: "arccot",
+    libsbml.AST_FUNCTION_ARCSINH: "arcsinh",
+    libsbml.AST_FUNCTION_ARCCOSH: "arccosh",
+    libsbml.AST_FUNCTION_ARCTANH: "arctanh",
+    libsbml.AST_FUNCTION_ARCSECH: "arcsech",
+    libsbml.AST_FUNCTION_ARCCSCH: "arccsch",
+    libsbml.AST_FUNCTION_ARCCOTH: "arccoth",
+    libsbml.AST_RELATIONAL_EQ: "eq",
+    libsbml.AST_RELATIONAL_NEQ: "neq",
+    libsbml.AST_RELATIONAL_LT: "lt",
+    libsbml.AST_RELATIONAL_GT: "gt",
+    libsbml.AST_RELATIONAL_LEQ: "leq",
+    libsbml.AST_RELATIONAL_GEQ: "geq",
+    libsbml.AST_LOGICAL_AND: "and",
+    libsbml.AST_LOGICAL_OR: "or",
+    libsbml.AST_LOGICAL_XOR: "xor",
+    libsbml.AST_LOGICAL_NOT: "not",
+}
+
+# constants written as empty elements
+mathml_constants: dict[int, str] = {
+    libsbml.AST_CONSTANT_E: "<exponentiale/>",
+    libsbml.AST_CONSTANT_PI: "<pi/>",
+    libsbml.AST_CONSTANT_TRUE: "<true/>",
+    libsbml.AST_CONSTANT_FALSE: "<false/>",
+}
+
+AVOGADRO = 6.02214076e23
+
+
+def mathml_cn(value: float, units: str = "dimensionless") -> str:
+    """Create CellML number; CellML requires units on every <cn>."""
+    if value != value:
+        return "<notanumber/>"
+    if value in (float("inf"), float("-inf")):
+        return "<infinity/>" if value > 0 else "<apply><minus/><infinity/></apply>"
+    if float(value).is_integer() and abs(value) < 1e15:
+        value_str = str(int(value))
+    else:
+        value_str = repr(float(value))
+    return f'<cn cellml:units="{units}">{value_str}</cn>'
+
+
+def ast_to_cellml_mathml(ast: libsbml.ASTNode, time_name: str = "time") -> str:
+    """Convert libsbml ASTNode directly into CellML MathML.
+
+    The MathML is created by walking the AST, i.e. without the string round-trip
+    via infix formula and libsbml MathML writer. The returned string is the
+    content of a <math> element (no namespace declarations); inline units are
+    written as 'cellml:units' and default to 'dimensionless'.
+    The csymbol time is mapped on the variable `time_name`.
+    """
+    parts: list[str] = []
+    _write_ast(ast, parts, time_name)
+    return "".join(parts)
+
+
+def _write_ast(ast: libsbml.ASTNode, parts: list[str], time_name: str) -> None:
+    """Append MathML for ast to parts."""
+    ast_type: int = ast.getType()
+    n_children: int = ast.getNumChildren()
+
+    if ast_type == libsbml.AST_NAME:
+        parts.append(f"<ci>{ast.getName()}</ci>")
+
+    elif ast_type in (libsbml.AST_REAL, libsbml.AST_REAL_E, libsbml.AST_RATIONAL):
+        units = ast.getUnits() if ast.isSetUnits() else "dimensionless"
+        parts.append(mathml_cn(ast.getReal(), units))
+
+    elif ast_type == libsbml.AST_INTEGER:
+        units = ast.getUnits() if ast.isSetUnits() else "dimensionless"
+        parts.append(f'<cn cellml:units="{units}">{ast.getInteger()}</cn>')
+
+    elif ast_type == libsbml.AST_NAME_TIME:
+        parts.append(f"<ci>{time_name}</ci>")
+
+    elif ast_type == libsbml.AST_NAME_AVOGADRO:
+        parts.append(mathml_cn(AVOGADRO))
+
+    elif ast_type in mathml_constants:
+        parts.append(mathml_constants[ast_type])
+
+    elif ast_type in (libsbml.AST_PLUS, libsbml.AST_TIMES) and n_children == 0:
+        # empty sum and product
+        parts.append(mathml_cn(0.0 if ast_type == libsbml.AST_PLUS else 1.0))
+
+    elif ast_type in mathml_operators:
+        parts.append(f"<apply><{mathml_operators[ast_type]}/>")
+        for k in range(n_children):
+            _write_ast(ast.getChild(k), parts, time_name)
+        parts.append("</apply>")
+
+    elif ast_type in (libsbml.AST_FUNCTION_LOG, libsbml.AST_FUNCTION_ROOT):
+        # optional logbase/degree qualifier is the first child
+        if ast_type == libsbml.AST_FUNCTION_LOG:
+            op, qualifier = "log", "logbase"
+        else:
+            op, qualifier = "root", "degree"
+        parts.append(f"<apply><{op}/>")
+        if n_children == 2:
+            parts.append(f"<{qualifier}>")
+            _write_ast(ast.getChild(0), parts, time_name)
+            parts.append(f"</{qualifier}>")
+        _write_ast(ast.getChild(n_children - 1), parts, time_name)
+        parts.append("</apply>")
+
+    elif ast_type == libsbml.AST_FUNCTION_QUOTIENT:
+        # quotient is not part of the CellML MathML subset
+        parts.append("<apply><floor/><apply><divide/>")
+        _write_ast(ast.getChild(0), parts, time_name)
+        _write_ast(ast.getChild(1), parts, time_name)
+        parts.append("</apply></apply>")
+
+    elif ast_type == libsbml.AST_FUNCTION_PIECEWISE:
+        parts.append("<piecewise>")
+        for k in range(0, n_children - 1, 2):
+            parts.append("<piece>")
+            _write_ast(ast.getChild(k), parts, time_name)
+            _write_ast(ast.getChild(k + 1), parts, time_name)
+            parts.append("</piece>")
+        if n_children % 2:
+            parts.append("<otherwise>")
+            _write_ast(ast.getChild(n_children - 1), parts, time_name)
+            parts.append("</otherwise>")
+        parts.append("</piecewise>")
+
+    else:
+        raise SBML2CellMLConversionError(
+            f"MathML for '{libsbml.formulaToL3String(ast)}' cannot be converted "
+            f"to CellML (ASTNode type '{ast_type}')."
+        )
+
+
+def mathml_for_diff(vid: str, math: libsbml.ASTNode, ivid: str = "t"):
     """Create mathml for differential.
 
-    d {vid}/d {ivid} = {formula}
+    d {vid}/d {ivid} = {math}
+    """
+    rhs_str = ast_to_cellml_mathml(math, time_name=ivid)
+    return mathml_diff_equation(vid=vid, rhs_str=rhs_str, ivid=ivid)
+
+
+def mathml_diff_equation(vid: str, rhs_str: str, ivid: str = "t"):
+    """Create mathml for differential with given right hand side MathML.
+
+    d {vid}/d {ivid} = {rhs_str}
     """
-    rhs_str = process_mathml_for_cellml(formula)
     mathml_str = f"""<apply>
   <eq/>
   <apply>
@@ -293,12 +590,47 @@ def mathml_for_diff(vid, formula, ivid:str = "t"):
     return mathml_str
 
 
-def mathml_for_assignment(vid, formula):
+def mathml_for_term(stoichiometry: float, rate_str: str) -> str:
+    """Create mathml for stoichiometry * rate of a reaction."""
+    if stoichiometry == 1.0:
+        return rate_str
+    if stoichiometry == -1.0:
+        return f"<apply><minus/>{rate_str}</apply>"
+    return f"<apply><times/>{mathml_cn(stoichiometry)}{rate_str}</apply>"
+
+
+def mathml_for_reaction_terms(term_parts: list[str], cid: Optional[str] = None) -> str:
+    """Create mathml for the sum of reaction terms as a single n-ary plus.
+
+    For species in concentration the sum is divided by the compartment `cid`:
+    1.0 dimensionless/{cid} * (sum)
+    """
+    if len(term_parts) == 1:
+        rhs_str = term_parts[0]
+    else:
+        rhs_str = f"<apply><plus/>{''.join(term_parts)}</apply>"
+    if cid:
+        rhs_str = (
+            f"<apply><times/><apply><divide/>{mathml_cn(1.0)}<ci>{cid}</ci></apply>"
+            f"{rhs_str}</apply>"
+        )
+    return rhs_str
+
+
+def mathml_for_assignment(vid: str, math: libsbml.ASTNode, ivid: str = "t"):
     """Create mathml for assignment.
 
-    {vid} = {formula}
+    {vid} = {math}
+    """
+    rhs_str = ast_to_cellml_mathml(math, time_name=ivid)
+    return mathml_assignment_equation(vid=vid, rhs_str=rhs_str)
+
+
+def mathml_assignment_equation(vid: str, rhs_str: str):
+    """Create mathml for assignment with given right hand side MathML.
+
+    {vid} = {rhs_str}
     """
-    rhs_str = process_mathml_for_cellml(formula)
     mathml_str = f"""<apply>
   <eq/>
   <ci>{vid}</ci>
@@ -316,10 +648,13 @@ def write_model_to_string(model: libcellml.Model) -> str:
 
 
 def write_model_to_file(model: libcellml.Model, cellml_path: Path) -> None:
-    """Write CellML model to file."""
-    model_xml_str: str = write_model_to_string(model)
-    with open(cellml_path, "w", encoding="utf-8") as f_cellml:
-        f_cellml.write(model_xml_str)
+    """Write CellML model to file.
+
+    The model is streamed to the file without creating the document string;
+    files ending in '.gz' are gzip compressed.
+    """
+    with open_cellml(cellml_path) as f_cellml:
+        write_model(model, f_cellml)
 
 
 def print_issues(title, logger):
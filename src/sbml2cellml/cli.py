@@ -0,0 +1,131 @@
+"""Command line interface for sbml2cellml.
+
+    sbml2cellml convert-dir models/ --output cellml/ --processes 4
+    sbml2cellml watch models/ --simulate 10
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+from sbml2cellml.console import console
+
+
+def _convert_dir(args: argparse.Namespace) -> int:
+    """Convert all SBML models of a directory."""
+    from sbml2cellml.batch import convert_directory, report_results
+
+    t0 = time.perf_counter()
+    results = convert_directory(
+        sbml_dir=args.directory,
+        cellml_dir=args.output,
+        pattern=args.pattern,
+        processes=args.processes,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+    )
+    console.print(report_results(results))
+    failed = [r for r in results if not r.success]
+    for result in failed:
+        console.rule(result.sbml_path.name, style="error")
+        console.print(result.error, style="error", markup=False)
+    console.print(
+        f"{len(results) - len(failed)}/{len(results)} models converted in "
+        f"{time.perf_counter() - t0:.2f} s",
+        style="error" if failed else "success",
+    )
+    return 1 if failed else 0
+
+
+def _watch(args: argparse.Namespace) -> int:
+    """Reconvert changed SBML models of a directory until interrupted."""
+    from sbml2cellml.watch import ModelWatcher
+
+    watcher = ModelWatcher(
+        directory=args.directory,
+        cellml_dir=args.output,
+        pattern=args.pattern,
+        debounce=args.debounce,
+        simulate=args.simulate,
+        steps=args.steps,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+    )
+    watcher.run()
+    return 0
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="sbml2cellml", description="SBML to CellML converter."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p_convert_dir = subparsers.add_parser(
+        "convert-dir", help="convert all SBML models in a directory"
+    )
+    p_convert_dir.add_argument("directory", type=Path, help="directory with SBML files")
+    p_convert_dir.add_argument(
+        "-o", "--output", type=Path, default=None,
+        help="output directory for CellML files (default: SBML directory)",
+    )
+    p_convert_dir.add_argument(
+        "--pattern", default="*.xml", help="glob pattern for SBML files (default: *.xml)"
+    )
+    p_convert_dir.add_argument(
+        "-p", "--processes", type=int, default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    p_convert_dir.add_argument(
+        "--no-cache", action="store_true", help="do not use the conversion cache"
+    )
+    p_convert_dir.add_argument(
+        "--cache-dir", type=Path, default=None,
+        help="directory of the conversion cache (default: ~/.cache/sbml2cellml)",
+    )
+    p_convert_dir.set_defaults(func=_convert_dir)
+
+    p_watch = subparsers.add_parser(
+        "watch", help="reconvert SBML models in a directory on change"
+    )
+    p_watch.add_argument("directory", type=Path, help="directory with SBML files")
+    p_watch.add_argument(
+        "-o", "--output", type=Path, default=None,
+        help="output directory for CellML files (default: SBML directory)",
+    )
+    p_watch.add_argument(
+        "--pattern", default="*.xml", help="glob pattern for SBML files (default: *.xml)"
+    )
+    p_watch.add_argument(
+        "--debounce", type=float, default=0.2,
+        help="seconds without changes before reconverting (default: 0.2)",
+    )
+    p_watch.add_argument(
+        "--simulate", type=float, default=None, metavar="END",
+        help="run a smoke simulation from 0 to END after every conversion",
+    )
+    p_watch.add_argument(
+        "--steps", type=int, default=100, help="steps of the smoke simulation (default: 100)"
+    )
+    p_watch.add_argument(
+        "--no-cache", action="store_true", help="do not use the conversion cache"
+    )
+    p_watch.add_argument(
+        "--cache-dir", type=Path, default=None,
+        help="directory of the conversion cache (default: ~/.cache/sbml2cellml)",
+    )
+    p_watch.set_defaults(func=_watch)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the command line interface."""
+    args = create_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
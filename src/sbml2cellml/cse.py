@@ -0,0 +1,117 @@
+"""Common-subexpression elimination on libsbml ASTs.
+
+Structurally identical subtrees of a set of definitions (e.g. kinetic laws and
+assignment rules) are identified via hash-consing. Every subexpression which is
+used more than once is defined once as a new variable and all occurrences are
+replaced by the variable, so that it is evaluated only once per RHS evaluation.
+Boolean subexpressions (relational and logical operators, e.g. piecewise
+conditions) are not eliminated because CellML variables are real-valued.
+"""
+
+from dataclasses import dataclass
+
+import libsbml
+
+
+@dataclass
+class _Tree:
+    """Structural key and children of an AST node."""
+
+    key: int
+    ast: libsbml.ASTNode
+    children: list["_Tree"]
+
+
+def _label(ast: libsbml.ASTNode) -> tuple:
+    """Label of an AST node without its children."""
+    ast_type = ast.getType()
+    units = ast.getUnits() if ast.isSetUnits() else None
+    if ast.isInteger():
+        return ast_type, ast.getInteger(), units
+    if ast.isNumber():
+        return ast_type, ast.getReal(), units
+    return ast_type, ast.getName()
+
+
+def _index(ast: libsbml.ASTNode, table: dict[tuple, int], counts: dict[int, int]) -> _Tree:
+    """Key the AST by structure and count the occurrences of real-valued operator nodes."""
+    children = [_index(ast.getChild(k), table, counts) for k in range(ast.getNumChildren())]
+    key = table.setdefault((_label(ast), tuple(c.key for c in children)), len(table))
+    if children and not ast.isBoolean():
+        counts[key] = counts.get(key, 0) + 1
+    return _Tree(key=key, ast=ast, children=children)
+
+
+def eliminate_common_subexpressions(
+    definitions: dict[str, libsbml.ASTNode],
+    reserved: set[str] = frozenset(),
+    prefix: str = "cse",
+) -> tuple[dict[str, libsbml.ASTNode], dict[str, libsbml.ASTNode]]:
+    """Replace repeated subexpressions of the definitions by new variables.
+
+    Returns the new subexpression variables (in dependency order) and the
+    rewritten definitions. Names of new variables are `{prefix}_{k}` and do not
+    clash with `reserved` or the keys of the definitions. The ASTs of the
+    definitions are not modified.
+    """
+    table: dict[tuple, int] = {}
+    counts: dict[int, int] = {}
+    trees = {vid: _index(ast, table, counts) for vid, ast in definitions.items()}
+    candidates = {key for key, count in counts.items() if count > 1}
+
+    # uses after replacement: the body of a subexpression is evaluated only once,
+    # i.e. subtrees repeated only within a repeated subexpression are not counted
+    uses: dict[int, int] = {}
+    first: dict[int, _Tree] = {}
+    order: list[int] = []
+
+    def count_uses(tree: _Tree) -> None:
+        if tree.key in candidates:
+            uses[tree.key] = uses.get(tree.key, 0) + 1
+            if tree.key in first:
+                return
+            first[tree.key] = tree
+            for child in tree.children:
+                count_uses(child)
+            order.append(tree.key)
+        else:
+            for child in tree.children:
+                count_uses(child)
+
+    for tree in trees.values():
+        count_uses(tree)
+
+    reserved = set(reserved) | set(definitions)
+    names: dict[int, str] = {}
+    for key in order:
+        if uses[key] < 2:
+            continue
+        name = f"{prefix}_{len(names)}"
+        while name in reserved:
+            name = f"_{name}"
+        names[key] = name
+
+    def variable(key: int) -> libsbml.ASTNode:
+        node = libsbml.ASTNode(libsbml.AST_NAME)
+        node.setName(names[key])
+        return node
+
+    def rewrite(tree: _Tree) -> libsbml.ASTNode:
+        """Copy of the AST with the subexpressions below the root replaced."""
+        ast = tree.ast.deepCopy()
+        stack = [(ast, tree)]
+        while stack:
+            node, node_tree = stack.pop()
+            for k, child in enumerate(node_tree.children):
+                if child.key in names:
+                    node.replaceChild(k, variable(child.key), True)
+                else:
+                    stack.append((node.getChild(k), child))
+        return ast
+
+    subexpressions = {names[key]: rewrite(first[key]) for key in order if key in names}
+    rewritten = {
+        vid: variable(tree.key) if tree.key in names else rewrite(tree)
+        for vid, tree in trees.items()
+    }
+    return subexpressions, rewritten
@@ -0,0 +1,58 @@
+"""Dependencies between the variables of SBML models.
+
+Helpers to collect the symbols used in libsbml ASTs and to order rules by their
+dependencies.
+"""
+
+import libsbml
+
+
+class CyclicDependencyError(ValueError):
+    """Definitions depend on each other in a cycle."""
+
+    pass
+
+
+def ast_names(ast: libsbml.ASTNode) -> set[str]:
+    """Names of the variables used in the AST (without time and csymbols)."""
+    names: set[str] = set()
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if node.getType() == libsbml.AST_NAME:
+            names.add(node.getName())
+        stack.extend(node.getChild(k) for k in range(node.getNumChildren()))
+    return names
+
+
+def topological_sort(dependencies: dict[str, set[str]]) -> list[str]:
+    """Order the keys so that every key comes after the keys it depends on.
+
+    Dependencies which are not keys (e.g. constants) are ignored. The order of
+    independent keys is preserved. Raises `CyclicDependencyError` for cycles.
+    """
+    order: list[str] = []
+    state: dict[str, int] = {}  # 1: visiting, 2: done
+    for root in dependencies:
+        if root in state:
+            continue
+        stack = [(root, iter(sorted(dependencies[root])))]
+        state[root] = 1
+        while stack:
+            key, children = stack[-1]
+            for child in children:
+                if child not in dependencies:
+                    continue
+                if state.get(child) == 1:
+                    raise CyclicDependencyError(
+                        f"Cyclic dependency between '{key}' and '{child}'."
+                    )
+                if child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(sorted(dependencies[child]))))
+                    break
+            else:
+                stack.pop()
+                state[key] = 2
+                order.append(key)
+    return order
@@ -80,5 +80,5 @@ if __name__ == "__main__":
     write_model_to_file(model=model, cellml_path=cellml_path)
 
     # simulate example model
-    df, units = run_cellml_timecourse(cellml_path)
-    plot_cellml_timecourse(df=df, units=units)
+    result = run_cellml_timecourse(cellml_path)
+    plot_cellml_timecourse(df=result.to_pandas(), units=result.units)
@@ -0,0 +1,210 @@
+"""Hierarchical CellML models from SBML models with comp submodels.
+
+Every submodel of the SBML comp package is converted into its own CellML component,
+encapsulated by the component of the top-level model. Replaced elements are mapped
+on equivalent variables, i.e. the math of every component stays small and the
+structure of the SBML model is preserved.
+
+The replacing element defines the value of the equivalent variables (initial value
+or rule), unless only the replaced element is defined by a rule. Species replaced
+across components can change by reactions in several components; every non-owning
+component exports the sum of its reaction terms as flux variable which is added to
+the derivative of the species in the owning component.
+
+Submodels of the same model with the same replacements are converted once and
+cloned. Nested submodels, deletions, conversion factors and replacedBy are not
+supported.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import libcellml
+import libsbml
+
+from sbml2cellml.cellml2sbml import (
+    SBML2CellMLConversionError,
+    add_units,
+    convert_model_component,
+)
+from sbml2cellml.console import console
+
+
+def _resolve_model(
+    doc: libsbml.SBMLDocument, model_ref: str, base_dir: Path,
+    documents: list[libsbml.SBMLDocument],
+) -> libsbml.Model:
+    """Model of (external) model definition.
+
+    External sources are resolved relative to `base_dir`; their documents are
+    appended to `documents`, which must be kept alive while the model is used.
+    """
+    plugin: libsbml.CompSBMLDocumentPlugin = doc.getPlugin("comp")
+    model_definition = plugin.getModelDefinition(model_ref)
+    if model_definition:
+        return model_definition
+    external: libsbml.ExternalModelDefinition = plugin.getExternalModelDefinition(model_ref)
+    if external:
+        source_path = base_dir / external.getSource()
+        if source_path.exists():
+            source_doc = libsbml.readSBMLFromFile(str(source_path))
+            documents.append(source_doc)
+            model = source_doc.getModel()
+            if external.isSetModelRef() and model and model.getId() != external.getModelRef():
+                model = source_doc.getPlugin("comp").getModelDefinition(external.getModelRef())
+            if model:
+                return model
+    raise SBML2CellMLConversionError(f"Model '{model_ref}' of submodel not found.")
+
+
+def _resolve_reference(model: libsbml.Model, replaced: libsbml.ReplacedElement) -> str:
+    """Id of the element in the submodel referenced via port or id."""
+    if replaced.isSetPortRef():
+        port = model.getPlugin("comp").getPort(replaced.getPortRef())
+        if not port or not port.isSetIdRef():
+            raise SBML2CellMLConversionError(
+                f"Port '{replaced.getPortRef()}' not found in '{model.getId()}'."
+            )
+        return port.getIdRef()
+    if replaced.isSetIdRef():
+        return replaced.getIdRef()
+    raise SBML2CellMLConversionError(
+        "Only replaced elements via portRef or idRef are supported."
+    )
+
+
+def _rule_targets(m_sbml: libsbml.Model) -> set[str]:
+    """Variables of assignment and rate rules."""
+    return {rule.getVariable() for rule in m_sbml.getListOfRules() if rule.isSetVariable()}
+
+
+def convert_sbml2cellml_hierarchical(
+    sbml_path: Path, verbose: bool = True, cse: bool = True
+) -> libcellml.Model:
+    """Convert SBML model with comp submodels into CellML with a component per submodel.
+
+    The top-level model is converted into the component 'sbml' which encapsulates
+    a component per submodel (named by the submodel id). Models without submodels
+    result in the single component of `convert_sbml2cellml`.
+    """
+    doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(sbml_path))
+    m_sbml: libsbml.Model = doc.getModel()
+    if not m_sbml:
+        raise SBML2CellMLConversionError("No model in SBMLDocument.")
+    mid: str = m_sbml.getId() if m_sbml.isSetId() else Path(sbml_path).stem
+
+    # resolve submodels
+    submodels: dict[str, libsbml.Model] = {}
+    documents: list[libsbml.SBMLDocument] = []
+    model_refs: dict[str, str] = {}
+    comp_plugin: Optional[libsbml.CompModelPlugin] = m_sbml.getPlugin("comp")
+    if comp_plugin:
+        submodel: libsbml.Submodel
+        for submodel in comp_plugin.getListOfSubmodels():
+            sub_id = submodel.getId()
+            model = _resolve_model(
+                doc, submodel.getModelRef(), Path(sbml_path).parent, documents
+            )
+            sub_plugin = model.getPlugin("comp")
+            if sub_plugin and sub_plugin.getNumSubmodels():
+                raise SBML2CellMLConversionError(
+                    f"Nested submodels are not supported: '{sub_id}'."
+                )
+            if submodel.getNumDeletions():
+                console.print(f"Deletions NOT converted: {sub_id}", style="error")
+            if submodel.isSetExtentConversionFactor() or submodel.isSetTimeConversionFactor():
+                console.print(f"Conversion factors NOT converted: {sub_id}", style="error")
+            submodels[sub_id] = model
+            model_refs[sub_id] = submodel.getModelRef()
+
+    # replaced elements: (top-level id, submodel id, submodel element id)
+    links: list[tuple[str, str, str]] = []
+    element: libsbml.SBase
+    for elements in [
+        m_sbml.getListOfCompartments(),
+        m_sbml.getListOfParameters(),
+        m_sbml.getListOfSpecies(),
+    ]:
+        for element in elements:
+            plugin: libsbml.CompSBasePlugin = element.getPlugin("comp")
+            if not plugin:
+                continue
+            if plugin.isSetReplacedBy():
+                console.print(f"ReplacedBy NOT converted: {element.getId()}", style="error")
+            for k in range(plugin.getNumReplacedElements()):
+                replaced: libsbml.ReplacedElement = plugin.getReplacedElement(k)
+                if replaced.isSetConversionFactor():
+                    console.print(
+                        f"Conversion factor NOT converted: {element.getId()}", style="error"
+                    )
+                sub_id = replaced.getSubmodelRef()
+                links.append(
+                    (element.getId(), sub_id, _resolve_reference(submodels[sub_id], replaced))
+                )
+
+    # owner of the value of linked variables
+    top_rules = _rule_targets(m_sbml)
+    top_defined_elsewhere: set[str] = set()
+    defined_elsewhere: dict[str, set[str]] = {sub_id: set() for sub_id in submodels}
+    for vid, sub_id, sub_vid in links:
+        if vid not in top_rules and sub_vid in _rule_targets(submodels[sub_id]):
+            top_defined_elsewhere.add(vid)
+        else:
+            defined_elsewhere[sub_id].add(sub_vid)
+
+    m_cellml: libcellml.Model = libcellml.Model(mid)
+    add_units(m_cellml)
+    time_name = "time"
+    component = libcellml.Component("sbml")
+    m_cellml.addComponent(component)
+
+    # submodel components
+    converted: dict[tuple[str, frozenset[str]], tuple[libcellml.Component, dict[str, str]]] = {}
+    fluxes: dict[str, dict[str, str]] = {}
+    for sub_id, model in submodels.items():
+        key = (model_refs[sub_id], frozenset(defined_elsewhere[sub_id]))
+        if key in converted:
+            sub_component = converted[key][0].clone()
+            sub_component.setName(sub_id)
+        else:
+            if verbose:
+                console.rule(f"submodel '{sub_id}'", style="white")
+            sub_component = libcellml.Component(sub_id)
+            _, sub_fluxes = convert_model_component(
+                model, sub_component, time_name=time_name, verbose=verbose, cse=cse,
+                defined_elsewhere=defined_elsewhere[sub_id],
+            )
+            converted[key] = (sub_component, sub_fluxes)
+        fluxes[sub_id] = converted[key][1]
+        component.addComponent(sub_component)
+
+    # fluxes of the replaced species into the top-level species
+    influxes: dict[str, list[str]] = {}
+    for vid, sub_id, sub_vid in links:
+        if sub_vid in fluxes[sub_id]:
+            influxes.setdefault(vid, []).append(f"{sub_id}__{fluxes[sub_id][sub_vid]}")
+
+    if verbose:
+        console.rule(f"model '{mid}'", style="white")
+    convert_model_component(
+        m_sbml, component, time_name=time_name, verbose=verbose, cse=cse,
+        defined_elsewhere=top_defined_elsewhere, influxes=influxes,
+    )
+
+    # equivalent variables
+    for sub_id in submodels:
+        sub_component = component.component(sub_id)
+        libcellml.Variable.addEquivalence(
+            component.variable(time_name), sub_component.variable(time_name)
+        )
+        for sub_vid, flux in fluxes[sub_id].items():
+            libcellml.Variable.addEquivalence(
+                component.variable(f"{sub_id}__{flux}"), sub_component.variable(flux)
+            )
+    for vid, sub_id, sub_vid in links:
+        libcellml.Variable.addEquivalence(
+            component.variable(vid), component.component(sub_id).variable(sub_vid)
+        )
+    m_cellml.fixVariableInterfaces()
+
+    return m_cellml
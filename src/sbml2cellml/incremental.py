@@ -0,0 +1,499 @@
+"""Incremental re-conversion of edited SBML models.
+
+A fingerprint of every SBML element (compartment, parameter, species, rule,
+reaction) is stored together with the CellML variables and equations of the last
+conversion in a JSON state file next to the CellML file. On re-conversion the SBML
+file is only scanned with expat; the MathML of changed rules and kinetic laws
+and the initial values of changed compartments, parameters and species are
+regenerated and spliced into the stored equations. All other changes (added or
+removed elements, changed stoichiometries, anything in a kinetic law besides its
+math such as local parameters, initial assignments, units, events, values which
+other initial values depend on, ...) result in a full conversion.
+
+Common-subexpression elimination couples the equations of different elements and
+is not used for incremental conversions.
+
+    converter = IncrementalConverter("model.xml", "model.cellml")
+    converter.convert()  # full conversion
+    # edit a kinetic law in model.xml
+    converter.convert()  # only the rate of the reaction is regenerated
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+from xml.parsers import expat
+
+import libcellml
+import libsbml
+
+from sbml2cellml.cache import converter_version
+from sbml2cellml.cellml2sbml import (
+    SBML2CellMLConversionError,
+    add_units,
+    convert_model_component,
+    mathml_for_assignment,
+    mathml_for_diff,
+    set_component_math,
+    write_model_to_string,
+)
+from sbml2cellml.dependencies import ast_names
+from sbml2cellml.writer import open_cellml
+
+STATE_VERSION = 3
+
+# SBML elements with fingerprints: list -> (elements, key attribute)
+ELEMENTS: dict[str, tuple[tuple[str, ...], str]] = {
+    "listOfCompartments": (("compartment",), "id"),
+    "listOfParameters": (("parameter",), "id"),
+    "listOfSpecies": (("species",), "id"),
+    "listOfRules": (("assignmentRule", "rateRule"), "variable"),
+    "listOfReactions": (("reaction",), "id"),
+}
+# attributes with the values of elements
+ELEMENTS_VALUES: dict[str, tuple[str, ...]] = {
+    "compartment": ("size",),
+    "parameter": ("value",),
+    "species": ("initialConcentration", "initialAmount"),
+}
+# elements without influence on the conversion
+IGNORED = ("notes", "annotation")
+
+
+def _hash(*parts: bytes) -> str:
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _local(tag: str) -> str:
+    """Tag without namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _attributes(attributes: dict[str, str]) -> bytes:
+    return json.dumps(sorted(attributes.items())).encode("utf-8")
+
+
+def _complement(
+    data: bytes, start: int, end: int, excluded: list[tuple[int, int]]
+) -> bytes:
+    """data[start:end] without the sorted excluded spans.
+
+    The parts are joined, so that adding or removing an excluded span (e.g. notes)
+    does not change the result.
+    """
+    parts: list[bytes] = []
+    for span_start, span_end in excluded:
+        parts.append(data[start:span_start])
+        start = span_end
+    parts.append(data[start:end])
+    return b"".join(parts)
+
+
+@dataclass
+class SBMLElement:
+    """Byte spans of an SBML element in the file."""
+
+    tag: str
+    attributes: dict[str, str]
+    start: int
+    end: int = -1
+    # notes and annotations
+    excluded: list[tuple[int, int]] = field(default_factory=list)
+    math: Optional[tuple[int, int]] = None
+
+
+@dataclass
+class SBMLFingerprints:
+    """Fingerprints of the SBML elements and of the rest of the model.
+
+    The fingerprint of an element is [structure, value]: the value is the value
+    attribute of compartments, parameters and species and the hash of the math of
+    rules and reactions, the structure are all other attributes and children.
+    """
+
+    data: bytes = field(repr=False)
+    model: str
+    elements: dict[str, list[Optional[str]]]
+    nodes: dict[str, SBMLElement] = field(repr=False)
+    namespaces: dict[str, str] = field(repr=False)
+
+    @classmethod
+    def from_file(cls, sbml_path: Path) -> "SBMLFingerprints":
+        """Fingerprints of an SBML file.
+
+        The file is parsed with expat and the byte spans of the elements are hashed,
+        i.e. no serialization of the elements is required.
+        """
+        data = Path(sbml_path).read_bytes()
+        parser = expat.ParserCreate(namespace_separator="}")
+        nodes: dict[str, SBMLElement] = {}
+        namespaces: dict[str, str] = {}
+        # excluded spans of the rest of the model (elements, notes and annotations)
+        excluded: list[tuple[int, int]] = []
+        stack: list[tuple[str, int]] = []
+        current: Optional[SBMLElement] = None
+        list_name: Optional[str] = None
+        has_model = False
+
+        def end_index() -> int:
+            index = parser.CurrentByteIndex
+            if data.startswith(b"</", index):
+                return data.index(b">", index) + 1
+            # empty element
+            return index
+
+        def start_namespace(prefix: Optional[str], uri: str) -> None:
+            if len(stack) < 2:
+                namespaces[prefix or ""] = uri
+
+        def start_element(name: str, attributes: dict[str, str]) -> None:
+            nonlocal current, list_name, has_model
+            tag = _local(name)
+            depth = len(stack)
+            stack.append((tag, parser.CurrentByteIndex))
+            if depth == 1 and tag == "model":
+                has_model = True
+            elif depth == 2:
+                list_name = tag
+            elif depth == 3 and list_name in ELEMENTS and tag in ELEMENTS[list_name][0]:
+                key = f"{tag}:{attributes.get(ELEMENTS[list_name][1])}"
+                current = nodes[key] = SBMLElement(
+                    tag=tag, attributes=attributes, start=parser.CurrentByteIndex
+                )
+
+        def end_element(name: str) -> None:
+            nonlocal current
+            tag, start = stack.pop()
+            depth = len(stack)
+            if current is None:
+                if tag in IGNORED and depth <= 2:
+                    excluded.append((start, end_index()))
+                return
+            if depth == 3:
+                current.end = end_index()
+                excluded.append((current.start, current.end))
+                current = None
+            elif depth == 4 and tag in IGNORED:
+                current.excluded.append((start, end_index()))
+            elif tag == "math" and (
+                depth == 4 or (depth == 5 and stack[-1][0] == "kineticLaw")
+            ):
+                current.math = (start, end_index())
+
+        parser.StartNamespaceDeclHandler = start_namespace
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        try:
+            parser.Parse(data, True)
+        except expat.ExpatError as err:
+            raise SBML2CellMLConversionError(f"Invalid SBML: {err}") from err
+        if not has_model:
+            raise SBML2CellMLConversionError("No model in SBMLDocument.")
+
+        elements: dict[str, list[Optional[str]]] = {}
+        for key, node in nodes.items():
+            value: Optional[str] = None
+            attributes = dict(node.attributes)
+            excluded_spans = node.excluded
+            if node.tag in ("reaction", "assignmentRule", "rateRule"):
+                if node.math:
+                    # the rest of the kinetic law (e.g. local parameters) is structure
+                    value = _hash(data[node.math[0] : node.math[1]])
+                    excluded_spans = sorted(node.excluded + [node.math])
+            else:
+                for name in ELEMENTS_VALUES.get(node.tag, ()):
+                    if name in attributes:
+                        value = f"{name}={attributes.pop(name)}"
+            # start tag is replaced by the attributes without value
+            body_start = data.index(b">", node.start) + 1
+            elements[key] = [
+                _hash(
+                    node.tag.encode(),
+                    _attributes(attributes),
+                    _complement(data, min(body_start, node.end), node.end, excluded_spans),
+                ),
+                value,
+            ]
+
+        rest = _complement(data, 0, len(data), sorted(excluded))
+        return cls(
+            data=data, model=_hash(rest), elements=elements, nodes=nodes,
+            namespaces=namespaces,
+        )
+
+    def dependents(self) -> Callable[[str], set[str]]:
+        """Function returning the elements whose initial values depend on an element.
+
+        Species depend on their compartment if the initial value is converted
+        between amount and concentration, variables of assignment rules on the
+        variables of the math. Dependencies are followed transitively.
+        """
+        direct: dict[str, set[str]] = {}
+        for key, node in self.nodes.items():
+            kind, sid = key.split(":", 1)
+            if kind == "species":
+                amount = node.attributes.get("hasOnlySubstanceUnits") == "true"
+                if ("initialAmount" in node.attributes) != amount:
+                    direct.setdefault(node.attributes.get("compartment"), set()).add(sid)
+            elif kind == "assignmentRule":
+                ast = self.math(key)
+                for name in ast_names(ast) if ast is not None else ():
+                    direct.setdefault(name, set()).add(sid)
+
+        def dependents(sid: str) -> set[str]:
+            found: set[str] = set()
+            stack = [sid]
+            while stack:
+                for dependent in direct.get(stack.pop(), ()):
+                    if dependent not in found:
+                        found.add(dependent)
+                        stack.append(dependent)
+            return found
+
+        return dependents
+
+    def math(self, key: str) -> Optional[libsbml.ASTNode]:
+        """AST of the math of the element."""
+        node = self.nodes[key]
+        if node.math is None:
+            return None
+        xml_namespaces = libsbml.XMLNamespaces()
+        for prefix, uri in self.namespaces.items():
+            xml_namespaces.add(uri, prefix)
+        return libsbml.readMathMLFromStringWithNamespaces(
+            self.data[node.math[0] : node.math[1]].decode("utf-8"), xml_namespaces
+        )
+
+
+@dataclass
+class IncrementalResult:
+    """Result of an (incremental) conversion."""
+
+    full: bool
+    changed: list[str]
+    time: float
+
+
+class IncrementalConverter:
+    """Converter which only regenerates the changed elements of an SBML model.
+
+    The state (fingerprints, variables and equations of the last conversion) is
+    stored in `state_path`, by default '{cellml_path}.state.json'.
+    """
+
+    def __init__(
+        self, sbml_path: Path, cellml_path: Path, state_path: Optional[Path] = None
+    ):
+        self.sbml_path = Path(sbml_path)
+        self.cellml_path = Path(cellml_path)
+        self.state_path = (
+            Path(state_path) if state_path
+            else self.cellml_path.with_name(f"{self.cellml_path.name}.state.json")
+        )
+        self.time_name = "time"
+        self._state: Optional[dict[str, Any]] = None
+
+    def _load_state(self) -> Optional[dict[str, Any]]:
+        """State of the last conversion if it is valid for this converter."""
+        if self._state is None and self.state_path.exists():
+            try:
+                self._state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return None
+        state = self._state
+        if (
+            not state
+            or state.get("version") != STATE_VERSION
+            or state.get("converter") != converter_version()
+            or not self.cellml_path.exists()
+        ):
+            return None
+        return state
+
+    def _save_state(self, state: dict[str, Any]) -> None:
+        """Write state atomically."""
+        self._state = state
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+
+    def convert(self, full: bool = False) -> IncrementalResult:
+        """Convert SBML to CellML, incrementally if possible (unless `full`)."""
+        t0 = time.perf_counter()
+        fingerprints = SBMLFingerprints.from_file(self.sbml_path)
+        state = None if full else self._load_state()
+        changed: Optional[list[str]] = None
+        if state is not None:
+            changed = self._update(state, fingerprints)
+
+        if changed is None:
+            self._convert_full(fingerprints)
+            changed = list(fingerprints.elements)
+            full = True
+        else:
+            full = False
+            if changed:
+                self._write(state)
+                state["fingerprints"] = fingerprints.elements
+                self._save_state(state)
+
+        return IncrementalResult(full=full, changed=changed, time=time.perf_counter() - t0)
+
+    def _convert_full(self, fingerprints: SBMLFingerprints) -> None:
+        """Convert complete model and store the state."""
+        doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(self.sbml_path))
+        m_sbml: libsbml.Model = doc.getModel()
+        if not m_sbml:
+            raise SBML2CellMLConversionError("No model in SBMLDocument.")
+        mid: str = m_sbml.getId() if m_sbml.isSetId() else self.sbml_path.stem
+
+        m_cellml = libcellml.Model(mid)
+        add_units(m_cellml)
+        component = libcellml.Component("sbml")
+        m_cellml.addComponent(component)
+        equations: dict[str, str] = {}
+        convert_model_component(
+            m_sbml, component, time_name=self.time_name, verbose=False, cse=False,
+            equations=equations,
+        )
+        self._write_model(m_cellml)
+
+        variables = []
+        for k in range(component.variableCount()):
+            v: libcellml.Variable = component.variable(k)
+            variables.append([v.name(), v.units().name(), v.initialValue()])
+        self._save_state(
+            {
+                "version": STATE_VERSION,
+                "converter": converter_version(),
+                "model_id": mid,
+                "model": fingerprints.model,
+                "fingerprints": fingerprints.elements,
+                "variables": variables,
+                "equations": equations,
+                "has_initial_assignments": m_sbml.getNumInitialAssignments() > 0,
+            }
+        )
+
+    def _update(
+        self, state: dict[str, Any], fingerprints: SBMLFingerprints
+    ) -> Optional[list[str]]:
+        """Splice the changed elements into the state.
+
+        Returns the keys of the changed elements or None if a full conversion is
+        required.
+        """
+        old: dict[str, list] = state["fingerprints"]
+        new = fingerprints.elements
+        if state["model"] != fingerprints.model or list(old) != list(new):
+            return None
+        changed = [key for key in new if new[key] != old[key]]
+        if any(new[key][0] != old[key][0] for key in changed):
+            return None
+
+        variables = {v[0]: v for v in state["variables"]}
+        # changed values and assignments propagate into other initial values
+        sources = [
+            key.split(":", 1)[1] for key in changed
+            if key.split(":", 1)[0] in (*ELEMENTS_VALUES, "assignmentRule")
+        ]
+        if sources:
+            dependents = fingerprints.dependents()
+            for sid in sources:
+                if any(variables[vid][2] for vid in dependents(sid) if vid in variables):
+                    return None
+
+        updates: dict[str, str] = {}
+        initial_values: dict[str, str] = {}
+        for key in changed:
+            kind, sid = key.split(":", 1)
+            if kind in ("compartment", "parameter", "species"):
+                value = self._initial_value(state, fingerprints, kind, sid, new[key][1])
+                if value is None:
+                    return None
+                if variables[sid][2]:
+                    # variables of assignment rules have no initial value
+                    initial_values[sid] = value
+            else:
+                equation_key = f"reaction:{sid}" if kind == "reaction" else f"rule:{sid}"
+                if equation_key not in state["equations"]:
+                    return None
+                ast = fingerprints.math(key)
+                if ast is None:
+                    return None
+                if kind == "rateRule":
+                    updates[equation_key] = mathml_for_diff(sid, ast, ivid=self.time_name)
+                else:
+                    updates[equation_key] = mathml_for_assignment(
+                        sid, ast, ivid=self.time_name
+                    )
+
+        for vid, value in initial_values.items():
+            variables[vid][2] = value
+        state["equations"].update(updates)
+        return changed
+
+    @staticmethod
+    def _initial_value(
+        state: dict[str, Any],
+        fingerprints: SBMLFingerprints,
+        kind: str,
+        sid: str,
+        value: Optional[str],
+    ) -> Optional[str]:
+        """CellML initial value for the changed value attribute.
+
+        None if the initial value has to be evaluated by a full conversion, e.g. for
+        initial assignments or species in amounts with concentration variables.
+        Initial values depending on the changed value are checked by `_update`.
+        """
+        if value is None or state["has_initial_assignments"]:
+            return None
+        name, value = value.split("=", 1)
+        if kind == "species":
+            attributes = fingerprints.nodes[f"species:{sid}"].attributes
+            amount = attributes.get("hasOnlySubstanceUnits") == "true"
+            if amount != (name == "initialAmount"):
+                return None
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        if math.isnan(number):
+            return None
+        variable = libcellml.Variable()
+        variable.setInitialValue(number)
+        return variable.initialValue()
+
+    def _write(self, state: dict[str, Any]) -> None:
+        """Write CellML model of the state."""
+        m_cellml = libcellml.Model(state["model_id"])
+        add_units(m_cellml)
+        component = libcellml.Component("sbml")
+        m_cellml.addComponent(component)
+        for name, units, initial_value in state["variables"]:
+            v = libcellml.Variable(name)
+            v.setUnits(units)
+            if initial_value:
+                v.setInitialValue(initial_value)
+            component.addVariable(v)
+        set_component_math(component, state["equations"].values())
+        self._write_model(m_cellml)
+
+    def _write_model(self, m_cellml: libcellml.Model) -> None:
+        """Write CellML file with the libcellml Printer.
+
+        The streaming writer reformats every equation, printing the complete
+        document is much faster for the model sizes of interactive edits.
+        """
+        with open_cellml(self.cellml_path) as f_cellml:
+            f_cellml.write(write_model_to_string(m_cellml))
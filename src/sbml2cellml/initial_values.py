@@ -0,0 +1,103 @@
+"""Initial values of SBML models.
+
+InitialAssignments and AssignmentRules are sorted topologically together with the
+values of compartments, parameters and species and evaluated once at t=0. All
+definitions are compiled into a single Python function which writes into one
+list of values, i.e. no external simulator (and no numpy) is required.
+
+Species values follow the CellML variables of the converter: amounts for species
+with `hasOnlySubstanceUnits`, concentrations otherwise.
+"""
+
+import math
+
+import libsbml
+
+from sbml2cellml.console import console
+from sbml2cellml.dependencies import ast_names, topological_sort
+from sbml2cellml.python_code import PYTHON_NAMESPACE, PythonCodeError, ast_to_python
+
+
+def evaluate_initial_values(m_sbml: libsbml.Model) -> dict[str, float]:
+    """Evaluate initial values of compartments, parameters and species at t=0.
+
+    Definitions which cannot be evaluated keep the declared value with a warning
+    naming the symbol. This includes all invalid operations, e.g. divisions by
+    zero or logarithms of zero, whether the operands are numbers or variables (see
+    `PYTHON_NAMESPACE`). Values which cannot be determined are NaN.
+    """
+    ids: list[str] = []
+    values: list[float] = []
+    definitions: dict[str, libsbml.ASTNode] = {}
+
+    c: libsbml.Compartment
+    for c in m_sbml.getListOfCompartments():
+        ids.append(c.getId())
+        values.append(c.getSize() if c.isSetSize() else math.nan)
+
+    p: libsbml.Parameter
+    for p in m_sbml.getListOfParameters():
+        ids.append(p.getId())
+        values.append(p.getValue() if p.isSetValue() else math.nan)
+
+    s: libsbml.Species
+    for s in m_sbml.getListOfSpecies():
+        sid, cid = s.getId(), s.getCompartment()
+        ids.append(sid)
+        values.append(math.nan)
+        amount_units = s.getHasOnlySubstanceUnits()
+        if s.isSetInitialAmount():
+            formula = repr(s.getInitialAmount())
+            if not amount_units:
+                formula = f"{formula} / {cid}"
+        elif s.isSetInitialConcentration():
+            formula = repr(s.getInitialConcentration())
+            if amount_units:
+                formula = f"{formula} * {cid}"
+        else:
+            continue
+        definitions[sid] = libsbml.parseL3Formula(formula)
+
+    rule: libsbml.Rule
+    for rule in m_sbml.getListOfRules():
+        if rule.getTypeCode() == libsbml.SBML_ASSIGNMENT_RULE:
+            definitions[rule.getVariable()] = rule.getMath()
+
+    assignment: libsbml.InitialAssignment
+    for assignment in m_sbml.getListOfInitialAssignments():
+        definitions[assignment.getSymbol()] = assignment.getMath()
+
+    index = {sid: k for k, sid in enumerate(ids)}
+    symbols = {sid: f"v[{k}]" for sid, k in index.items()}
+    order = topological_sort({key: ast_names(ast) for key, ast in definitions.items()})
+
+    lines = ["def initialize(v, t):"]
+    for key in order:
+        if key not in index:
+            continue
+        try:
+            expr = ast_to_python(definitions[key], symbols)
+        except PythonCodeError as err:
+            console.print(f"Initial value of '{key}' cannot be evaluated: {err}", style="warning")
+            continue
+        # invalid operations (e.g. ZeroDivisionError) keep the declared value
+        lines.extend([
+            "    try:",
+            f"        v[{index[key]}] = {expr}",
+            "    except Exception as err:",
+            f"        _failed({key!r}, err)",
+        ])
+    lines.append("    pass")
+
+    def _failed(key: str, err: Exception) -> None:
+        console.print(
+            f"Initial value of '{key}' cannot be evaluated: {type(err).__name__}: {err}",
+            style="warning",
+        )
+
+    namespace: dict = dict(PYTHON_NAMESPACE, _failed=_failed)
+    exec(compile("\n".join(lines) + "\n", "<initial values>", "exec"), namespace)
+    v = list(values)
+    namespace["initialize"](v, 0.0)
+
+    return {sid: float(v[k]) for sid, k in index.items()}
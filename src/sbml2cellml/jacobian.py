@@ -0,0 +1,567 @@
+"""Analytic sparse Jacobian of converted SBML models.
+
+The right hand sides of the converted ODEs are built from the libsbml ASTs of the
+kinetic laws, rate rules and assignment rules (analogue to `convert_sbml2cellml`).
+Reaction rates and assignment rules are kept as intermediate definitions, the
+partial derivatives are derived symbolically with the chain rule through these
+definitions. The sparsity pattern follows from the dependency graph.
+
+`generate_jacobian_code` emits Python code filling the nonzero values of the
+Jacobian (CSC order) for the state and constant ordering of a simulator. The code
+is translated into C (`JacobianCode.c_code`) and compiled like the right hand side
+of the simulator, see `NativeModel.set_jacobian`.
+"""
+
+import ast as python_ast
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import libsbml
+import numpy as np
+
+from sbml2cellml.dependencies import ast_names, topological_sort
+from sbml2cellml.python_code import (
+    RELATIONAL_OPERATORS,
+    PythonCodeError,
+    ast_to_python,
+    piecewise_code,
+)
+from sbml2cellml.stoichiometry import create_stoichiometric_matrix
+
+
+class JacobianError(PythonCodeError):
+    """Jacobian cannot be derived for the model."""
+
+    pass
+
+
+@dataclass
+class SymbolicJacobian:
+    """Symbolic Jacobian of the ODE right hand sides.
+
+    `rhs` contains the right hand side per state with reaction rates as names,
+    `definitions` the assignment rules and kinetic laws in topological order.
+    `dependencies` maps states and definitions on the states they depend on.
+    """
+
+    states: list[str]
+    rhs: dict[str, libsbml.ASTNode]
+    definitions: dict[str, libsbml.ASTNode]
+    dependencies: dict[str, set[str]]
+
+    @property
+    def nnz(self) -> int:
+        """Number of structural nonzeros."""
+        return sum(len(self.dependencies[sid]) for sid in self.states)
+
+    def sparsity(self, states: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Boolean sparsity pattern (n_states x n_states) in the given state order."""
+        states = list(states) if states is not None else self.states
+        index = {sid: k for k, sid in enumerate(states)}
+        pattern = np.zeros((len(states), len(states)), dtype=bool)
+        for sid in states:
+            for dep in self.dependencies[sid]:
+                pattern[index[sid], index[dep]] = True
+        return pattern
+
+
+def create_symbolic_jacobian(m_sbml: libsbml.Model) -> SymbolicJacobian:
+    """Create symbolic Jacobian for the ODEs of the converted SBML model.
+
+    The ASTs are copied, i.e. the Jacobian does not depend on the SBML document.
+    """
+    definitions: dict[str, libsbml.ASTNode] = {}
+    rhs: dict[str, libsbml.ASTNode] = {}
+
+    rule: libsbml.Rule
+    for rule in m_sbml.getListOfRules():
+        if rule.getTypeCode() == libsbml.SBML_ASSIGNMENT_RULE:
+            definitions[rule.getVariable()] = rule.getMath().deepCopy()
+        elif rule.getTypeCode() == libsbml.SBML_RATE_RULE:
+            rhs[rule.getVariable()] = rule.getMath().deepCopy()
+
+    r: libsbml.Reaction
+    for r in m_sbml.getListOfReactions():
+        if r.isSetKineticLaw():
+            definitions[r.getId()] = r.getKineticLaw().getMath().deepCopy()
+
+    stoichiometric_matrix = create_stoichiometric_matrix(m_sbml)
+    for sid in stoichiometric_matrix.species:
+        terms = [
+            f"({stoichiometry!r}) * {rid}"
+            for rid, stoichiometry in stoichiometric_matrix.row(sid)
+            if rid in definitions
+        ]
+        if not terms:
+            continue
+        formula = " + ".join(terms)
+        s: libsbml.Species = m_sbml.getSpecies(sid)
+        if not s.getHasOnlySubstanceUnits():
+            formula = f"({formula}) / {s.getCompartment()}"
+        rhs[sid] = libsbml.parseL3Formula(formula)
+
+    states = list(rhs.keys())
+    names = {key: ast_names(ast) for key, ast in definitions.items()}
+    order = topological_sort(names)
+
+    dependencies: dict[str, set[str]] = {}
+    state_set = set(states)
+    for key in order:
+        dependencies[key] = _variable_dependencies(names[key], state_set, dependencies)
+    for sid in states:
+        dependencies[sid] = _variable_dependencies(
+            ast_names(rhs[sid]), state_set, dependencies
+        )
+
+    return SymbolicJacobian(
+        states=states,
+        rhs=rhs,
+        definitions={key: definitions[key] for key in order},
+        dependencies=dependencies,
+    )
+
+
+def _variable_dependencies(
+    names: set[str], variables: set[str], dependencies: dict[str, set[str]]
+) -> set[str]:
+    """Variables the names depend on, directly or via dependencies."""
+    deps = names & variables
+    for name in names:
+        if name in dependencies and name not in variables:
+            deps |= dependencies[name]
+    return deps
+
+
+def read_symbolic_jacobian(sbml_path: Path) -> SymbolicJacobian:
+    """Create symbolic Jacobian from SBML file."""
+    doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(sbml_path))
+    m_sbml: libsbml.Model = doc.getModel()
+    if not m_sbml:
+        raise JacobianError("No model in SBMLDocument.")
+    return create_symbolic_jacobian(m_sbml)
+
+
+@dataclass
+class JacobianCode:
+    """Generated Jacobian code with the CSC structure of the Jacobian.
+
+    The code defines `jacobian(t, y, c, cc, data, dfdp)` which writes the nonzero
+    values of df/dy into `data` for states `y`, constants `c` and computed constants
+    `cc`. The nonzero derivatives df/dp with respect to the `parameters` are written
+    into the zero initialised array `dfdp` (n_states x n_parameters).
+    """
+
+    code: str
+    indices: np.ndarray
+    indptr: np.ndarray
+    shape: tuple[int, int]
+    parameters: list[str] = field(default_factory=list)
+
+    def compile(self) -> Callable:
+        """Compile the Python code into the jacobian function."""
+        namespace: dict = dict(NUMPY_NAMESPACE)
+        exec(compile(self.code, "<jacobian>", "exec"), namespace)
+        return namespace["jacobian"]
+
+    def c_code(self) -> str:
+        """C implementation of the jacobian function.
+
+        `void jacobian(double t, double *y, double *c, double *cc, double *data,
+        double *dfdp)` with `dfdp` in row-major order.
+        """
+        function = python_ast.parse(self.code).body[0]
+        lines = [C_HEADER, f"{C_SIGNATURE}\n{{"]
+        for statement in function.body:
+            if isinstance(statement, python_ast.Pass):
+                continue
+            target = statement.targets[0]
+            expr = _c_expr(statement.value)
+            if isinstance(target, python_ast.Name):
+                lines.append(f"    double {target.id} = {expr};")
+            elif isinstance(target.slice, python_ast.Tuple):
+                i, m = (_c_expr(index) for index in target.slice.elts)
+                lines.append(
+                    f"    {target.value.id}[{i} * {len(self.parameters)} + {m}] = {expr};"
+                )
+            else:
+                lines.append(f"    {target.value.id}[{_c_expr(target.slice)}] = {expr};")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def generate_jacobian_code(
+    jacobian: SymbolicJacobian,
+    state_names: Sequence[str],
+    constant_names: Sequence[str],
+    computed_constant_names: Sequence[str] = (),
+    parameters: Sequence[str] = (),
+) -> JacobianCode:
+    """Generate Python code for the Jacobian in the ordering of the simulator.
+
+    Names are 'component/name' as in `NativeModel`; the state names must be the
+    states of the symbolic Jacobian. `parameters` are constants for which the
+    derivatives df/dp are generated in addition.
+    """
+    states = [name.split("/", 1)[-1] for name in state_names]
+    if set(states) != set(jacobian.states):
+        raise JacobianError(
+            f"States do not match the Jacobian: {sorted(set(states) ^ set(jacobian.states))}"
+        )
+    constant_index = {name.split("/", 1)[-1]: k for k, name in enumerate(constant_names)}
+    computed_index = {
+        name.split("/", 1)[-1]: k for k, name in enumerate(computed_constant_names)
+    }
+    parameters = [name.split("/", 1)[-1] for name in parameters]
+    for pid in parameters:
+        if pid not in constant_index:
+            raise JacobianError(f"Parameter '{pid}' is not a constant.")
+
+    # differentiation variables: states followed by parameters
+    variables = states + parameters
+    variable_index = {vid: k for k, vid in enumerate(variables)}
+    n_states = len(states)
+    dependencies: dict[str, set[str]] = {}
+    for key, ast in [*jacobian.definitions.items(), *jacobian.rhs.items()]:
+        dependencies[key] = _variable_dependencies(
+            ast_names(ast), set(variables), dependencies
+        )
+
+    symbols: dict[str, str] = {}
+    for sid, k in variable_index.items():
+        if k < n_states:
+            symbols[sid] = f"y[{k}]"
+    for name, k in constant_index.items():
+        symbols.setdefault(name, f"c[{k}]")
+    for name, k in computed_index.items():
+        if not dependencies.get(name):
+            symbols.setdefault(name, f"cc[{k}]")
+
+    # intermediate definitions depending on the variables
+    definitions = [
+        key for key in jacobian.definitions
+        if key not in symbols and dependencies[key]
+    ]
+    for n, key in enumerate(definitions):
+        symbols[key] = f"v{n}"
+    # definitions only depending on constants are evaluated inline
+    constant_definitions = [
+        key for key in jacobian.definitions
+        if key not in symbols
+    ]
+    for n, key in enumerate(constant_definitions):
+        symbols[key] = f"k{n}"
+
+    values = {
+        symbols[key]: ast_to_python(jacobian.definitions[key], symbols)
+        for key in constant_definitions + definitions
+    }
+    lines: list[str] = []
+
+    # total derivatives of the definitions with respect to the variables
+    derivatives: dict[tuple[str, int], str] = {}
+    for vid, k in variable_index.items():
+        derivatives[(vid, k)] = "1.0"
+    for n, key in enumerate(definitions):
+        for dep in sorted(dependencies[key], key=variable_index.get):
+            k = variable_index[dep]
+            expr = _derivative(jacobian.definitions[key], k, symbols, derivatives)
+            if expr is not None:
+                derivatives[(key, k)] = f"d{n}_{k}"
+                lines.append(f"    d{n}_{k} = {expr}")
+
+    # nonzero entries in CSC order
+    indices: list[int] = []
+    indptr: list[int] = [0]
+    for j in range(n_states):
+        for i, sid in enumerate(states):
+            if states[j] not in dependencies[sid]:
+                continue
+            expr = _derivative(jacobian.rhs[sid], j, symbols, derivatives)
+            lines.append(f"    data[{len(indices)}] = {expr if expr else '0.0'}")
+            indices.append(i)
+        indptr.append(len(indices))
+
+    # parameter derivatives
+    for i, sid in enumerate(states):
+        for m, pid in enumerate(parameters):
+            if pid not in dependencies[sid]:
+                continue
+            expr = _derivative(jacobian.rhs[sid], n_states + m, symbols, derivatives)
+            if expr is not None:
+                lines.append(f"    dfdp[{i}, {m}] = {expr}")
+
+    # values of the definitions used by the derivatives
+    used: set[str] = set()
+    pending = lines
+    while pending:
+        names = set(_local_pattern.findall("\n".join(pending))) - used
+        used |= names
+        pending = [values[name] for name in names]
+    value_lines = [f"    {name} = {expr}" for name, expr in values.items() if name in used]
+
+    header = "def jacobian(t, y, c, cc, data, dfdp):"
+    body = value_lines + lines or ["    pass"]
+    return JacobianCode(
+        code="\n".join([header, *body]) + "\n",
+        indices=np.array(indices, dtype=np.int32),
+        indptr=np.array(indptr, dtype=np.int32),
+        shape=(n_states, n_states),
+        parameters=parameters,
+    )
+
+
+_local_pattern = re.compile(r"\b[vk]\d+\b")
+
+
+# functions of the Python code of `ast_to_python` with IEEE semantics for the solvers
+NUMPY_NAMESPACE: dict = {
+    name: getattr(np, name)
+    for name in [
+        "exp", "log", "log10", "sqrt", "abs", "sign", "floor", "ceil", "sin", "cos",
+        "tan", "sinh", "cosh", "tanh", "arcsin", "arccos", "arctan", "pi", "e", "inf",
+        "nan", "power",
+    ]
+}
+
+
+# --- C code of the generated Python code ---
+C_HEADER = """#include <math.h>
+
+static inline double sign(double x)
+{
+    return (x > 0.0) - (x < 0.0);
+}
+"""
+C_SIGNATURE = (
+    "void jacobian(double t, double *y, double *c, double *cc, double *data, "
+    "double *dfdp)"
+)
+
+_c_names: dict[str, str] = {
+    "pi": "M_PI", "e": "M_E", "inf": "INFINITY", "nan": "NAN",
+}
+_c_functions: dict[str, str] = {
+    "abs": "fabs", "arcsin": "asin", "arccos": "acos", "arctan": "atan", "power": "pow",
+}
+_c_operators: dict[type, str] = {
+    python_ast.Add: "+", python_ast.Sub: "-", python_ast.Mult: "*", python_ast.Div: "/",
+    python_ast.Eq: "==", python_ast.NotEq: "!=", python_ast.Lt: "<",
+    python_ast.LtE: "<=", python_ast.Gt: ">", python_ast.GtE: ">=",
+    python_ast.And: "&&", python_ast.Or: "||",
+}
+
+
+def _c_expr(node: python_ast.expr) -> str:
+    """C expression for an expression of the generated Python code."""
+    if isinstance(node, python_ast.Constant):
+        if isinstance(node.value, bool):
+            return "1.0" if node.value else "0.0"
+        if isinstance(node.value, int):
+            # indices
+            return str(node.value)
+        if not math.isfinite(node.value):
+            return "INFINITY" if node.value > 0 else "NAN"
+        return repr(node.value)
+    if isinstance(node, python_ast.Name):
+        return _c_names.get(node.id, node.id)
+    if isinstance(node, python_ast.Subscript):
+        return f"{node.value.id}[{_c_expr(node.slice)}]"
+    if isinstance(node, python_ast.UnaryOp):
+        op = "!" if isinstance(node.op, python_ast.Not) else "-"
+        return f"({op}{_c_expr(node.operand)})"
+    if isinstance(node, python_ast.BinOp):
+        left, right = _c_expr(node.left), _c_expr(node.right)
+        if isinstance(node.op, python_ast.Pow):
+            return f"pow({left}, {right})"
+        if isinstance(node.op, python_ast.Mod):
+            return f"fmod({left}, {right})"
+        return f"({left} {_c_operators[type(node.op)]} {right})"
+    if isinstance(node, python_ast.BoolOp):
+        op = f" {_c_operators[type(node.op)]} "
+        return f"({op.join(_c_expr(value) for value in node.values)})"
+    if isinstance(node, python_ast.Compare):
+        operands = [_c_expr(node.left), *(_c_expr(c) for c in node.comparators)]
+        return "(" + " && ".join(
+            f"{operands[k]} {_c_operators[type(op)]} {operands[k + 1]}"
+            for k, op in enumerate(node.ops)
+        ) + ")"
+    if isinstance(node, python_ast.IfExp):
+        return (
+            f"({_c_expr(node.test)} ? {_c_expr(node.body)} : {_c_expr(node.orelse)})"
+        )
+    if isinstance(node, python_ast.Call):
+        name = node.func.id
+        args = [_c_expr(arg) for arg in node.args]
+        if name == "bool":
+            return f"({args[0]} != 0.0)"
+        if name in ("min", "max"):
+            expr = args[0]
+            for arg in args[1:]:
+                expr = f"f{name}({expr}, {arg})"
+            return expr
+        return f"{_c_functions.get(name, name)}({', '.join(args)})"
+    raise JacobianError(f"No C code for '{python_ast.unparse(node)}'.")
+
+
+def _sum(terms: list[Optional[str]]) -> Optional[str]:
+    terms = [t for t in terms if t is not None]
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else f"({' + '.join(terms)})"
+
+
+def _product(*factors: Optional[str]) -> Optional[str]:
+    if any(f is None for f in factors):
+        return None
+    factors = [f for f in factors if f != "1.0"]
+    if not factors:
+        return "1.0"
+    return factors[0] if len(factors) == 1 else f"({' * '.join(factors)})"
+
+
+def _derivative(
+    ast: libsbml.ASTNode,
+    k: int,
+    symbols: dict[str, str],
+    derivatives: dict[tuple[str, int], str],
+) -> Optional[str]:
+    """Python expression for the derivative of the AST with respect to state k.
+
+    `derivatives` maps (name, k) on the expressions of the total derivatives of
+    states and definitions; None is returned for structural zeros.
+    """
+    ast_type: int = ast.getType()
+    n: int = ast.getNumChildren()
+    children = [ast.getChild(c) for c in range(n)]
+
+    def d(c: int) -> Optional[str]:
+        return _derivative(children[c], k, symbols, derivatives)
+
+    def p(c: int) -> str:
+        return ast_to_python(children[c], symbols)
+
+    if ast_type == libsbml.AST_NAME:
+        return derivatives.get((ast.getName(), k))
+
+    elif ast_type == libsbml.AST_PLUS:
+        return _sum([d(c) for c in range(n)])
+
+    elif ast_type == libsbml.AST_MINUS:
+        if n == 1:
+            dx = d(0)
+            return None if dx is None else f"(-{dx})"
+        dx, dy = d(0), d(1)
+        if dy is None:
+            return dx
+        return f"(-{dy})" if dx is None else f"({dx} - {dy})"
+
+    elif ast_type == libsbml.AST_TIMES:
+        return _sum([
+            _product(d(c), *[p(o) for o in range(n) if o != c]) for c in range(n)
+        ])
+
+    elif ast_type == libsbml.AST_DIVIDE:
+        x, y = p(0), p(1)
+        dx, dy = d(0), d(1)
+        terms = [None if dx is None else f"({dx} / {y})"]
+        if dy is not None:
+            terms.append(f"(-{x} * {dy} / ({y} * {y}))")
+        return _sum(terms)
+
+    elif ast_type in (libsbml.AST_POWER, libsbml.AST_FUNCTION_POWER):
+        x, y = p(0), p(1)
+        dx, dy = d(0), d(1)
+        terms = [_product(y, f"power({x}, {y} - 1.0)", dx)]
+        if dy is not None:
+            terms.append(_product(f"power({x}, {y})", f"log({x})", dy))
+        return _sum(terms)
+
+    elif ast_type == libsbml.AST_FUNCTION_ROOT:
+        degree = p(0) if n == 2 else "2.0"
+        if n == 2 and d(0) is not None:
+            raise JacobianError("Root with variable degree is not supported.")
+        x = p(n - 1)
+        return _product(f"(power({x}, 1.0 / {degree} - 1.0) / {degree})", d(n - 1))
+
+    elif ast_type == libsbml.AST_FUNCTION_EXP:
+        return _product(f"exp({p(0)})", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_LN:
+        dx = d(0)
+        return None if dx is None else f"({dx} / {p(0)})"
+
+    elif ast_type == libsbml.AST_FUNCTION_LOG:
+        if n == 2 and d(0) is not None:
+            raise JacobianError("Logarithm with variable base is not supported.")
+        base = "log(10.0)" if n == 1 else f"log({p(0)})"
+        dx = d(n - 1)
+        return None if dx is None else f"({dx} / ({p(n - 1)} * {base}))"
+
+    elif ast_type == libsbml.AST_FUNCTION_ABS:
+        return _product(f"sign({p(0)})", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_SIN:
+        return _product(f"cos({p(0)})", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_COS:
+        dx = d(0)
+        return None if dx is None else f"(-sin({p(0)}) * {dx})"
+
+    elif ast_type == libsbml.AST_FUNCTION_TAN:
+        return _product(f"(1.0 / cos({p(0)}) ** 2)", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_SINH:
+        return _product(f"cosh({p(0)})", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_COSH:
+        return _product(f"sinh({p(0)})", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_TANH:
+        return _product(f"(1.0 / cosh({p(0)}) ** 2)", d(0))
+
+    elif ast_type == libsbml.AST_FUNCTION_PIECEWISE:
+        values = [c for c in range(0, n - 1, 2)] + ([n - 1] if n % 2 else [])
+        dvalues = {c: d(c) for c in values}
+        if all(dv is None for dv in dvalues.values()):
+            return None
+        args = [
+            (dvalues[c] or "0.0") if c in dvalues else p(c) for c in range(n)
+        ]
+        return piecewise_code(args)
+
+    elif ast_type in (libsbml.AST_FUNCTION_MIN, libsbml.AST_FUNCTION_MAX):
+        dargs = [d(c) for c in range(n)]
+        if all(dx is None for dx in dargs):
+            return None
+        op = "<=" if ast_type == libsbml.AST_FUNCTION_MIN else ">="
+        args: list[str] = []
+        for c in range(n - 1):
+            condition = " and ".join(f"{p(c)} {op} {p(o)}" for o in range(n) if o != c)
+            args.extend([dargs[c] or "0.0", f"({condition})"])
+        args.append(dargs[n - 1] or "0.0")
+        return piecewise_code(args)
+
+    elif ast_type in (
+        libsbml.AST_FUNCTION_FLOOR,
+        libsbml.AST_FUNCTION_CEILING,
+        libsbml.AST_LOGICAL_AND,
+        libsbml.AST_LOGICAL_OR,
+        libsbml.AST_LOGICAL_NOT,
+        libsbml.AST_LOGICAL_XOR,
+        *RELATIONAL_OPERATORS,
+    ):
+        # piecewise constant
+        return None
+
+    elif n == 0:
+        # numbers, constants and time
+        ast_to_python(ast, symbols)
+        return None
+
+    raise JacobianError(
+        f"Derivative of '{libsbml.formulaToL3String(ast)}' is not supported "
+        f"(ASTNode type '{ast_type}')."
+    )
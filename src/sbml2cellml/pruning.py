@@ -0,0 +1,136 @@
+"""Dead-equation elimination for the SBML to CellML conversion.
+
+The variable dependency graph of an SBML model is created from the assignment
+rules, rate rules and kinetic laws. Only variables reachable from the ODE states
+(species changed by reactions and rate rule variables) and the selected outputs
+are required for the simulation; all other compartments, parameters, species and
+assignment rules can be removed from the CellML model.
+"""
+
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Optional, Sequence
+
+import libsbml
+from rich.table import Table
+
+from sbml2cellml.dependencies import ast_names
+
+
+@dataclass
+class PruningReport:
+    """Variables kept and removed by the pruning.
+
+    `removed` maps the kind of the SBML element ('compartment', 'parameter',
+    'species', 'assignment rule') to the removed ids.
+    """
+
+    kept: set[str]
+    removed: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def n_removed(self) -> int:
+        return sum(len(ids) for ids in self.removed.values())
+
+    def table(self) -> Table:
+        """Removed elements as rich table."""
+        table = Table(title=f"Pruning: {self.n_removed} elements removed")
+        table.add_column("kind")
+        table.add_column("removed")
+        table.add_column("ids")
+        for kind, ids in self.removed.items():
+            table.add_row(kind, str(len(ids)), ", ".join(ids))
+        return table
+
+
+def state_variables(m_sbml: libsbml.Model) -> list[str]:
+    """Ids of the ODE states, i.e. species changed by reactions and rate rules."""
+    states: list[str] = []
+    r: libsbml.Reaction
+    for r in m_sbml.getListOfReactions():
+        if not r.isSetKineticLaw():
+            continue
+        for sref in list(r.getListOfReactants()) + list(r.getListOfProducts()):
+            if sref.getSpecies() not in states:
+                states.append(sref.getSpecies())
+    rule: libsbml.Rule
+    for rule in m_sbml.getListOfRules():
+        if rule.getTypeCode() == libsbml.SBML_RATE_RULE and rule.getVariable() not in states:
+            states.append(rule.getVariable())
+    return states
+
+
+def dependency_graph(m_sbml: libsbml.Model) -> dict[str, set[str]]:
+    """Variables every variable depends on via rules and kinetic laws.
+
+    Species depend on their compartment (concentrations) and on the kinetic laws
+    of their reactions; InitialAssignments are evaluated at conversion time and
+    do not create dependencies.
+    """
+    graph: dict[str, set[str]] = {}
+    rule: libsbml.Rule
+    for rule in m_sbml.getListOfRules():
+        if rule.getTypeCode() in (libsbml.SBML_ASSIGNMENT_RULE, libsbml.SBML_RATE_RULE):
+            graph.setdefault(rule.getVariable(), set()).update(ast_names(rule.getMath()))
+
+    s: libsbml.Species
+    for s in m_sbml.getListOfSpecies():
+        if not s.getHasOnlySubstanceUnits():
+            graph.setdefault(s.getId(), set()).add(s.getCompartment())
+
+    r: libsbml.Reaction
+    for r in m_sbml.getListOfReactions():
+        if not r.isSetKineticLaw():
+            continue
+        names = ast_names(r.getKineticLaw().getMath())
+        for sref in list(r.getListOfReactants()) + list(r.getListOfProducts()):
+            graph.setdefault(sref.getSpecies(), set()).update(names)
+    return graph
+
+
+def prune_variables(
+    m_sbml: libsbml.Model, outputs: Optional[Sequence[str]] = None
+) -> PruningReport:
+    """Find the variables required for the states and outputs of the model.
+
+    `outputs` are ids or glob patterns of additional variables to keep, e.g.
+    assignment rules which should be available in the results. Raises KeyError
+    for outputs which do not match any variable.
+    """
+    elements: dict[str, list[str]] = {
+        "compartment": [c.getId() for c in m_sbml.getListOfCompartments()],
+        "parameter": [p.getId() for p in m_sbml.getListOfParameters()],
+        "species": [s.getId() for s in m_sbml.getListOfSpecies()],
+    }
+    variables = [sid for ids in elements.values() for sid in ids]
+
+    roots = state_variables(m_sbml)
+    if outputs:
+        unmatched = []
+        for pattern in outputs:
+            matches = [sid for sid in variables if fnmatchcase(sid, pattern)]
+            if not matches:
+                unmatched.append(pattern)
+            roots.extend(matches)
+        if unmatched:
+            raise KeyError(f"No variables found for outputs: {unmatched}")
+
+    graph = dependency_graph(m_sbml)
+    kept: set[str] = set()
+    stack = list(roots)
+    while stack:
+        sid = stack.pop()
+        if sid in kept:
+            continue
+        kept.add(sid)
+        stack.extend(graph.get(sid, ()))
+
+    removed = {
+        kind: [sid for sid in ids if sid not in kept] for kind, ids in elements.items()
+    }
+    removed["assignment rule"] = [
+        rule.getVariable() for rule in m_sbml.getListOfRules()
+        if rule.getTypeCode() == libsbml.SBML_ASSIGNMENT_RULE
+        and rule.getVariable() not in kept
+    ]
+    return PruningReport(kept=kept, removed=removed)
@@ -0,0 +1,155 @@
+"""Python code for libsbml ASTs.
+
+`ast_to_python` translates the math of SBML models into Python expressions which
+are compiled with `exec`, e.g. for the evaluation of initial values and the
+analytic Jacobian. The functions of the expressions are defined in
+`PYTHON_NAMESPACE` based on the `math` module, i.e. invalid operations (division by
+zero, logarithms of zero, ...) raise exceptions. Only libsbml is imported, so that
+the conversion does not load numpy.
+"""
+
+import math
+
+import libsbml
+
+
+class PythonCodeError(ValueError):
+    """AST cannot be translated into Python code."""
+
+    pass
+
+
+def _sign(x: float) -> float:
+    return math.copysign(1.0, x) if x else 0.0
+
+
+PYTHON_NAMESPACE: dict = {
+    "exp": math.exp,
+    "log": math.log,
+    "log10": math.log10,
+    "sqrt": math.sqrt,
+    "abs": abs,
+    "sign": _sign,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "sinh": math.sinh,
+    "cosh": math.cosh,
+    "tanh": math.tanh,
+    "arcsin": math.asin,
+    "arccos": math.acos,
+    "arctan": math.atan,
+    "pi": math.pi,
+    "e": math.e,
+    "inf": math.inf,
+    "nan": math.nan,
+    "power": math.pow,
+}
+
+_functions: dict[int, str] = {
+    libsbml.AST_FUNCTION_EXP: "exp",
+    libsbml.AST_FUNCTION_LN: "log",
+    libsbml.AST_FUNCTION_ABS: "abs",
+    libsbml.AST_FUNCTION_FLOOR: "floor",
+    libsbml.AST_FUNCTION_CEILING: "ceil",
+    libsbml.AST_FUNCTION_SIN: "sin",
+    libsbml.AST_FUNCTION_COS: "cos",
+    libsbml.AST_FUNCTION_TAN: "tan",
+    libsbml.AST_FUNCTION_SINH: "sinh",
+    libsbml.AST_FUNCTION_COSH: "cosh",
+    libsbml.AST_FUNCTION_TANH: "tanh",
+    libsbml.AST_FUNCTION_ARCSIN: "arcsin",
+    libsbml.AST_FUNCTION_ARCCOS: "arccos",
+    libsbml.AST_FUNCTION_ARCTAN: "arctan",
+}
+
+RELATIONAL_OPERATORS: dict[int, str] = {
+    libsbml.AST_RELATIONAL_EQ: "==",
+    libsbml.AST_RELATIONAL_NEQ: "!=",
+    libsbml.AST_RELATIONAL_LT: "<",
+    libsbml.AST_RELATIONAL_GT: ">",
+    libsbml.AST_RELATIONAL_LEQ: "<=",
+    libsbml.AST_RELATIONAL_GEQ: ">=",
+}
+
+
+def ast_to_python(ast: libsbml.ASTNode, symbols: dict[str, str]) -> str:
+    """Python expression for the AST.
+
+    `symbols` maps the names on Python expressions, the code is evaluated in
+    `PYTHON_NAMESPACE` (or a namespace with the same names) with the time `t`.
+    """
+    ast_type: int = ast.getType()
+    n: int = ast.getNumChildren()
+    args = [ast_to_python(ast.getChild(k), symbols) for k in range(n)]
+
+    if ast_type == libsbml.AST_NAME:
+        name = ast.getName()
+        if name not in symbols:
+            raise PythonCodeError(f"Unknown symbol '{name}'.")
+        return symbols[name]
+    elif ast_type in (libsbml.AST_REAL, libsbml.AST_REAL_E, libsbml.AST_RATIONAL):
+        return repr(ast.getReal())
+    elif ast_type == libsbml.AST_INTEGER:
+        return f"{ast.getInteger()}.0"
+    elif ast_type == libsbml.AST_NAME_TIME:
+        return "t"
+    elif ast_type == libsbml.AST_NAME_AVOGADRO:
+        return "6.02214076e23"
+    elif ast_type == libsbml.AST_CONSTANT_E:
+        return "e"
+    elif ast_type == libsbml.AST_CONSTANT_PI:
+        return "pi"
+    elif ast_type == libsbml.AST_CONSTANT_TRUE:
+        return "True"
+    elif ast_type == libsbml.AST_CONSTANT_FALSE:
+        return "False"
+    elif ast_type == libsbml.AST_PLUS:
+        return f"({' + '.join(args)})" if args else "0.0"
+    elif ast_type == libsbml.AST_TIMES:
+        return f"({' * '.join(args)})" if args else "1.0"
+    elif ast_type == libsbml.AST_MINUS:
+        return f"(-{args[0]})" if n == 1 else f"({args[0]} - {args[1]})"
+    elif ast_type == libsbml.AST_DIVIDE:
+        return f"({args[0]} / {args[1]})"
+    elif ast_type in (libsbml.AST_POWER, libsbml.AST_FUNCTION_POWER):
+        return f"power({args[0]}, {args[1]})"
+    elif ast_type == libsbml.AST_FUNCTION_ROOT:
+        degree = args[0] if n == 2 else "2.0"
+        return f"power({args[-1]}, 1.0 / {degree})"
+    elif ast_type == libsbml.AST_FUNCTION_LOG:
+        return f"log10({args[0]})" if n == 1 else f"(log({args[1]}) / log({args[0]}))"
+    elif ast_type in _functions:
+        return f"{_functions[ast_type]}({args[0]})"
+    elif ast_type in (libsbml.AST_FUNCTION_MIN, libsbml.AST_FUNCTION_MAX):
+        f = "min" if ast_type == libsbml.AST_FUNCTION_MIN else "max"
+        return f"{f}({', '.join(args)})"
+    elif ast_type in RELATIONAL_OPERATORS:
+        op = f" {RELATIONAL_OPERATORS[ast_type]} "
+        return "(" + " and ".join(
+            f"{args[k]}{op}{args[k + 1]}" for k in range(n - 1)
+        ) + ")"
+    elif ast_type == libsbml.AST_LOGICAL_AND:
+        return f"({' and '.join(args)})"
+    elif ast_type == libsbml.AST_LOGICAL_OR:
+        return f"({' or '.join(args)})"
+    elif ast_type == libsbml.AST_LOGICAL_NOT:
+        return f"(not {args[0]})"
+    elif ast_type == libsbml.AST_LOGICAL_XOR:
+        return f"(({' + '.join(f'bool({a})' for a in args)}) % 2 == 1)"
+    elif ast_type == libsbml.AST_FUNCTION_PIECEWISE:
+        return piecewise_code(args)
+
+    raise PythonCodeError(
+        f"'{libsbml.formulaToL3String(ast)}' is not supported (ASTNode type '{ast_type}')."
+    )
+
+
+def piecewise_code(args: list[str]) -> str:
+    """Conditional expression for piecewise(value, condition, ..., otherwise)."""
+    expr = args[-1] if len(args) % 2 else "nan"
+    for k in range(len(args) - 2 - len(args) % 2, -1, -2):
+        expr = f"({args[k]} if {args[k + 1]} else {expr})"
+    return expr
@@ -1,119 +1,241 @@
-"""CellML simulator using libopencor."""
+"""CellML simulator using libopencor.
 
+libopencor is imported when the first simulator is created; plotting is in
+`sbml2cellml.simulator.plotting`.
+"""
+
+from __future__ import annotations
+
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import Any, Tuple
+from typing import TYPE_CHECKING, Optional, Sequence
 
-from libsedml import SedDocument
-from matplotlib import pyplot as plt
+from sbml2cellml.console import console
+from sbml2cellml.simulator.names import has_name, variable_index
+from sbml2cellml.simulator.timecourse import TimecourseResult
 
-import libopencor
-import pandas as pd
-from sbmlutils.console import console
+if TYPE_CHECKING:
+    import libopencor
 
 
-def plot_cellml_timecourse(df: pd.DataFrame, units: dict[str, str]) -> None:
-    """Plot the results of the timecourse integration."""
-    fig, ax = plt.subplots(nrows=1, ncols=1)
-    columns = df.columns
+class CellMLSimulationError(RuntimeError):
+    """Error in loading or simulating a CellML model with libopencor."""
 
-    # independent variable
-    voi_name = columns[0]
-    voi = df[voi_name]
+    pass
 
-    # plot all dependent variables
-    for name in columns[1:]:
-        y = df[name]
-        ax.plot(voi, y, label=f"{name}[{units[name]}]")
 
-    ax.set_xlabel(f"voi ({voi_name}) [{units[voi_name]}]")
-    ax.set_ylabel('states')
-    ax.legend()
+def _check_issues(title: str, item) -> None:
+    """Print warnings and raise errors of libopencor item."""
+    for warning in item.warnings:
+        console.print(f"{title}: {warning.description}", style="warning")
+    if item.has_errors:
+        raise CellMLSimulationError(f"{title}: {item.errors[0].description}")
 
-    plt.show()
 
-def run_cellml_timecourse(cellml_path: Path, start: float=0, end: float = 100, steps: int = 100) -> Tuple[pd.DataFrame, dict[str, str]]:
-    """Runs cellml uniform timecourse.
+class CellMLSimulator:
+    """Simulator session for a CellML model.
 
-    Returns pandas data frame with the timecourse and a dictionary with the units.
+    The libopencor file, SED-ML document and instance are created once and reused
+    for repeated simulations, e.g. in fitting loops. Initial values and parameters
+    are set via changes of the SED-ML model which are applied on every run.
+    """
+
+    def __init__(self, cellml_path: Path):
+        import libopencor
+
+        self.cellml_path = Path(cellml_path)
+        self.file = libopencor.File(str(cellml_path))
+        _check_issues("File", self.file)
+
+        self.document = libopencor.SedDocument(self.file)
+        _check_issues("Document", self.document)
+        self.model: libopencor.SedModel = self.document.models[0]
+        self.simulation: libopencor.SedUniformTimeCourse = self.document.simulations[0]
+
+        self.instance: libopencor.SedInstance = self.document.instantiate()
+        _check_issues("Instance", self.instance)
+        self.instance_task: libopencor.SedInstanceTask = self.instance.tasks[0]
+
+        self._changes: dict[tuple[str, str], float] = {}
+        self._selections: dict[Optional[tuple[str, ...]], list[tuple[str, int]]] = {}
+
+    def _names(self, kind: str) -> list[str]:
+        """Names 'component/variable' of states or constants."""
+        task = self.instance_task
+        count = getattr(task, f"{kind}_count")
+        return [getattr(task, f"{kind}_name")(k) for k in range(count)]
+
+    def _resolve(self, name: str, kind: str) -> tuple[str, str]:
+        """Component and variable for 'component/variable' or unique 'variable'."""
+        names = self._names(kind)
+        component, variable = names[variable_index(names, name)].split("/", 1)
+        return component, variable
+
+    def _apply_changes(self) -> None:
+        import libopencor
+
+        self.model.remove_all_changes()
+        for (component, variable), value in self._changes.items():
+            self.model.add_change(
+                libopencor.SedChangeAttribute(component, variable, repr(float(value)))
+            )
+
+    def reset(self) -> None:
+        """Reset initial values and parameters to the values of the model."""
+        self._changes.clear()
+        self.model.remove_all_changes()
+
+    def set_initial_values(self, values: dict[str, float]) -> None:
+        """Set initial values of states by name."""
+        for name, value in values.items():
+            self._changes[self._resolve(name, kind="state")] = value
+        self._apply_changes()
+
+    def set_parameters(self, values: dict[str, float]) -> None:
+        """Set constants by name."""
+        for name, value in values.items():
+            self._changes[self._resolve(name, kind="constant")] = value
+        self._apply_changes()
+
+    def set_values(self, values: dict[str, float]) -> None:
+        """Set initial values of states and constants by name."""
+        state_names = self._names("state")
+        states = {k: v for k, v in values.items() if has_name(state_names, k)}
+        self.set_initial_values(states)
+        self.set_parameters({k: v for k, v in values.items() if k not in states})
+
+    def get_changes(self) -> dict[str, float]:
+        """Initial values and parameters set on the simulator by 'component/variable'."""
+        return {f"{component}/{variable}": value
+                for (component, variable), value in self._changes.items()}
+
+    def restore_changes(self, changes: dict[str, float]) -> None:
+        """Replace all initial values and parameters, e.g. by `get_changes`."""
+        self.reset()
+        self.set_values(changes)
+
+    def final_states(self) -> dict[str, float]:
+        """States by 'component/variable' at the end of the last simulation."""
+        task = self.instance_task
+        return {task.state_name(k): float(task.state(k)[-1]) for k in range(task.state_count)}
+
+    def simulate(
+        self,
+        start: float = 0,
+        end: float = 100,
+        steps: int = 100,
+        outputs: Optional[Sequence[str]] = None,
+    ) -> TimecourseResult:
+        """Run uniform timecourse with steps intervals from start to end.
+
+        Returns the timecourse of the selected outputs (default: all states) with
+        the units, see `select_outputs`.
+        """
+        self.simulation.initial_time = start
+        self.simulation.output_start_time = start
+        self.simulation.output_end_time = end
+        self.simulation.number_of_steps = steps
+
+        self.instance.run()
+        _check_issues("Instance running", self.instance)
+
+        key = None if outputs is None else tuple(outputs)
+        if key not in self._selections:
+            self._selections[key] = select_outputs(self.instance_task, outputs)
+        return _task_results(self.instance_task, self._selections[key])
+
+
+OUTPUT_KINDS: list[str] = [
+    "state", "rate", "constant", "computed_constant", "algebraic_variable"
+]
+
+
+def select_outputs(
+    instance_task: libopencor.SedInstanceTask, outputs: Optional[Sequence[str]] = None
+) -> list[tuple[str, int]]:
+    """Select variables (kind, index) of the task by name patterns.
+
+    Patterns are glob patterns (e.g. 'Cve_gli', 'Mre_*', 'sbml/*') matched against
+    'component/name' and 'name' of all states, rates (names ending in "'"),
+    constants, computed constants and algebraic variables. Without outputs all
+    states are selected. Variables are returned in model order.
+    """
+    if outputs is None:
+        return [("state", k) for k in range(instance_task.state_count)]
+
+    selection: list[tuple[str, int]] = []
+    matched: set[str] = set()
+    for kind in OUTPUT_KINDS:
+        name_f = getattr(instance_task, f"{kind}_name")
+        for k in range(getattr(instance_task, f"{kind}_count")):
+            name = name_f(k)
+            short_name = name.split("/", 1)[-1]
+            patterns = [
+                p for p in outputs if fnmatchcase(name, p) or fnmatchcase(short_name, p)
+            ]
+            if patterns:
+                selection.append((kind, k))
+                matched.update(patterns)
+
+    unmatched = [p for p in outputs if p not in matched]
+    if unmatched:
+        raise KeyError(f"No variables found for outputs: {unmatched}")
+    return selection
+
+
+def _task_results(
+    instance_task: libopencor.SedInstanceTask, selection: list[tuple[str, int]]
+) -> TimecourseResult:
+    """Timecourse of the selected variables and units of the task.
+
+    Only the selected task buffers are copied into the contiguous result array.
     """
-    # load model
-    file = libopencor.File(str(cellml_path))
-    if len(file.issues) != 0:
-        console.print(file.issues[0].description)
-    else:
-        console.print('File: all good!')
-
-    # SED-ML document
-    document = libopencor.SedDocument(file)
-    if len(document.issues) != 0:
-        print(document.issues[0].description)
-    else:
-        print('Document: all good!')
-
-    # Modify the timecourse settings of the simulation
-    simulation: libopencor.SedUniformTimeCourse = libopencor.SedUniformTimeCourse(document)
-
-    # FIXME: this is not working
-    simulation.initial_time = start
-    simulation.output_start_time = start
-    simulation.output_end_time = end
-    simulation.number_of_steps = steps
-
-    instance: SedDocument = document.instantiate()
-    if len(instance.issues) != 0:
-        print(instance.issues[0].description)
-    else:
-        print('Instance: all good!')
-
-    # run simulation based on simulation experiment description
-    instance.run()
-    if len(instance.issues) != 0:
-        print(instance.issues[0].description)
-    else:
-        print('Instance running: all good!')
-
-    # get access to task results
-    instance_task: libopencor.SedInstanceTask = instance.tasks[0]
-
-    # access to variable of integration
-    voi: list[float] = instance_task.voi  # variable of integration
     voi_name = instance_task.voi_name
-    voi_unit = instance_task.voi_unit
+    names: list[str] = [voi_name]
+    units: dict[str, str] = {voi_name: instance_task.voi_unit}
+    for kind, k in selection:
+        name = getattr(instance_task, f"{kind}_name")(k)
+        names.append(name)
+        units[name] = getattr(instance_task, f"{kind}_unit")(k)
 
-    # access state variables
-    # FIXME: how to get access to ids
-    n_state = instance_task.state_count
-    data_dict: dict[str, Any] = {
-        voi_name: voi,
-    }
-    units: dict[str, str] = {
-        voi_name: voi_unit,
-    }
+    voi = instance_task.voi  # variable of integration
+    result = TimecourseResult.empty(n_time=len(voi), names=names, units=units)
+    result.data[:, 0] = voi
+    for column, (kind, k) in enumerate(selection, start=1):
+        result.data[:, column] = getattr(instance_task, kind)(k)
 
-    # add all the dependent variables
-    for k in range(n_state):
-        name = instance_task.state_name(k)
-        data_dict[name] = instance_task.state(k)
-        units[name] = instance_task.state_unit(k)
+    return result
 
-    return pd.DataFrame(data_dict), units
+
+def run_cellml_timecourse(cellml_path: Path, start: float=0, end: float = 100, steps: int = 100, outputs: Optional[Sequence[str]] = None) -> TimecourseResult:
+    """Runs cellml uniform timecourse.
+
+    Returns the timecourse of the outputs (default: all states) with the units,
+    see `select_outputs` and `TimecourseResult.to_pandas`.
+    For repeated simulations of a model use a `CellMLSimulator` session.
+    """
+    simulator = CellMLSimulator(cellml_path)
+    return simulator.simulate(start=start, end=end, steps=steps, outputs=outputs)
 
 
 if __name__ == "__main__":
+    from sbml2cellml.simulator.plotting import plot_cellml_timecourse
+
     # cellml_path="test_model.cellml"
     cellml_path = "glimepiride_kidney.cellml"
 
     # simulation
-    df, units = run_cellml_timecourse(
+    result = run_cellml_timecourse(
         cellml_path=cellml_path,
         start=0,
         end=200,
         steps=20,
     )
+    df = result.to_pandas()
     console.rule("results", style="white")
     console.print(df)
     console.rule(style="white")
 
     # plotting
-    plot_cellml_timecourse(df=df, units=units)
+    plot_cellml_timecourse(df=df, units=result.units)
 
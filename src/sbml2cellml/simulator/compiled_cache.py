@@ -0,0 +1,133 @@
+"""Persistent cache of compiled CellML models.
+
+Shared libraries are stored by the SHA-256 of the generated C code, the compiler
+and the compiler flags. A second index maps the hash of the CellML source to the
+code hash, so warm starts of an already seen model skip code generation and
+compilation. Compilation is guarded by a file lock and libraries are moved into
+place atomically, so the cache can be used from several worker processes.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import libcellml
+
+from sbml2cellml.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE, ConversionCache
+from sbml2cellml.simulator.native_simulator import (
+    CFLAGS,
+    compile_c_code,
+    generate_c_code,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, windows
+    fcntl = None
+
+
+def _compiler() -> str:
+    return os.environ.get("CC", "cc")
+
+
+def _sha256(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock on path (no locking without fcntl)."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CompiledModelCache(ConversionCache):
+    """Size-bounded LRU cache of compiled shared libraries."""
+
+    suffix = ".so"
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_size: int = DEFAULT_MAX_SIZE):
+        if cache_dir is None:
+            cache_dir = DEFAULT_CACHE_DIR / "compiled"
+        super().__init__(cache_dir=cache_dir, max_size=max_size)
+
+    def model_key(self, source: str) -> str:
+        """Key of the CellML source for the current compiler and flags."""
+        return _sha256(source, libcellml.versionString(), _compiler(), *CFLAGS)
+
+    def code_key(self, interface_code: str, implementation_code: str) -> str:
+        """Key of the generated code for the current compiler and flags."""
+        return _sha256(interface_code, implementation_code, _compiler(), *CFLAGS)
+
+    def library_path(
+        self,
+        analyser_model: libcellml.AnalyserModel,
+        source: str,
+    ) -> Path:
+        """Get path of compiled library for the model, compiling it if necessary.
+
+        `source` is the CellML source of the analysed model.
+        """
+        index_path = self.cache_dir / f"{self.model_key(source)}.key"
+        try:
+            library_path = self._path(index_path.read_text().strip())
+            if library_path.exists():
+                os.utime(library_path)
+                return library_path
+        except FileNotFoundError:
+            pass
+
+        interface_code, implementation_code = generate_c_code(analyser_model)
+        library_path = self.compiled_library(interface_code, implementation_code)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(library_path.stem)
+        os.replace(tmp_path, index_path)
+        return library_path
+
+    def compiled_library(self, interface_code: str, implementation_code: str) -> Path:
+        """Get path of the compiled library for C code, compiling it if necessary."""
+        code_key = self.code_key(interface_code, implementation_code)
+        library_path = self._path(code_key)
+        with _file_lock(self.cache_dir / f"{code_key}.lock"):
+            if library_path.exists():
+                os.utime(library_path)
+                return library_path
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            try:
+                compile_c_code(interface_code, implementation_code, Path(tmp_path))
+                os.replace(tmp_path, library_path)
+            finally:
+                Path(tmp_path).unlink(missing_ok=True)
+
+        self._written(library_path)
+        return library_path
+
+    def evict(self, keep: Optional[Path] = None) -> list[Path]:
+        """Remove least recently used libraries and their locks (see `ConversionCache`)."""
+        removed = super().evict(keep=keep)
+        for path in removed:
+            path.with_suffix(".lock").unlink(missing_ok=True)
+        return removed
+
+    def clear(self) -> None:
+        """Remove all libraries and index entries."""
+        super().clear()
+        for pattern in ["*.key", "*.lock"]:
+            for path in self.cache_dir.glob(pattern):
+                path.unlink(missing_ok=True)
@@ -0,0 +1,200 @@
+"""Ensemble simulations of CellML models with libopencor.
+
+Monte Carlo samples of parameters and initial values are distributed in chunks
+over worker processes. Every worker instantiates the model once as a
+`CellMLSimulator` session and reuses it for all samples of its chunks. Results are
+written in the order of the samples into an array allocated for the layout of the
+first successful sample, failed samples (e.g. solver failures) are NaN and
+reported with their error message.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+from rich.progress import Progress
+
+from sbml2cellml.console import console
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator
+from sbml2cellml.simulator.names import variable_index
+from sbml2cellml.simulator.timecourse import TimecourseResult
+
+# simulator session of the worker process
+_simulator: Optional[CellMLSimulator] = None
+
+
+@dataclass
+class EnsembleResult:
+    """Result of an ensemble simulation.
+
+    `data` has the shape (n_samples, n_time, n_outputs), rows of failed samples
+    are NaN.
+    """
+
+    time: np.ndarray
+    data: np.ndarray
+    names: list[str]
+    units: dict[str, str]
+    samples: list[dict[str, float]]
+    errors: dict[int, str] = field(default_factory=dict)
+    time_units: str = ""
+
+    @property
+    def failed(self) -> list[int]:
+        """Indices of the failed samples."""
+        return sorted(self.errors)
+
+    @property
+    def success(self) -> np.ndarray:
+        """Boolean mask of the successful samples."""
+        mask = np.ones(len(self.samples), dtype=bool)
+        mask[self.failed] = False
+        return mask
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Values (n_samples, n_time) of output by 'component/name' or 'name'."""
+        return self.data[:, :, variable_index(self.names, name)]
+
+
+def ensemble_samples(
+    samples: Union[dict[str, Sequence[float]], Sequence[dict[str, float]]],
+) -> list[dict[str, float]]:
+    """Samples of the ensemble.
+
+    A dictionary of equally long value sequences (e.g. sampled arrays) is split
+    into one dictionary per sample, a sequence of dictionaries is used as is.
+    """
+    if isinstance(samples, dict):
+        sizes = {len(values) for values in samples.values()}
+        if len(sizes) > 1:
+            raise ValueError(f"Sampled values have different lengths: {sizes}")
+        return [
+            {name: float(v) for name, v in zip(samples.keys(), values)}
+            for values in zip(*samples.values())
+        ]
+    return [dict(values) for values in samples]
+
+
+def _init_worker(cellml_path: Path) -> None:
+    global _simulator
+    _simulator = CellMLSimulator(cellml_path)
+
+
+def _simulate_chunk(
+    chunk: list[tuple[int, dict[str, float]]],
+    start: float,
+    end: float,
+    steps: int,
+    outputs: Optional[Sequence[str]],
+    simulator: Optional[CellMLSimulator] = None,
+) -> list[tuple[int, Optional[TimecourseResult], Optional[str]]]:
+    """Simulate samples with the given session or the session of the worker."""
+    simulator = simulator or _simulator
+    results = []
+    for k, values in chunk:
+        simulator.reset()
+        try:
+            simulator.set_values(values)
+            result = simulator.simulate(
+                start=start, end=end, steps=steps, outputs=outputs
+            )
+            results.append((k, result, None))
+        except Exception as err:
+            results.append((k, None, str(err)))
+    return results
+
+
+def run_ensemble(
+    cellml_path: Path,
+    samples: Union[dict[str, Sequence[float]], Sequence[dict[str, float]]],
+    start: float = 0,
+    end: float = 100,
+    steps: int = 100,
+    outputs: Optional[Sequence[str]] = None,
+    processes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    show_progress: bool = True,
+) -> EnsembleResult:
+    """Run timecourses for all samples of parameters and initial values.
+
+    Keys of the samples are constants or states ('component/name' or 'name'),
+    `outputs` selects the recorded variables (see `select_outputs`). Failed
+    samples do not abort the ensemble but are listed in `EnsembleResult.errors`;
+    the layout of the results is taken from the first successful sample (empty
+    `time` and `names` if all samples fail).
+    """
+    cellml_path = Path(cellml_path)
+    sample_list = ensemble_samples(samples)
+    n_samples = len(sample_list)
+
+    # layout of the results from the first successful simulation
+    result = EnsembleResult(
+        time=np.empty(0),
+        data=np.full((n_samples, 0, 0), np.nan),
+        names=[],
+        units={},
+        samples=sample_list,
+    )
+
+    processes = min(processes or os.cpu_count() or 1, max(n_samples, 1))
+    chunk_size = chunk_size or max(1, n_samples // (4 * processes))
+    items = list(enumerate(sample_list))
+    chunks = [items[k : k + chunk_size] for k in range(0, n_samples, chunk_size)]
+
+    with Progress(console=console, disable=not show_progress) as progress:
+        task = progress.add_task("ensemble", total=n_samples)
+        if processes == 1:
+            simulator = CellMLSimulator(cellml_path)
+            for chunk in chunks:
+                chunk_results = _simulate_chunk(
+                    chunk, start, end, steps, outputs, simulator=simulator
+                )
+                _collect(chunk_results, result)
+                progress.advance(task, len(chunk_results))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=processes, initializer=_init_worker, initargs=(cellml_path,)
+            ) as executor:
+                futures = {
+                    executor.submit(
+                        _simulate_chunk, chunk, start, end, steps, outputs
+                    ): chunk
+                    for chunk in chunks
+                }
+                for future in as_completed(futures):
+                    try:
+                        chunk_results = future.result()
+                    except Exception as err:
+                        # crashed worker process
+                        chunk_results = [(k, None, str(err)) for k, _ in futures[future]]
+                    _collect(chunk_results, result)
+                    progress.advance(task, len(chunk_results))
+
+    if result.errors:
+        console.print(
+            f"{len(result.errors)}/{n_samples} simulations failed.", style="warning"
+        )
+    return result
+
+
+def _collect(
+    chunk_results: list[tuple[int, Optional[TimecourseResult], Optional[str]]],
+    result: EnsembleResult,
+) -> None:
+    """Store chunk results in array allocated for the first successful sample."""
+    for k, timecourse, error in chunk_results:
+        if timecourse is None:
+            result.errors[k] = error
+            continue
+        if not result.time.size:
+            result.time = timecourse.time.copy()
+            result.names = timecourse.names[1:]
+            result.units = {name: timecourse.units[name] for name in result.names}
+            result.time_units = timecourse.units[timecourse.voi_name]
+            result.data = np.full(
+                (len(result.samples), len(timecourse), len(result.names)), np.nan
+            )
+        result.data[k] = timecourse.values
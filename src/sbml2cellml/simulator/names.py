@@ -0,0 +1,19 @@
+"""Lookup of variables by 'component/name' or unique 'name'.
+
+Shared by all simulator backends; free of numerical dependencies.
+"""
+
+
+def variable_index(names: list[str], name: str) -> int:
+    """Index of variable by 'component/name' or unique 'name'."""
+    if name in names:
+        return names.index(name)
+    matches = [k for k, n in enumerate(names) if n.split("/", 1)[-1] == name]
+    if len(matches) != 1:
+        raise KeyError(f"Variable '{name}' not found or ambiguous in {names}.")
+    return matches[0]
+
+
+def has_name(names: list[str], name: str) -> bool:
+    """Variable with 'component/name' or 'name' exists."""
+    return name in names or any(n.split("/", 1)[-1] == name for n in names)
@@ -0,0 +1,401 @@
+"""CellML simulator based on code generation.
+
+The CellML model is analysed with libcellml, C code is generated with the C profile
+of the libcellml Generator and compiled once with the local C compiler into a shared
+library. The right hand side is called via ctypes and integrated with a stiff solver
+from scipy, i.e. no libopencor is required.
+
+The C compiler can be set via the environment variable `CC` (default: cc).
+"""
+
+import ctypes
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+import libcellml
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+
+from sbml2cellml.console import console
+from sbml2cellml.simulator.names import has_name, variable_index
+
+if TYPE_CHECKING:
+    from sbml2cellml.jacobian import JacobianCode, SymbolicJacobian
+    from sbml2cellml.simulator.timecourse import TimecourseResult
+
+CFLAGS: list[str] = ["-O2", "-shared", "-fPIC"]
+
+
+class CellMLCodeGenerationError(RuntimeError):
+    """Error in the analysis, code generation or compilation of a CellML model."""
+
+    pass
+
+
+def analyse_cellml(model: libcellml.Model) -> libcellml.AnalyserModel:
+    """Analyse CellML model for code generation.
+
+    Only ODE and algebraic models are supported (no NLA systems).
+    """
+    analyser = libcellml.Analyser()
+    analyser.analyseModel(model)
+    if analyser.errorCount():
+        errors = [analyser.error(k).description() for k in range(analyser.errorCount())]
+        raise CellMLCodeGenerationError(
+            f"CellML model '{model.name()}' cannot be analysed:\n" + "\n".join(errors)
+        )
+    analyser_model: libcellml.AnalyserModel = analyser.analyserModel()
+    if analyser_model.type() not in (
+        libcellml.AnalyserModel.Type.ODE,
+        libcellml.AnalyserModel.Type.ALGEBRAIC,
+    ):
+        raise CellMLCodeGenerationError(
+            f"CellML model type '{analyser_model.typeAsString(analyser_model.type())}' "
+            f"is not supported."
+        )
+    return analyser_model
+
+
+def generate_c_code(analyser_model: libcellml.AnalyserModel) -> Tuple[str, str]:
+    """Generate C interface and implementation code for the analysed model."""
+    generator = libcellml.Generator()
+    profile = libcellml.GeneratorProfile(libcellml.GeneratorProfile.Profile.C)
+    profile.setInterfaceFileNameString("model.h")
+    interface_code: str = generator.interfaceCode(analyser_model, profile)
+    implementation_code: str = generator.implementationCode(analyser_model, profile)
+    return interface_code, implementation_code
+
+
+def compile_c_code(
+    interface_code: str, implementation_code: str, library_path: Path
+) -> Path:
+    """Compile C code into shared library at library_path."""
+    cc = os.environ.get("CC", "cc")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        (tmp_path / "model.h").write_text(interface_code)
+        (tmp_path / "model.c").write_text(implementation_code)
+        process = subprocess.run(
+            [cc, *CFLAGS, "-o", str(library_path), str(tmp_path / "model.c"), "-lm"],
+            capture_output=True,
+            text=True,
+        )
+    if process.returncode != 0:
+        raise CellMLCodeGenerationError(
+            f"Compilation with '{cc}' failed:\n{process.stderr}"
+        )
+    return library_path
+
+
+_double_p = np.ctypeslib.ndpointer(dtype=np.float64, flags="C_CONTIGUOUS")
+_compute_argtypes = [ctypes.c_double] + [_double_p] * 5
+
+
+def compile_jacobian(jacobian_code: "JacobianCode", use_cache: bool = True) -> Callable:
+    """Compile the C code of the Jacobian and load the jacobian function.
+
+    The function has the arguments (t, y, c, cc, data, dfdp) of the Python code, all
+    arrays are C contiguous float64 arrays.
+    """
+    implementation_code = jacobian_code.c_code()
+    if use_cache:
+        from sbml2cellml.simulator.compiled_cache import CompiledModelCache
+
+        library = ctypes.CDLL(
+            str(CompiledModelCache().compiled_library("", implementation_code))
+        )
+    else:
+        with tempfile.TemporaryDirectory(prefix="sbml2cellml_") as tmp_dir:
+            library_path = Path(tmp_dir) / "jacobian.so"
+            compile_c_code("", implementation_code, library_path)
+            library = ctypes.CDLL(str(library_path))
+    jacobian_f = library.jacobian
+    jacobian_f.argtypes = _compute_argtypes
+    jacobian_f.restype = None
+    return jacobian_f
+
+
+class NativeModel:
+    """CellML model compiled into a shared library.
+
+    The arrays of the model (states, rates, constants, computed constants and
+    algebraic variables) are numpy arrays passed to the compiled functions.
+    """
+
+    def __init__(
+        self,
+        model: libcellml.Model,
+        library_path: Optional[Path] = None,
+        use_cache: bool = True,
+        source: Optional[str] = None,
+    ):
+        """Compile model or load it from the compiled model cache.
+
+        `source` is the CellML source of the model used as cache key (printed from
+        the model if not provided).
+        """
+        self.analyser_model = analyse_cellml(model)
+        self.use_cache = use_cache
+        am = self.analyser_model
+
+        self.voi_name: str = _name(am.voi()) if am.voi() else "time"
+        self.voi_unit: str = _units_name(am.voi().variable()) if am.voi() else ""
+        self.state_names = [_name(am.state(k)) for k in range(am.stateCount())]
+        self.state_units = [_units_name(am.state(k).variable()) for k in range(am.stateCount())]
+        self.constant_names = [_name(am.constant(k)) for k in range(am.constantCount())]
+        self.computed_constant_names = [
+            _name(am.computedConstant(k)) for k in range(am.computedConstantCount())
+        ]
+        self.algebraic_names = [
+            _name(am.algebraicVariable(k)) for k in range(am.algebraicVariableCount())
+        ]
+
+        self._tmp_dir: Optional[tempfile.TemporaryDirectory] = None
+        self.library: Optional[ctypes.CDLL] = None
+        if library_path is None and use_cache:
+            from sbml2cellml.simulator.compiled_cache import CompiledModelCache
+
+            if source is None:
+                source = libcellml.Printer().printModel(model)
+            try:
+                self._load_library(CompiledModelCache().library_path(am, source=source))
+            except OSError:
+                # library evicted by other process before loading
+                pass
+        elif library_path is not None:
+            self._load_library(Path(library_path))
+
+        if self.library is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix="sbml2cellml_")
+            library_path = Path(self._tmp_dir.name) / "model.so"
+            interface_code, implementation_code = generate_c_code(am)
+            compile_c_code(interface_code, implementation_code, library_path)
+            self._load_library(library_path)
+
+        self._jacobian_f = None
+        self.states = np.zeros(len(self.state_names))
+        # work array for the evaluation of the right hand side
+        self._y = np.zeros(len(self.state_names))
+        self.rates = np.zeros(len(self.state_names))
+        self.constants = np.zeros(len(self.constant_names))
+        self.computed_constants = np.zeros(len(self.computed_constant_names))
+        self.algebraic = np.zeros(len(self.algebraic_names))
+        self.reset()
+
+    @classmethod
+    def from_file(cls, cellml_path: Path, use_cache: bool = True) -> "NativeModel":
+        """Create compiled model from CellML file."""
+        source = Path(cellml_path).read_text(encoding="utf-8")
+        return cls(parse_cellml(source), use_cache=use_cache, source=source)
+
+    def _load_library(self, library_path: Path) -> None:
+        self.library_path = library_path
+        self.library = ctypes.CDLL(str(library_path))
+        for name in ["computeComputedConstants", "computeRates", "computeVariables"]:
+            f = getattr(self.library, name)
+            f.argtypes = _compute_argtypes
+            f.restype = None
+        self.library.initialiseArrays.argtypes = [_double_p] * 5
+        self.library.initialiseArrays.restype = None
+
+    def reset(self) -> None:
+        """Reset states and constants to the initial values of the model."""
+        self.library.initialiseArrays(
+            self.states, self.rates, self.constants, self.computed_constants, self.algebraic
+        )
+        self.compute_computed_constants()
+
+    def compute_computed_constants(self) -> None:
+        """Update computed constants, required after changing constants."""
+        self.library.computeComputedConstants(
+            0.0, self.states, self.rates, self.constants, self.computed_constants,
+            self.algebraic,
+        )
+
+    def set_initial_values(self, values: dict[str, float]) -> None:
+        """Set initial values of states by name ('component/name' or 'name')."""
+        for name, value in values.items():
+            self.states[variable_index(self.state_names, name)] = value
+
+    def set_parameters(self, values: dict[str, float]) -> None:
+        """Set constants by name and update the computed constants."""
+        for name, value in values.items():
+            self.constants[variable_index(self.constant_names, name)] = value
+        self.compute_computed_constants()
+
+    def set_values(self, values: dict[str, float]) -> None:
+        """Set initial values of states and constants by name."""
+        states = {k: v for k, v in values.items() if has_name(self.state_names, k)}
+        self.set_initial_values(states)
+        self.set_parameters({k: v for k, v in values.items() if k not in states})
+
+    def rhs(self, t: float, y: np.ndarray) -> np.ndarray:
+        """Right hand side dy/dt = f(t, y)."""
+        self._y[:] = y
+        self.library.computeRates(
+            t, self._y, self.rates, self.constants, self.computed_constants,
+            self.algebraic,
+        )
+        return self.rates.copy()
+
+    def compute_variables(self, t: float, y: np.ndarray) -> np.ndarray:
+        """Algebraic variables for time and states."""
+        self._y[:] = y
+        self.library.computeRates(
+            t, self._y, self.rates, self.constants, self.computed_constants,
+            self.algebraic,
+        )
+        self.library.computeVariables(
+            t, self._y, self.rates, self.constants, self.computed_constants,
+            self.algebraic,
+        )
+        return self.algebraic.copy()
+
+    def set_jacobian(self, jacobian: Optional["SymbolicJacobian"]) -> None:
+        """Use the analytic Jacobian of the converted SBML model in `simulate`.
+
+        The Jacobian is compiled into a shared library like the right hand side
+        (see `compile_jacobian`). See `sbml2cellml.jacobian.read_symbolic_jacobian`;
+        None switches back to finite differences.
+        """
+        from sbml2cellml.jacobian import generate_jacobian_code
+
+        if jacobian is None:
+            self._jacobian_f = None
+            return
+
+        jacobian_code = generate_jacobian_code(
+            jacobian,
+            state_names=self.state_names,
+            constant_names=self.constant_names,
+            computed_constant_names=self.computed_constant_names,
+        )
+        self._jacobian_f = compile_jacobian(jacobian_code, use_cache=self.use_cache)
+        self._jacobian_code = jacobian_code
+        # column index of the nonzero values (CSC order)
+        self._jacobian_columns = np.repeat(
+            np.arange(len(jacobian_code.indptr) - 1), np.diff(jacobian_code.indptr)
+        )
+        # no parameter derivatives
+        self._dfdp = np.empty(0)
+
+    def _jacobian_data(self, t: float, y: np.ndarray) -> np.ndarray:
+        """Nonzero values of the analytic Jacobian in CSC order."""
+        data = np.empty(len(self._jacobian_code.indices))
+        self._jacobian_f(
+            t, np.ascontiguousarray(y, dtype=float), self.constants,
+            self.computed_constants, data, self._dfdp,
+        )
+        return data
+
+    def jacobian(self, t: float, y: np.ndarray) -> sparse.csc_matrix:
+        """Analytic Jacobian df/dy as sparse matrix."""
+        code = self._jacobian_code
+        return sparse.csc_matrix(
+            (self._jacobian_data(t, y), code.indices, code.indptr), shape=code.shape
+        )
+
+    def jacobian_dense(self, t: float, y: np.ndarray) -> np.ndarray:
+        """Analytic Jacobian df/dy as dense matrix."""
+        jac = np.zeros(self._jacobian_code.shape)
+        jac[self._jacobian_code.indices, self._jacobian_columns] = self._jacobian_data(t, y)
+        return jac
+
+    def simulate(
+        self,
+        start: float = 0,
+        end: float = 100,
+        steps: int = 100,
+        method: str = "LSODA",
+        rtol: float = 1e-6,
+        atol: float = 1e-8,
+        y0: Optional[np.ndarray] = None,
+    ):
+        """Integrate the model with a stiff solver.
+
+        The analytic Jacobian is used if set via `set_jacobian`.
+
+        Returns the solution object of `scipy.integrate.solve_ivp` with the time
+        points `t` and the states `y` (n_states x n_points).
+        """
+        y0 = self.states.copy() if y0 is None else np.asarray(y0, dtype=float)
+        t_eval = np.linspace(start, end, steps + 1)
+        options = {}
+        if self._jacobian_f is not None and method in ("BDF", "Radau"):
+            options["jac"] = self.jacobian
+        elif self._jacobian_f is not None and method == "LSODA":
+            options["jac"] = self.jacobian_dense
+        solution = solve_ivp(
+            self.rhs, (start, end), y0, method=method, t_eval=t_eval, rtol=rtol, atol=atol,
+            **options,
+        )
+        if not solution.success:
+            raise CellMLCodeGenerationError(f"Integration failed: {solution.message}")
+        return solution
+
+
+def _name(analyser_variable: libcellml.AnalyserVariable) -> str:
+    variable: libcellml.Variable = analyser_variable.variable()
+    return f"{variable.parent().name()}/{variable.name()}"
+
+
+def _units_name(variable: libcellml.Variable) -> str:
+    units = variable.units()
+    return units.name() if units is not None else ""
+
+
+def parse_cellml(source: str) -> libcellml.Model:
+    """Parse CellML model from string."""
+    parser = libcellml.Parser()
+    model: libcellml.Model = parser.parseModel(source)
+    if parser.errorCount():
+        errors = [parser.error(k).description() for k in range(parser.errorCount())]
+        raise CellMLCodeGenerationError("CellML cannot be parsed:\n" + "\n".join(errors))
+    return model
+
+
+def read_cellml(cellml_path: Path) -> libcellml.Model:
+    """Read CellML model from file."""
+    return parse_cellml(Path(cellml_path).read_text(encoding="utf-8"))
+
+
+def run_cellml_timecourse_native(
+    cellml_path: Path,
+    start: float = 0,
+    end: float = 100,
+    steps: int = 100,
+    method: str = "LSODA",
+    use_cache: bool = True,
+) -> "TimecourseResult":
+    """Runs cellml uniform timecourse with the compiled model.
+
+    Returns the timecourse with the units, analogue to `run_cellml_timecourse`.
+    """
+    from sbml2cellml.simulator.timecourse import TimecourseResult
+
+    model = NativeModel.from_file(cellml_path, use_cache=use_cache)
+    solution = model.simulate(start=start, end=end, steps=steps, method=method)
+    units = {model.voi_name: model.voi_unit}
+    units.update(zip(model.state_names, model.state_units))
+    result = TimecourseResult.empty(
+        n_time=len(solution.t), names=[model.voi_name, *model.state_names], units=units
+    )
+    result.data[:, 0] = solution.t
+    result.data[:, 1:] = solution.y.T
+
+    return result
+
+
+if __name__ == "__main__":
+    from sbml2cellml.benchmarks import MODELS_DIR
+
+    result = run_cellml_timecourse_native(
+        cellml_path=MODELS_DIR / "glimepiride_liver.cellml", start=0, end=200, steps=20
+    )
+    console.rule("results", style="white")
+    console.print(result.to_pandas())
+    console.rule(style="white")
@@ -0,0 +1,96 @@
+"""Parameter scans of CellML models with libopencor.
+
+The scan is an ensemble (see `run_ensemble`) of the parameter and initial value
+sets of the grid. Results of a factorial grid are reshaped into an xarray
+Dataset with one dimension per scanned variable; explicit sets are stacked along
+a `scan` dimension. Requires `xarray`.
+"""
+
+import itertools
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import xarray as xr
+
+from sbml2cellml.simulator.ensemble import run_ensemble
+
+
+def parameter_sets(
+    parameter_grid: Union[dict[str, Sequence[float]], Sequence[dict[str, float]]],
+) -> list[dict[str, float]]:
+    """Parameter sets of the scan.
+
+    A dictionary of value sequences is expanded to the full factorial grid, a
+    sequence of dictionaries is used as is.
+    """
+    if isinstance(parameter_grid, dict):
+        names = list(parameter_grid.keys())
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*parameter_grid.values())
+        ]
+    return [dict(values) for values in parameter_grid]
+
+
+def run_parameter_scan(
+    cellml_path: Path,
+    parameter_grid: Union[dict[str, Sequence[float]], Sequence[dict[str, float]]],
+    start: float = 0,
+    end: float = 100,
+    steps: int = 100,
+    outputs: Optional[Sequence[str]] = None,
+    processes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    show_progress: bool = True,
+) -> xr.Dataset:
+    """Run timecourses for all parameter/initial value sets of the grid.
+
+    Keys of the grid are constants or states ('component/name' or 'name'),
+    `outputs` selects the recorded variables (default: all states, see
+    `select_outputs`). For a dictionary of value sequences the returned Dataset
+    has one dimension per key with the values as coordinates and the dimension
+    `time`; for a sequence of sets the dimensions are (scan, time) with the
+    values of all keys as coordinates along `scan` (NaN if not set). Scanned
+    initial values of outputs have the suffix '_initial'. Failed simulations
+    are NaN; their indices in `parameter_sets` and error messages are the
+    attributes 'failed' and 'errors'.
+    """
+    cellml_path = Path(cellml_path)
+    sets = parameter_sets(parameter_grid)
+    result = run_ensemble(
+        cellml_path, sets, start=start, end=end, steps=steps, outputs=outputs,
+        processes=processes, chunk_size=chunk_size, show_progress=show_progress,
+    )
+
+    def coord(name: str) -> str:
+        return f"{name}_initial" if name in result.names else name
+
+    coords: dict = {"time": result.time.copy()}
+    if isinstance(parameter_grid, dict):
+        dims = tuple(coord(name) for name in parameter_grid) + ("time",)
+        shape = tuple(len(values) for values in parameter_grid.values())
+        for name, values in parameter_grid.items():
+            coords[coord(name)] = np.asarray(values, dtype=float)
+    else:
+        dims = ("scan", "time")
+        shape = (len(sets),)
+        for name in dict.fromkeys(name for values in sets for name in values):
+            coords[coord(name)] = (
+                "scan", np.array([values.get(name, np.nan) for values in sets])
+            )
+
+    data = result.data.reshape(shape + result.data.shape[1:])
+    dataset = xr.Dataset(
+        {name: (dims, data[..., k]) for k, name in enumerate(result.names)},
+        coords=coords,
+        attrs={
+            "cellml_path": str(cellml_path),
+            "failed": result.failed,
+            "errors": [result.errors[k] for k in result.failed],
+        },
+    )
+    for name in result.names:
+        dataset[name].attrs["units"] = result.units[name]
+    dataset["time"].attrs["units"] = result.time_units
+    return dataset
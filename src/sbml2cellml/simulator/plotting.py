@@ -0,0 +1,29 @@
+"""Plotting of timecourse results.
+
+Requires matplotlib, which is installed via the optional `plot` extra:
+    pip install sbml2cellml[plot]
+"""
+
+import pandas as pd
+from matplotlib import pyplot as plt
+
+
+def plot_cellml_timecourse(df: pd.DataFrame, units: dict[str, str]) -> None:
+    """Plot the results of the timecourse integration."""
+    fig, ax = plt.subplots(nrows=1, ncols=1)
+    columns = df.columns
+
+    # independent variable
+    voi_name = columns[0]
+    voi = df[voi_name]
+
+    # plot all dependent variables
+    for name in columns[1:]:
+        y = df[name]
+        ax.plot(voi, y, label=f"{name}[{units[name]}]")
+
+    ax.set_xlabel(f"voi ({voi_name}) [{units[voi_name]}]")
+    ax.set_ylabel('states')
+    ax.legend()
+
+    plt.show()
@@ -0,0 +1,127 @@
+"""Forward sensitivity analysis of compiled CellML models.
+
+The forward sensitivities S = dx/dp of the states with respect to a subset of the
+constants are integrated together with the states
+
+    dx/dt = f(t, x, p)
+    dS/dt = df/dx * S + df/dp,  S(0) = 0
+
+with the analytic derivatives df/dx and df/dp derived from the ASTs of the
+converted SBML model (see `sbml2cellml.jacobian`) and compiled like the right hand
+side. Stiff solvers use the block diagonal approximation diag(df/dx, df/dx, ...)
+of the Jacobian of the combined system.
+"""
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+
+from sbml2cellml.jacobian import SymbolicJacobian, generate_jacobian_code
+from sbml2cellml.simulator.names import variable_index
+from sbml2cellml.simulator.native_simulator import (
+    CellMLCodeGenerationError,
+    NativeModel,
+    compile_jacobian,
+)
+
+
+@dataclass
+class SensitivityResult:
+    """States and forward sensitivities of a timecourse.
+
+    `sensitivities` has the shape (n_time, n_states, n_parameters).
+    """
+
+    time: np.ndarray
+    states: np.ndarray
+    sensitivities: np.ndarray
+    state_names: list[str]
+    parameter_names: list[str]
+
+    def sensitivity(self, state: str, parameter: str) -> np.ndarray:
+        """Timecourse of dx/dp for state and parameter by 'component/name' or 'name'."""
+        return self.sensitivities[
+            :,
+            variable_index(self.state_names, state),
+            variable_index(self.parameter_names, parameter),
+        ]
+
+
+def simulate_sensitivities(
+    model: NativeModel,
+    jacobian: SymbolicJacobian,
+    parameters: Sequence[str],
+    start: float = 0,
+    end: float = 100,
+    steps: int = 100,
+    method: str = "BDF",
+    rtol: float = 1e-6,
+    atol: float = 1e-8,
+) -> SensitivityResult:
+    """Integrate the states and their sensitivities to the parameters (constants).
+
+    Starts from the current states and constants of the model.
+    """
+    parameter_names = [
+        model.constant_names[variable_index(model.constant_names, name)]
+        for name in parameters
+    ]
+    jacobian_code = generate_jacobian_code(
+        jacobian,
+        state_names=model.state_names,
+        constant_names=model.constant_names,
+        computed_constant_names=model.computed_constant_names,
+        parameters=parameter_names,
+    )
+    jacobian_f = compile_jacobian(jacobian_code, use_cache=model.use_cache)
+    n, n_p = len(model.state_names), len(parameter_names)
+    data = np.empty(len(jacobian_code.indices))
+    dfdp = np.zeros((n, n_p))
+    constants, computed_constants = model.constants, model.computed_constants
+
+    def derivatives(t: float, x: np.ndarray) -> sparse.csc_matrix:
+        dfdp.fill(0.0)
+        jacobian_f(t, np.ascontiguousarray(x), constants, computed_constants, data, dfdp)
+        return sparse.csc_matrix(
+            (data, jacobian_code.indices, jacobian_code.indptr), shape=(n, n)
+        )
+
+    def rhs(t: float, z: np.ndarray) -> np.ndarray:
+        x = z[:n]
+        dz = np.empty_like(z)
+        dz[:n] = model.rhs(t, x)
+        jac = derivatives(t, x)
+        dz[n:] = (jac @ z[n:].reshape(n, n_p) + dfdp).ravel()
+        return dz
+
+    def jac(t: float, z: np.ndarray) -> sparse.csc_matrix:
+        dfdx = derivatives(t, z[:n])
+        return sparse.block_diag(
+            [dfdx, sparse.kron(dfdx, sparse.eye(n_p))], format="csc"
+        )
+
+    options = {}
+    if method in ("BDF", "Radau"):
+        options["jac"] = jac
+    elif method == "LSODA":
+        options["jac"] = lambda t, z: jac(t, z).toarray()
+
+    z0 = np.concatenate([model.states, np.zeros(n * n_p)])
+    t_eval = np.linspace(start, end, steps + 1)
+    solution = solve_ivp(
+        rhs, (start, end), z0, method=method, t_eval=t_eval, rtol=rtol, atol=atol,
+        **options,
+    )
+    if not solution.success:
+        raise CellMLCodeGenerationError(f"Integration failed: {solution.message}")
+
+    return SensitivityResult(
+        time=solution.t,
+        states=solution.y[:n].T.copy(),
+        sensitivities=solution.y[n:].T.reshape(-1, n, n_p),
+        state_names=model.state_names,
+        parameter_names=parameter_names,
+    )
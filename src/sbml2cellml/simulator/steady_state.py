@@ -0,0 +1,184 @@
+"""Steady states of CellML models.
+
+The steady state f(t, x) = 0 of the compiled right hand side (see `NativeModel`) is
+solved with a Newton-Krylov root finder. If the root finder does not converge, e.g.
+for singular Jacobians of models with conserved moieties, pseudo-transient
+continuation is used: implicit Euler steps from the initial states with step sizes
+scaled by the decrease of the residual (switched evolution relaxation) and rejected
+if the residual increases, which follows the trajectory to the stable steady state.
+Pseudo-transient continuation stalls if the residual hardly decreases along the
+trajectory (e.g. saturated Michaelis-Menten kinetics); the trajectory is then
+integrated with error-controlled steps over growing time spans.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from scipy import optimize
+from scipy.integrate import solve_ivp
+
+from sbml2cellml.simulator.names import variable_index
+from sbml2cellml.simulator.native_simulator import NativeModel
+
+
+class SteadyStateError(RuntimeError):
+    """Steady state could not be found."""
+
+    pass
+
+
+@dataclass
+class SteadyStateResult:
+    """States and algebraic variables at the steady state."""
+
+    states: np.ndarray
+    algebraic: np.ndarray
+    state_names: list[str]
+    algebraic_names: list[str]
+    residual: float
+    method: str
+    iterations: int
+
+    def __getitem__(self, name: str) -> float:
+        """Value of state or algebraic variable by 'component/name' or 'name'."""
+        try:
+            return float(self.states[variable_index(self.state_names, name)])
+        except KeyError:
+            return float(self.algebraic[variable_index(self.algebraic_names, name)])
+
+
+def find_steady_state(
+    model: NativeModel,
+    y0: Optional[np.ndarray] = None,
+    t: float = 0.0,
+    tol: float = 1e-10,
+    max_iter: int = 500,
+    use_newton: bool = True,
+) -> SteadyStateResult:
+    """Find steady state of the model starting from y0 (default: current states).
+
+    The residual is the maximum absolute rate. Raises `SteadyStateError` if neither
+    the root finder, pseudo-transient continuation nor the integration converge to
+    the tolerance.
+    """
+    y0 = model.states.copy() if y0 is None else np.asarray(y0, dtype=float)
+
+    def f(y: np.ndarray) -> np.ndarray:
+        return model.rhs(t, y)
+
+    if use_newton and len(y0):
+        try:
+            solution = optimize.root(
+                f, y0, method="krylov", options={"fatol": tol, "maxiter": max_iter}
+            )
+            y = solution.x
+            residual = _residual(f, y)
+            if residual <= tol:
+                return _result(model, t, y, residual, "newton-krylov", solution.nit)
+        except (ValueError, ArithmeticError):
+            pass
+
+    y, residual, iterations = _pseudo_transient(f, y0, tol=tol, max_iter=max_iter)
+    if residual <= tol:
+        return _result(model, t, y, residual, "pseudo-transient", iterations)
+
+    y, residual, steps = _integrate(f, y, tol=tol)
+    if not residual <= tol:
+        raise SteadyStateError(
+            f"No steady state found after {iterations} iterations and {steps} "
+            f"integration steps (residual {residual})."
+        )
+    return _result(model, t, y, residual, "integration", steps)
+
+
+def _residual(f, y: np.ndarray) -> float:
+    r = f(y)
+    return float(np.max(np.abs(r))) if r.size else 0.0
+
+
+def _result(
+    model: NativeModel, t: float, y: np.ndarray, residual: float, method: str,
+    iterations: int,
+) -> SteadyStateResult:
+    return SteadyStateResult(
+        states=y.copy(),
+        algebraic=model.compute_variables(t, y),
+        state_names=model.state_names,
+        algebraic_names=model.algebraic_names,
+        residual=residual,
+        method=method,
+        iterations=iterations,
+    )
+
+
+def _jacobian(f, y: np.ndarray, fy: np.ndarray) -> np.ndarray:
+    """Jacobian by forward differences."""
+    jac = np.empty((len(y), len(y)))
+    for k in range(len(y)):
+        h = np.sqrt(np.finfo(float).eps) * max(abs(y[k]), 1.0)
+        yh = y.copy()
+        yh[k] += h
+        jac[:, k] = (f(yh) - fy) / h
+    return jac
+
+
+def _pseudo_transient(
+    f,
+    y0: np.ndarray,
+    tol: float,
+    max_iter: int,
+    dt: float = 1e-3,
+    dt_max: float = 1e12,
+    dt_min: float = 1e-12,
+) -> tuple[np.ndarray, float, int]:
+    """Pseudo-transient continuation with switched evolution relaxation.
+
+    Steps which increase the residual are rejected and retried with a tenth of
+    the step size, accepted steps scale the step size by the residual decrease.
+    """
+    y = y0.copy()
+    fy = f(y)
+    norm = np.linalg.norm(fy, ord=np.inf) if fy.size else 0.0
+    identity = np.eye(len(y))
+    jac = _jacobian(f, y, fy) if fy.size else None
+    iterations = 0
+    while norm > tol and iterations < max_iter and dt >= dt_min:
+        iterations += 1
+        try:
+            dy = np.linalg.solve(identity / dt - jac, fy)
+        except np.linalg.LinAlgError:
+            dt /= 10
+            continue
+        y_new = y + dy
+        f_new = f(y_new)
+        norm_new = np.linalg.norm(f_new, ord=np.inf)
+        if not norm_new < norm:
+            dt /= 10
+            continue
+        dt = min(dt * norm / max(norm_new, np.finfo(float).tiny), dt_max)
+        y, fy, norm = y_new, f_new, norm_new
+        jac = _jacobian(f, y, fy)
+
+    return y, float(norm), iterations
+
+
+def _integrate(
+    f, y0: np.ndarray, tol: float, span: float = 1.0, span_max: float = 1e12
+) -> tuple[np.ndarray, float, int]:
+    """Integrate dy/dt = f(y) over growing time spans until the residual is below tol."""
+    y = y0.copy()
+    residual = _residual(f, y)
+    steps = 0
+    while residual > tol and span <= span_max:
+        solution = solve_ivp(
+            lambda t, y: f(y), (0.0, span), y, method="BDF", rtol=1e-10,
+            atol=tol * 1e-2,
+        )
+        if not solution.success:
+            break
+        steps += len(solution.t) - 1
+        y = solution.y[:, -1]
+        residual = _residual(f, y)
+        span *= 10
+    return y, residual, steps
@@ -0,0 +1,69 @@
+"""Timecourse results backed by a single NumPy array."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from sbml2cellml.simulator.names import variable_index
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class TimecourseResult:
+    """Timecourse of a simulation.
+
+    `data` has the shape (n_time, n_columns) with the variable of integration in the
+    first column. The array is Fortran ordered, so every column is contiguous and
+    `to_pandas` creates a data frame without copying the values.
+    """
+
+    data: np.ndarray
+    names: list[str]
+    units: dict[str, str]
+
+    @classmethod
+    def empty(
+        cls, n_time: int, names: Sequence[str], units: dict[str, str]
+    ) -> "TimecourseResult":
+        """Allocate result for n_time points and the given columns."""
+        data = np.empty((n_time, len(names)), dtype=np.float64, order="F")
+        return cls(data=data, names=list(names), units=units)
+
+    @property
+    def voi_name(self) -> str:
+        """Name of the variable of integration."""
+        return self.names[0]
+
+    @property
+    def time(self) -> np.ndarray:
+        """Values of the variable of integration."""
+        return self.data[:, 0]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Values of all columns except the variable of integration."""
+        return self.data[:, 1:]
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Column by 'component/name' or unique 'name'."""
+        return self.data[:, variable_index(self.names, name)]
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Data frame view on the data (requires the `pandas` extra)."""
+        try:
+            import pandas as pd
+        except ImportError as err:
+            raise ImportError(
+                "TimecourseResult.to_pandas requires pandas: "
+                "pip install sbml2cellml[pandas]"
+            ) from err
+
+        return pd.DataFrame(self.data, columns=self.names, copy=False)
@@ -0,0 +1,163 @@
+"""Chunked out-of-core storage of timecourses in HDF5 files.
+
+Long timecourses are integrated in segments of `chunk_steps` output steps. Every
+segment continues from the final states of the previous one and is appended to a
+resizable, compressed HDF5 dataset, so the memory is bounded by the segment size
+independent of the simulated time span. Requires `h5py`.
+
+The file contains the dataset `timecourse` with the shape (n_time, n_columns),
+chunked per column, with the attributes `names` and `units` of the columns.
+"""
+
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator
+from sbml2cellml.simulator.names import variable_index
+from sbml2cellml.simulator.timecourse import TimecourseResult
+
+DATASET: str = "timecourse"
+
+
+def simulate_to_hdf5(
+    simulator: CellMLSimulator,
+    h5_path: Path,
+    start: float = 0,
+    end: float = 100,
+    steps: int = 100,
+    outputs: Optional[Sequence[str]] = None,
+    chunk_steps: int = 10000,
+    compression: Optional[str] = "gzip",
+) -> Path:
+    """Run uniform timecourse in segments and stream the results to HDF5.
+
+    The initial values and parameters set on the simulator are used for the first
+    segment and restored afterwards.
+    """
+    import h5py
+
+    h5_path = Path(h5_path)
+    changes = simulator.get_changes()
+    try:
+        with h5py.File(h5_path, "w") as f:
+            dataset = None
+            i_start = 0
+            while i_start < steps:
+                i_end = min(i_start + chunk_steps, steps)
+                result = simulator.simulate(
+                    start=start + (end - start) * i_start / steps,
+                    end=start + (end - start) * i_end / steps,
+                    steps=i_end - i_start,
+                    outputs=outputs,
+                )
+                if dataset is None:
+                    rows = result.data
+                    dataset = f.create_dataset(
+                        DATASET,
+                        shape=(0, len(result.names)),
+                        maxshape=(steps + 1, len(result.names)),
+                        chunks=(min(chunk_steps, steps) + 1, 1),
+                        dtype=np.float64,
+                        compression=compression,
+                    )
+                    dataset.attrs["names"] = result.names
+                    dataset.attrs["units"] = [result.units[n] for n in result.names]
+                else:
+                    # first point is the last point of the previous segment
+                    rows = result.data[1:]
+
+                n_rows = dataset.shape[0]
+                dataset.resize(n_rows + len(rows), axis=0)
+                dataset[n_rows:] = rows
+
+                simulator.set_initial_values(simulator.final_states())
+                i_start = i_end
+    finally:
+        simulator.restore_changes(changes)
+
+    return h5_path
+
+
+def run_cellml_timecourse_hdf5(
+    cellml_path: Path,
+    h5_path: Path,
+    start: float = 0,
+    end: float = 100,
+    steps: int = 100,
+    outputs: Optional[Sequence[str]] = None,
+    chunk_steps: int = 10000,
+    compression: Optional[str] = "gzip",
+) -> Path:
+    """Runs cellml uniform timecourse and streams the results to HDF5.
+
+    The results can be opened lazily with `HDF5Timecourse`.
+    """
+    return simulate_to_hdf5(
+        CellMLSimulator(cellml_path),
+        h5_path=h5_path,
+        start=start,
+        end=end,
+        steps=steps,
+        outputs=outputs,
+        chunk_steps=chunk_steps,
+        compression=compression,
+    )
+
+
+class HDF5Timecourse:
+    """Lazy access to a timecourse stored with `simulate_to_hdf5`.
+
+    Only the requested columns and rows are read from the file.
+    """
+
+    def __init__(self, h5_path: Path):
+        import h5py
+
+        self.h5_path = Path(h5_path)
+        self.file = h5py.File(self.h5_path, "r")
+        self.dataset = self.file[DATASET]
+        self.names: list[str] = [str(n) for n in self.dataset.attrs["names"]]
+        self.units: dict[str, str] = dict(
+            zip(self.names, (str(u) for u in self.dataset.attrs["units"]))
+        )
+
+    def __enter__(self) -> "HDF5Timecourse":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the HDF5 file."""
+        self.file.close()
+
+    def __len__(self) -> int:
+        return self.dataset.shape[0]
+
+    @property
+    def time(self) -> np.ndarray:
+        """Values of the variable of integration."""
+        return self.dataset[:, 0]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Column by 'component/name' or unique 'name'."""
+        return self.dataset[:, variable_index(self.names, name)]
+
+    def load(
+        self, names: Optional[Sequence[str]] = None, rows: slice = slice(None)
+    ) -> TimecourseResult:
+        """Load rows of the variable of integration and the given columns."""
+        if names is None:
+            columns = list(range(len(self.names)))
+        else:
+            columns = [0] + [variable_index(self.names, name) for name in names]
+        selected = [self.names[k] for k in columns]
+        n_time = len(range(*rows.indices(len(self))))
+        result = TimecourseResult.empty(
+            n_time=n_time, names=selected, units={n: self.units[n] for n in selected}
+        )
+        for column, k in enumerate(columns):
+            result.data[:, column] = self.dataset[rows, k]
+        return result
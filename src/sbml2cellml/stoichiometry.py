@@ -0,0 +1,98 @@
+"""Stoichiometric matrix of SBML models.
+
+The stoichiometric matrix N (species x reactions) is stored as a sparse CSR
+matrix with index maps for species and reactions, e.g. for conservation-law
+analysis or model reduction of the converted models.
+
+The rows are collected in plain Python; the conversion only needs the rows, so
+scipy is imported when the CSR matrix is accessed for the first time.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+import libsbml
+
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+
+
+@dataclass
+class StoichiometricMatrix:
+    """Sparse stoichiometric matrix with species and reaction ids.
+
+    matrix[i, j] is the net stoichiometry of species `species[i]` in reaction
+    `reactions[j]` (negative for reactants, positive for products).
+    `rows[i]` are the nonzero (j, stoichiometry) of species `species[i]` sorted by j.
+    """
+
+    rows: list[list[tuple[int, float]]]
+    species: list[str]
+    reactions: list[str]
+
+    @cached_property
+    def species_index(self) -> dict[str, int]:
+        return {sid: k for k, sid in enumerate(self.species)}
+
+    @cached_property
+    def reaction_index(self) -> dict[str, int]:
+        return {rid: k for k, rid in enumerate(self.reactions)}
+
+    @cached_property
+    def matrix(self) -> sparse.csr_matrix:
+        """Sparse CSR matrix (created on first access)."""
+        from scipy import sparse
+
+        indptr: list[int] = [0]
+        indices: list[int] = []
+        data: list[float] = []
+        for row in self.rows:
+            for j, value in row:
+                indices.append(j)
+                data.append(value)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (data, indices, indptr), shape=(len(self.species), len(self.reactions)),
+            dtype=float,
+        )
+
+    def row(self, sid: str) -> list[tuple[str, float]]:
+        """Reactions and stoichiometries of the species."""
+        return [(self.reactions[j], value) for j, value in self.rows[self.species_index[sid]]]
+
+    def to_dense(self) -> np.ndarray:
+        return self.matrix.toarray()
+
+
+def create_stoichiometric_matrix(m_sbml: libsbml.Model) -> StoichiometricMatrix:
+    """Create sparse stoichiometric matrix of the SBML model.
+
+    Missing stoichiometries are set to 1.0; species occurring as reactant and
+    product of the same reaction contribute their net stoichiometry.
+    """
+    species: list[str] = [s.getId() for s in m_sbml.getListOfSpecies()]
+    species_index: dict[str, int] = {sid: k for k, sid in enumerate(species)}
+    reactions: list[str] = []
+
+    # net stoichiometries per species, duplicate entries are summed
+    entries: list[dict[int, float]] = [{} for _ in species]
+    r: libsbml.Reaction
+    for j, r in enumerate(m_sbml.getListOfReactions()):
+        reactions.append(r.getId())
+        sref: libsbml.SpeciesReference
+        for sign, srefs in [(-1.0, r.getListOfReactants()), (1.0, r.getListOfProducts())]:
+            for sref in srefs:
+                stoichiometry: float = sref.getStoichiometry()
+                if not sref.isSetStoichiometry() or math.isnan(stoichiometry):
+                    # FIXME: support variable stoichiometries
+                    stoichiometry = 1.0
+                row = entries[species_index[sref.getSpecies()]]
+                row[j] = row.get(j, 0.0) + sign * stoichiometry
+
+    rows = [sorted((j, v) for j, v in row.items() if v != 0.0) for row in entries]
+    return StoichiometricMatrix(rows=rows, species=species, reactions=reactions)
@@ -0,0 +1,237 @@
+"""Watch a directory and reconvert SBML models on change.
+
+The converter stays resident: libsbml, libcellml (and libopencor for the smoke
+simulation) are imported once and every saved model is reconverted without
+interpreter startup. Changes are detected with inotify on Linux (via ctypes,
+no additional dependency) and by polling the modification times otherwise.
+Events are debounced, i.e. a model is reconverted once after the editor has
+finished writing.
+
+    sbml2cellml watch models/ --simulate 10
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Optional
+
+from sbml2cellml.console import console
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Changed files of a directory via inotify."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd: int = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(
+            self.fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+
+    def changes(self, timeout: float) -> set[Path]:
+        """Files written or moved into the directory within the timeout."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        paths: set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                paths.add(self.directory / os.fsdecode(name))
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed files of a directory by polling the modification times."""
+
+    def __init__(self, directory: Path, interval: float = 0.5):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._mtimes = self._scan()
+
+    def _scan(self) -> dict[Path, int]:
+        mtimes: dict[Path, int] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    mtimes[Path(entry.path)] = entry.stat().st_mtime_ns
+        return mtimes
+
+    def changes(self, timeout: float) -> set[Path]:
+        """Files changed since the last call (checked every interval)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            mtimes = self._scan()
+            paths = {p for p, mtime in mtimes.items() if self._mtimes.get(p) != mtime}
+            self._mtimes = mtimes
+            remaining = deadline - time.monotonic()
+            if paths or remaining <= 0:
+                return paths
+            time.sleep(min(self.interval, remaining))
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(directory: Path) -> InotifyWatcher | PollingWatcher:
+    """Inotify watcher on Linux, polling watcher otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory)
+
+
+@dataclass
+class WatchResult:
+    """Result of the reconversion of a changed model."""
+
+    sbml_path: Path
+    cellml_path: Path
+    time_conversion: float
+    cached: bool = False
+    validation_issues: int = 0
+    analyser_issues: int = 0
+    time_simulation: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ModelWatcher:
+    """Resident converter for the SBML models of a directory."""
+
+    def __init__(
+        self,
+        directory: Path,
+        cellml_dir: Optional[Path] = None,
+        pattern: str = "*.xml",
+        debounce: float = 0.2,
+        simulate: Optional[float] = None,
+        steps: int = 100,
+        use_cache: bool = True,
+        cache_dir: Optional[Path] = None,
+    ):
+        self.directory = Path(directory)
+        self.cellml_dir = Path(cellml_dir) if cellml_dir else self.directory
+        self.cellml_dir.mkdir(parents=True, exist_ok=True)
+        self.pattern = pattern
+        self.debounce = debounce
+        self.simulate = simulate
+        self.steps = steps
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+
+    def is_model(self, path: Path) -> bool:
+        return fnmatchcase(path.name, self.pattern) and path.is_file()
+
+    def process(self, sbml_path: Path) -> WatchResult:
+        """Reconvert model (see `convert_file`), validate it and run the smoke simulation."""
+        import libcellml
+
+        from sbml2cellml.batch import convert_file
+
+        cellml_path = self.cellml_dir / f"{sbml_path.stem}.cellml"
+        conversion = convert_file(
+            sbml_path, cellml_path, use_cache=self.use_cache, cache_dir=self.cache_dir
+        )
+        result = WatchResult(
+            sbml_path=sbml_path,
+            cellml_path=cellml_path,
+            time_conversion=conversion.time,
+            cached=conversion.cached,
+        )
+        if not conversion.success:
+            # last line of the traceback
+            result.error = conversion.error.strip().splitlines()[-1]
+            return result
+        try:
+            cellml_str = cellml_path.read_text(encoding="utf-8")
+            parser = libcellml.Parser()
+            model = parser.parseModel(cellml_str)
+            validator = libcellml.Validator()
+            validator.validateModel(model)
+            result.validation_issues = parser.issueCount() + validator.issueCount()
+            analyser = libcellml.Analyser()
+            analyser.analyseModel(model)
+            result.analyser_issues = analyser.issueCount()
+
+            if self.simulate is not None and not analyser.errorCount():
+                from sbml2cellml.simulator.cellml_simulator import run_cellml_timecourse
+
+                t0 = time.perf_counter()
+                run_cellml_timecourse(cellml_path, start=0, end=self.simulate, steps=self.steps)
+                result.time_simulation = time.perf_counter() - t0
+        except Exception as err:
+            result.error = f"{type(err).__name__}: {err}"
+        return result
+
+    def report(self, result: WatchResult) -> None:
+        """Print single line for the result."""
+        name = result.sbml_path.name
+        if result.error:
+            console.print(f"[error]FAILED[/error] {name}: {result.error}", markup=True)
+            return
+        status = "[success]CACHED[/success]" if result.cached else "[success]OK[/success]"
+        line = (
+            f"{status} {name} -> {result.cellml_path.name} "
+            f"({result.time_conversion * 1000:.1f} ms), "
+            f"validator: {result.validation_issues}, analyser: {result.analyser_issues}"
+        )
+        if result.time_simulation is not None:
+            line += f", simulation: {result.time_simulation * 1000:.1f} ms"
+        console.print(line)
+
+    def run(self, max_events: Optional[int] = None) -> None:
+        """Watch the directory until interrupted (or `max_events` reconversions)."""
+        watcher = create_watcher(self.directory)
+        console.print(
+            f"Watching '{self.directory}' ({type(watcher).__name__}), "
+            f"press Ctrl+C to stop", style="info"
+        )
+        n_events = 0
+        try:
+            while max_events is None or n_events < max_events:
+                pending = {p for p in watcher.changes(timeout=1.0) if self.is_model(p)}
+                if not pending:
+                    continue
+                # debounce: wait until no further changes arrive
+                while True:
+                    changes = watcher.changes(timeout=self.debounce)
+                    if not changes:
+                        break
+                    pending.update(p for p in changes if self.is_model(p))
+                for sbml_path in sorted(pending):
+                    self.report(self.process(sbml_path))
+                    n_events += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
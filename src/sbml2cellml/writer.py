@@ -0,0 +1,379 @@
+"""Streaming CellML writer.
+
+`libcellml.Printer().printModel` creates the complete CellML document as a single
+string before it can be written. The streaming writer serializes units, variables
+and math equation by equation to a file handle, so that the document is never held
+in memory as a whole. The output is byte-identical to the libcellml Printer for the
+features supported by the writer (units, components, variables, math, connections
+and encapsulation); models with imports, resets or comments in the math are
+written via the Printer.
+"""
+
+import gzip
+from pathlib import Path
+from typing import Iterator, Optional, TextIO
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import libcellml
+
+CELLML_NS = "http://www.cellml.org/cellml/2.0#"
+INDENT = "  "
+MATH_CHUNK_SIZE = 64 * 1024
+
+
+def _attr(name: str, value: str) -> str:
+    """Serialize attribute."""
+    return f' {name}="{escape(value, {chr(34): "&quot;"})}"'
+
+
+def _number(value: float) -> str:
+    """Number formatting of libcellml (15 significant digits)."""
+    return f"{value:.15g}"
+
+
+def can_stream_model(model: libcellml.Model) -> bool:
+    """Check if model only contains features supported by the streaming writer."""
+    if model.hasImports():
+        return False
+    for k in range(model.unitsCount()):
+        if model.units(k).isImport():
+            return False
+    return all(
+        not component.isImport()
+        and component.resetCount() == 0
+        and "<!--" not in component.math()
+        for component in _iter_components(model)
+    )
+
+
+def _iter_components(parent) -> Iterator[libcellml.Component]:
+    """Depth-first iteration over all components."""
+    for k in range(parent.componentCount()):
+        component = parent.component(k)
+        yield component
+        yield from _iter_components(component)
+
+
+def write_model(model: libcellml.Model, f: TextIO) -> None:
+    """Write CellML model to text file handle.
+
+    The model is streamed if possible, otherwise the libcellml Printer is used.
+    """
+    if can_stream_model(model):
+        stream_model(model, f)
+    else:
+        f.write(libcellml.Printer().printModel(model))
+
+
+def stream_model(model: libcellml.Model, f: TextIO) -> None:
+    """Stream CellML model to text file handle."""
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    header = f'<model xmlns="{CELLML_NS}"'
+    if model.name():
+        header += _attr("name", model.name())
+    if model.id():
+        header += _attr("id", model.id())
+
+    connections = _collect_connections(model)
+    has_encapsulation = any(
+        model.component(k).componentCount() for k in range(model.componentCount())
+    )
+    if not (model.unitsCount() or model.componentCount()):
+        f.write(f"{header}/>\n")
+        return
+    f.write(f"{header}>\n")
+
+    for k in range(model.unitsCount()):
+        _write_units(model.units(k), f)
+
+    for component in _iter_components(model):
+        _write_component(component, f)
+
+    _write_connections(connections, f)
+
+    if has_encapsulation:
+        f.write(f"{INDENT}<encapsulation>\n")
+        for k in range(model.componentCount()):
+            component = model.component(k)
+            if component.componentCount():
+                _write_component_ref(component, f, level=2)
+        f.write(f"{INDENT}</encapsulation>\n")
+
+    f.write("</model>\n")
+
+
+def _write_units(units: libcellml.Units, f: TextIO) -> None:
+    """Write units definition."""
+    line = f"{INDENT}<units{_attr('name', units.name())}"
+    if units.id():
+        line += _attr("id", units.id())
+    if not units.unitCount():
+        f.write(f"{line}/>\n")
+        return
+    f.write(f"{line}>\n")
+    for k in range(units.unitCount()):
+        reference, prefix, exponent, multiplier, uid = units.unitAttributes(k)
+        line = f"{INDENT * 2}<unit"
+        if exponent != 1.0:
+            line += _attr("exponent", _number(exponent))
+        if multiplier != 1.0:
+            line += _attr("multiplier", _number(multiplier))
+        if prefix:
+            line += _attr("prefix", prefix)
+        line += _attr("units", reference)
+        if uid:
+            line += _attr("id", uid)
+        f.write(f"{line}/>\n")
+    f.write(f"{INDENT}</units>\n")
+
+
+def _write_component(component: libcellml.Component, f: TextIO) -> None:
+    """Write component with variables and math."""
+    line = f"{INDENT}<component{_attr('name', component.name())}"
+    if component.id():
+        line += _attr("id", component.id())
+    math = component.math()
+    if not (component.variableCount() or math):
+        f.write(f"{line}/>\n")
+        return
+    f.write(f"{line}>\n")
+
+    for k in range(component.variableCount()):
+        variable: libcellml.Variable = component.variable(k)
+        line = f"{INDENT * 2}<variable{_attr('name', variable.name())}"
+        units = variable.units()
+        if units is not None:
+            line += _attr("units", units.name())
+        if variable.initialValue():
+            line += _attr("initial_value", variable.initialValue())
+        if variable.interfaceType():
+            line += _attr("interface", variable.interfaceType())
+        if variable.id():
+            line += _attr("id", variable.id())
+        f.write(f"{line}/>\n")
+
+    if math:
+        stream_math(math, f, level=2)
+    f.write(f"{INDENT}</component>\n")
+
+
+def _collect_connections(model: libcellml.Model) -> list:
+    """Collect variable equivalences grouped by component pairs.
+
+    The order follows the libcellml Printer: components depth-first, variables in
+    order, pairs already seen in reverse order are skipped.
+    """
+    pairs: list[tuple[libcellml.Variable, libcellml.Variable]] = []
+    seen: set[tuple[tuple[str, str], tuple[str, str]]] = set()
+    for component in _iter_components(model):
+        for k in range(component.variableCount()):
+            variable = component.variable(k)
+            for j in range(variable.equivalentVariableCount()):
+                equivalent = variable.equivalentVariable(j)
+                key = (_variable_key(variable), _variable_key(equivalent))
+                if (key[1], key[0]) in seen:
+                    continue
+                seen.add(key)
+                pairs.append((variable, equivalent))
+
+    connections: dict[tuple[str, str], list] = {}
+    for v1, v2 in pairs:
+        c_key = (v1.parent().name(), v2.parent().name())
+        connections.setdefault(c_key, []).append((v1, v2))
+    return list(connections.items())
+
+
+def _variable_key(variable: libcellml.Variable) -> tuple[str, str]:
+    return variable.parent().name(), variable.name()
+
+
+def _write_connections(connections: list, f: TextIO) -> None:
+    """Write connections with map_variables."""
+    for (c1, c2), variable_pairs in connections:
+        line = f"{INDENT}<connection{_attr('component_1', c1)}{_attr('component_2', c2)}"
+        connection_id = ""
+        for v1, v2 in variable_pairs:
+            connection_id = libcellml.Variable.equivalenceConnectionId(v1, v2)
+            if connection_id:
+                break
+        if connection_id:
+            line += _attr("id", connection_id)
+        f.write(f"{line}>\n")
+        for v1, v2 in variable_pairs:
+            line = (
+                f"{INDENT * 2}<map_variables"
+                f"{_attr('variable_1', v1.name())}{_attr('variable_2', v2.name())}"
+            )
+            mapping_id = libcellml.Variable.equivalenceMappingId(v1, v2)
+            if mapping_id:
+                line += _attr("id", mapping_id)
+            f.write(f"{line}/>\n")
+        f.write(f"{INDENT}</connection>\n")
+
+
+def _write_component_ref(component: libcellml.Component, f: TextIO, level: int) -> None:
+    """Write encapsulation hierarchy."""
+    line = f"{INDENT * level}<component_ref{_attr('component', component.name())}"
+    if not component.componentCount():
+        f.write(f"{line}/>\n")
+        return
+    f.write(f"{line}>\n")
+    for k in range(component.componentCount()):
+        _write_component_ref(component.component(k), f, level=level + 1)
+    f.write(f"{INDENT * level}</component_ref>\n")
+
+
+# --- MathML ---
+def stream_math(math: str, f: TextIO, level: int) -> None:
+    """Stream formatted MathML of a component.
+
+    The math string may contain multiple <math> elements. Every equation (child of
+    <math>) is formatted and written as soon as it has been parsed and is released
+    afterwards, so memory is bounded by the largest equation.
+    """
+    if math.startswith("<?xml"):
+        math = math[math.index("?>") + 2 :]
+
+    parser = ElementTree.XMLPullParser(events=("start-ns", "start", "end"))
+    parser.feed("<_math_>")
+    namespaces: list[tuple[str, str]] = []
+    declarations: dict[int, list[tuple[str, str]]] = {}
+    # prefix for namespace uri in scope, stack of scopes
+    scopes: list[dict[str, str]] = [{}]
+    stack: list[ElementTree.Element] = []
+    # <math> element which has not been closed with '>' yet
+    open_math: Optional[str] = None
+
+    def handle_events() -> None:
+        nonlocal open_math
+        for event, data in parser.read_events():
+            if event == "start-ns":
+                namespaces.append(data)
+            elif event == "start":
+                declarations[id(data)] = namespaces[:]
+                scope = dict(scopes[-1])
+                for prefix, uri in namespaces:
+                    scope[uri] = prefix
+                scopes.append(scope)
+                namespaces.clear()
+                stack.append(data)
+                if len(stack) == 2:
+                    # <math> element
+                    open_math = _start_tag(data, declarations[id(data)], scope)
+                    f.write(f"{INDENT * level}{open_math}")
+                elif len(stack) == 3 and open_math is not None:
+                    f.write(">\n")
+                    open_math = None
+            elif event == "end":
+                scope = scopes.pop()
+                stack.pop()
+                if len(stack) == 2:
+                    # complete equation
+                    f.write(_format_element(data, level + 1, declarations, scopes[-1]))
+                    stack[-1].remove(data)
+                    _forget(data, declarations)
+                elif len(stack) == 1:
+                    if open_math is not None:
+                        f.write("/>\n")
+                        open_math = None
+                    else:
+                        f.write(f"{INDENT * level}</{_qname(data.tag, scope)}>\n")
+                    stack[-1].remove(data)
+                    declarations.pop(id(data), None)
+
+    for k in range(0, len(math), MATH_CHUNK_SIZE):
+        parser.feed(math[k : k + MATH_CHUNK_SIZE])
+        handle_events()
+    parser.feed("</_math_>")
+    parser.close()
+    handle_events()
+
+
+def _forget(element: ElementTree.Element, declarations: dict) -> None:
+    """Remove namespace declarations of subtree."""
+    for e in element.iter():
+        declarations.pop(id(e), None)
+
+
+def _qname(tag: str, scope: dict[str, str]) -> str:
+    """Prefixed name for '{uri}local' tag or attribute."""
+    if tag.startswith("{"):
+        uri, local = tag[1:].split("}", 1)
+        prefix = scope.get(uri, "")
+        return f"{prefix}:{local}" if prefix else local
+    return tag
+
+
+def _start_tag(
+    element: ElementTree.Element,
+    namespaces: list[tuple[str, str]],
+    scope: dict[str, str],
+) -> str:
+    """Start tag without closing '>'."""
+    parts = [f"<{_qname(element.tag, scope)}"]
+    for prefix, uri in namespaces:
+        parts.append(_attr(f"xmlns:{prefix}" if prefix else "xmlns", uri))
+    for name, value in element.attrib.items():
+        # attributes without prefix are not in a namespace
+        parts.append(_attr(_qname(name, scope) if name.startswith("{") else name, value))
+    return "".join(parts)
+
+
+def _format_element(
+    element: ElementTree.Element,
+    level: int,
+    declarations: dict[int, list[tuple[str, str]]],
+    parent_scope: dict[str, str],
+) -> str:
+    """Format element like libxml2, i.e. indented unless it has text content."""
+    parts: list[str] = []
+    _format(element, level, declarations, parent_scope, parts, inline=False)
+    return "".join(parts)
+
+
+def _format(
+    element: ElementTree.Element,
+    level: int,
+    declarations: dict[int, list[tuple[str, str]]],
+    parent_scope: dict[str, str],
+    parts: list[str],
+    inline: bool,
+) -> None:
+    namespaces = declarations.get(id(element), [])
+    scope = parent_scope
+    if namespaces:
+        scope = dict(parent_scope)
+        for prefix, uri in namespaces:
+            scope[uri] = prefix
+
+    indent = "" if inline else INDENT * level
+    text = (element.text or "").strip()
+    children = list(element)
+    tag = _qname(element.tag, scope)
+    start = _start_tag(element, namespaces, scope)
+
+    if not text and not children:
+        parts.append(f"{indent}{start}/>")
+    elif inline or text or any((child.tail or "").strip() for child in children):
+        # mixed content is written without formatting
+        parts.append(f"{indent}{start}>{escape(text)}")
+        for child in children:
+            _format(child, level + 1, declarations, scope, parts, inline=True)
+            parts.append(escape((child.tail or "").strip()))
+        parts.append(f"</{tag}>")
+    else:
+        parts.append(f"{indent}{start}>\n")
+        for child in children:
+            _format(child, level + 1, declarations, scope, parts, inline=False)
+        parts.append(f"{indent}</{tag}>")
+
+    if not inline:
+        parts.append("\n")
+
+
+def open_cellml(cellml_path: Path, mode: str = "w") -> TextIO:
+    """Open CellML file for text writing; '.gz' files are gzip compressed."""
+    if Path(cellml_path).suffix == ".gz":
+        return gzip.open(cellml_path, f"{mode}t", encoding="utf-8")
+    return open(cellml_path, mode, encoding="utf-8")
@@ -0,0 +1,30 @@
+"""Shared fixtures of the sbml2cellml tests."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+MODELS_DIR: Path = Path(__file__).parents[1] / "models"
+SBML_PATHS: list[Path] = sorted(MODELS_DIR.glob("*.xml"))
+# models which can be analysed by libcellml, i.e. simulated
+SIMULATION_MODELS: list[str] = ["glimepiride_kidney", "glimepiride_liver"]
+
+
+@pytest.fixture
+def kidney_sbml(tmp_path: Path) -> Path:
+    """Copy of the kidney SBML model in a temporary directory."""
+    sbml_path = tmp_path / "glimepiride_kidney.xml"
+    shutil.copy(MODELS_DIR / "glimepiride_kidney.xml", sbml_path)
+    return sbml_path
+
+
+@pytest.fixture(params=SIMULATION_MODELS)
+def cellml_path(request, tmp_path: Path) -> Path:
+    """CellML file converted from an SBML model which can be simulated."""
+    from sbml2cellml.cellml2sbml import convert_sbml2cellml, write_model_to_file
+
+    path = tmp_path / f"{request.param}.cellml"
+    model = convert_sbml2cellml(MODELS_DIR / f"{request.param}.xml", verbose=False)
+    write_model_to_file(model, path)
+    return path
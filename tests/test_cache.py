@@ -0,0 +1,86 @@
+"""Content-addressed conversion cache."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+from sbml2cellml import cache as cache_module
+from sbml2cellml.batch import convert_file
+from sbml2cellml.cache import (
+    ConversionCache,
+    conversion_key,
+    convert_sbml2cellml_cached,
+    source_hash,
+)
+
+
+def test_conversion_key() -> None:
+    key = conversion_key(b"<sbml/>")
+    assert key == conversion_key(b"<sbml/>", {})
+    assert key != conversion_key(b"<sbml />")
+    assert key != conversion_key(b"<sbml/>", {"cse": False})
+    assert key != conversion_key(b"<sbml/>", name="model")
+
+
+def test_cached_conversion(kidney_sbml: Path, tmp_path: Path) -> None:
+    cache = ConversionCache(cache_dir=tmp_path / "cache")
+    cellml_str = convert_sbml2cellml_cached(kidney_sbml, cache=cache)
+    assert cache.size() > 0
+    assert convert_sbml2cellml_cached(kidney_sbml, cache=cache) == cellml_str
+    assert convert_sbml2cellml_cached(kidney_sbml, cache=cache, options={"cse": False})
+
+
+def test_eviction(tmp_path: Path) -> None:
+    cache = ConversionCache(cache_dir=tmp_path, max_size=10)
+    cache.put("a", "x" * 8)
+    cache.put("b", "x" * 8)
+    assert cache.get("a") is None
+    assert cache.get("b") == "x" * 8
+
+
+def test_eviction_threshold(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The cache directory is scanned only when the size limit is exceeded."""
+    cache = ConversionCache(cache_dir=tmp_path, max_size=100)
+    evictions = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda keep=None: evictions.append(evict(keep)))
+    for k in range(40):
+        cache.put(f"{k:02d}", "x" * 10)
+        assert cache.size() <= 100
+    # every eviction frees space for two entries
+    assert len(evictions) == 15
+    assert all(len(removed) == 2 for removed in evictions)
+    assert cache.get("39") is not None and cache.get("00") is None
+
+
+def test_source_hash_of_subpackages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "simulator").mkdir()
+    (tmp_path / "cache.py").write_text("")
+    module_path = tmp_path / "simulator" / "module.py"
+    module_path.write_text("a = 1\n")
+    monkeypatch.setattr(cache_module, "__file__", str(tmp_path / "cache.py"))
+    hash_1 = source_hash.__wrapped__()
+    module_path.write_text("a = 2\n")
+    assert source_hash.__wrapped__() != hash_1
+
+
+def test_batch_options_and_names(kidney_sbml: Path, tmp_path: Path) -> None:
+    """Identical files without model id keep their names; options are part of the key."""
+    sbml_str = kidney_sbml.read_text(encoding="utf-8")
+    sbml_str = re.sub(r'(<model[^>]*?) id="[^"]*"', r"\1", sbml_str, count=1)
+    cache_dir = tmp_path / "cache"
+    for name in ["a", "b"]:
+        sbml_path = tmp_path / f"{name}.xml"
+        sbml_path.write_text(sbml_str, encoding="utf-8")
+        result = convert_file(sbml_path, tmp_path / f"{name}.cellml", cache_dir=cache_dir)
+        assert result.success and not result.cached
+        assert f'name="{name}"' in (tmp_path / f"{name}.cellml").read_text(encoding="utf-8")
+
+    result = convert_file(tmp_path / "a.xml", tmp_path / "a.cellml", cache_dir=cache_dir)
+    assert result.cached
+    result = convert_file(
+        tmp_path / "a.xml", tmp_path / "a.cellml", cache_dir=cache_dir,
+        options={"cse": False},
+    )
+    assert result.success and not result.cached
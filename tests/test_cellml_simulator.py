@@ -0,0 +1,60 @@
+"""libopencor simulator sessions and output selection."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator
+from sbml2cellml.simulator.native_simulator import NativeModel
+
+
+def test_session_reuse(cellml_path: Path) -> None:
+    """Repeated runs reuse the instance; changes are applied until reset."""
+    simulator = CellMLSimulator(cellml_path)
+    instance = simulator.instance
+    state = simulator._names("state")[0]
+    simulator.set_initial_values({state: 2.0})
+    first = simulator.simulate(end=10, steps=10)
+    assert first[state][0] == 2.0
+    np.testing.assert_array_equal(simulator.simulate(end=10, steps=10).data, first.data)
+
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    constant, value = model.constant_names[0], 2 * model.constants[0] + 1.0
+    simulator.set_parameters({constant: value})
+    assert simulator.get_changes() == {state: 2.0, constant: value}
+    assert not np.array_equal(simulator.simulate(end=10, steps=10).data, first.data)
+
+    simulator.reset()
+    assert simulator.get_changes() == {}
+    reset = simulator.simulate(end=10, steps=10)
+    assert reset[state][0] == 0.0
+    assert simulator.instance is instance
+
+    simulator.set_initial_values({state: 2.0})
+    np.testing.assert_array_equal(simulator.simulate(end=10, steps=10).data, first.data)
+
+
+def test_select_outputs(cellml_path: Path) -> None:
+    """Rates and algebraic variables agree with the right hand side of the model."""
+    simulator = CellMLSimulator(cellml_path)
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    states = {name: 1.0 + k for k, name in enumerate(model.state_names)}
+    simulator.set_initial_values(states)
+    outputs = [name.split("/", 1)[1] for name in model.state_names] + ["*'", "sbml/*"]
+    result = simulator.simulate(end=10, steps=10, outputs=outputs)
+
+    rates = [f"{name}'" for name in model.state_names]
+    assert result.names[: 1 + 2 * len(states)] == [result.voi_name, *states, *rates]
+    for k, t in enumerate(result.time):
+        y = np.array([result[name][k] for name in model.state_names])
+        np.testing.assert_allclose(
+            [result[name][k] for name in rates], model.rhs(t, y), rtol=1e-10, atol=1e-14
+        )
+        np.testing.assert_allclose(
+            [result[name][k] for name in model.algebraic_names],
+            model.compute_variables(t, y), rtol=1e-10, atol=1e-14,
+        )
+
+    with pytest.raises(KeyError, match="unknown_variable"):
+        simulator.simulate(end=10, steps=10, outputs=["unknown_variable"])
@@ -0,0 +1,102 @@
+"""Common-subexpression elimination of ASTs and converted models."""
+
+import libsbml
+import numpy as np
+import pytest
+
+from conftest import MODELS_DIR
+from sbml2cellml.cse import eliminate_common_subexpressions
+
+
+def parse(formula: str) -> libsbml.ASTNode:
+    return libsbml.parseL3Formula(formula)
+
+
+def formula(ast: libsbml.ASTNode) -> str:
+    return libsbml.formulaToL3String(ast)
+
+
+def test_repeated_subexpressions() -> None:
+    subexpressions, rewritten = eliminate_common_subexpressions(
+        {"v1": parse("k * (a + b)"), "v2": parse("exp(a + b) / 2")}
+    )
+    assert {name: formula(ast) for name, ast in subexpressions.items()} == {
+        "cse_0": "a + b"
+    }
+    assert formula(rewritten["v1"]) == "k * cse_0"
+    assert formula(rewritten["v2"]) == "exp(cse_0) / 2"
+
+
+def test_single_use_and_reserved_names() -> None:
+    definitions = {"cse_0": parse("a * b + 1"), "v": parse("a * b")}
+    subexpressions, rewritten = eliminate_common_subexpressions(
+        definitions, reserved={"_cse_0"}
+    )
+    assert list(subexpressions) == ["__cse_0"]
+    assert formula(rewritten["v"]) == "__cse_0"
+    # definitions are not modified
+    assert formula(definitions["cse_0"]) == "a * b + 1"
+
+    subexpressions, _ = eliminate_common_subexpressions({"v": parse("a * b + c")})
+    assert subexpressions == {}
+
+
+@pytest.mark.parametrize(
+    "condition", ["x > 1", "(x > 1) && (y < 2)", "!(x == y)"]
+)
+def test_boolean_subexpressions_are_kept(condition: str) -> None:
+    definitions = {
+        "v1": parse(f"piecewise(1, {condition}, 0)"),
+        "v2": parse(f"piecewise(k, {condition}, 2 * k)"),
+    }
+    subexpressions, rewritten = eliminate_common_subexpressions(definitions)
+    assert subexpressions == {}
+    for vid, ast in definitions.items():
+        assert formula(rewritten[vid]) == formula(ast)
+
+
+def test_real_subexpressions_in_conditions() -> None:
+    subexpressions, rewritten = eliminate_common_subexpressions(
+        {
+            "v1": parse("piecewise(1, x * y > 1, 0)"),
+            "v2": parse("piecewise(2, x * y > 1, 3)"),
+        }
+    )
+    assert [formula(ast) for ast in subexpressions.values()] == ["x * y"]
+    assert formula(rewritten["v1"]) == "piecewise(1, cse_0 > 1, 0)"
+
+
+def test_converted_rhs(tmp_path) -> None:
+    """Conversions with and without CSE evaluate to the same rates and variables."""
+    from sbml2cellml.cellml2sbml import convert_sbml2cellml, write_model_to_file
+    from sbml2cellml.simulator.native_simulator import NativeModel
+
+    # the liver model has no common subexpressions
+    name = "glimepiride_kidney"
+    models = {}
+    for cse in (True, False):
+        path = tmp_path / f"{name}_{cse}.cellml"
+        model = convert_sbml2cellml(MODELS_DIR / f"{name}.xml", verbose=False, cse=cse)
+        write_model_to_file(model, path)
+        models[cse] = NativeModel.from_file(path, use_cache=False)
+    assert models[True].state_names == models[False].state_names
+    assert "sbml/cse_0" in models[True].computed_constant_names
+
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        constants = {
+            key: value * rng.uniform(0.5, 2.0)
+            for key, value in zip(models[False].constant_names, models[False].constants)
+        }
+        y = rng.uniform(0.1, 10.0, len(models[True].state_names))
+        for model in models.values():
+            model.set_parameters(constants)
+        np.testing.assert_allclose(
+            models[True].rhs(0.0, y), models[False].rhs(0.0, y), rtol=1e-12, atol=1e-14
+        )
+        algebraic = [
+            dict(zip(model.algebraic_names, model.compute_variables(0.0, y)))
+            for model in (models[True], models[False])
+        ]
+        for key, value in algebraic[1].items():
+            np.testing.assert_allclose(algebraic[0][key], value, rtol=1e-12, atol=1e-14)
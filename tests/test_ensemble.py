@@ -0,0 +1,80 @@
+"""Ensemble simulations with libopencor sessions."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator
+from sbml2cellml.simulator.ensemble import ensemble_samples, run_ensemble
+
+
+@pytest.fixture
+def samples(cellml_path: Path) -> dict[str, np.ndarray]:
+    simulator = CellMLSimulator(cellml_path)
+    constant = simulator._names("constant")[0]
+    state = simulator._names("state")[0]
+    rng = np.random.default_rng(1)
+    return {constant: rng.uniform(0.5, 2.0, 5), state: rng.uniform(1.0, 3.0, 5)}
+
+
+def test_ensemble_samples() -> None:
+    assert ensemble_samples({"a": [1, 2], "b": [3, 4]}) == [
+        {"a": 1.0, "b": 3.0}, {"a": 2.0, "b": 4.0}
+    ]
+    assert ensemble_samples([{"a": 1}]) == [{"a": 1}]
+    with pytest.raises(ValueError):
+        ensemble_samples({"a": [1, 2], "b": [3]})
+
+
+def test_result_shape(cellml_path: Path, samples: dict) -> None:
+    result = run_ensemble(cellml_path, samples, end=10, steps=20, show_progress=False)
+    state = list(samples)[1]
+    assert result.data.shape == (5, 21, len(result.names))
+    assert result.time.shape == (21,)
+    assert result[state].shape == (5, 21)
+    assert set(result.units) == set(result.names)
+    assert result.failed == [] and result.success.all()
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_ensemble_matches_simulations(
+    cellml_path: Path, samples: dict, processes: int
+) -> None:
+    result = run_ensemble(
+        cellml_path, samples, end=10, steps=10, processes=processes, chunk_size=2,
+        show_progress=False,
+    )
+    simulator = CellMLSimulator(cellml_path)
+    for k, values in enumerate(ensemble_samples(samples)):
+        simulator.reset()
+        simulator.set_values(values)
+        timecourse = simulator.simulate(end=10, steps=10)
+        assert timecourse.names[1:] == result.names
+        np.testing.assert_allclose(result.time, timecourse.time)
+        np.testing.assert_allclose(result.data[k], timecourse.values)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_failed_samples(cellml_path: Path, processes: int) -> None:
+    """Failed samples (also the first one) are NaN and do not abort the ensemble."""
+    samples = [{"unknown_parameter": 1.0}, {}, {"unknown_parameter": 2.0}, {}]
+    result = run_ensemble(
+        cellml_path, samples, end=10, steps=10, processes=processes, chunk_size=1,
+        show_progress=False,
+    )
+    assert result.failed == [0, 2]
+    assert "unknown_parameter" in result.errors[0]
+    assert result.data.shape[:2] == (4, 11)
+    assert np.isnan(result.data[[0, 2]]).all()
+    assert not np.isnan(result.data[[1, 3]]).any()
+
+
+def test_all_samples_failed(cellml_path: Path) -> None:
+    result = run_ensemble(
+        cellml_path, [{"unknown_parameter": 1.0}] * 2, end=10, processes=1,
+        show_progress=False,
+    )
+    assert result.failed == [0, 1]
+    assert result.names == [] and result.time.size == 0
+    assert result.data.shape == (2, 0, 0)
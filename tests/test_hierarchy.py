@@ -0,0 +1,60 @@
+"""Hierarchical CellML models from SBML comp submodels."""
+
+import re
+
+import libcellml
+import numpy as np
+
+from conftest import MODELS_DIR
+from sbml2cellml.cellml2sbml import convert_sbml2cellml, write_model_to_string
+from sbml2cellml.hierarchy import convert_sbml2cellml_hierarchical
+from sbml2cellml.simulator.native_simulator import NativeModel, parse_cellml
+
+
+def native_model(model: libcellml.Model) -> NativeModel:
+    """Compiled model; units of numbers are not defined in the body models (FIXME)."""
+    source = re.sub(
+        r' cellml:units="\w+"', ' cellml:units="dimensionless"', write_model_to_string(model)
+    )
+    return NativeModel(parse_cellml(source), use_cache=False, source=source)
+
+
+def test_submodel_components() -> None:
+    """Components per submodel have the right hand side of the flattened model."""
+    model = convert_sbml2cellml_hierarchical(
+        MODELS_DIR / "glimepiride_body.xml", verbose=False
+    )
+    component = model.component("sbml")
+    assert [
+        component.component(k).name() for k in range(component.componentCount())
+    ] == ["KI", "LI", "GU"]
+
+    hierarchical = native_model(model)
+    flat = native_model(
+        convert_sbml2cellml(MODELS_DIR / "glimepiride_body_flat.xml", verbose=False)
+    )
+    # submodel variables 'KI/name' are 'sbml/KI__name' in the flattened model
+    index = []
+    for name in hierarchical.state_names:
+        component_name, variable = name.split("/", 1)
+        flat_name = f"sbml/{component_name}__{variable}"
+        if flat_name not in flat.state_names:
+            flat_name = f"sbml/{variable}"
+        index.append(flat.state_names.index(flat_name))
+    assert sorted(index) == list(range(len(flat.state_names)))
+
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        y = rng.uniform(0.5, 2.0, len(index))
+        y_flat = np.empty_like(y)
+        y_flat[index] = y
+        np.testing.assert_allclose(
+            hierarchical.rhs(1.0, y), flat.rhs(1.0, y_flat)[index], rtol=1e-12, atol=1e-15
+        )
+
+
+def test_model_without_submodels() -> None:
+    sbml_path = MODELS_DIR / "glimepiride_kidney.xml"
+    assert write_model_to_string(
+        convert_sbml2cellml_hierarchical(sbml_path, verbose=False)
+    ) == write_model_to_string(convert_sbml2cellml(sbml_path, verbose=False))
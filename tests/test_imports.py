@@ -0,0 +1,54 @@
+"""Startup: the conversion must not import the numerical, simulation and plotting stack."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["numpy", "scipy", "pandas", "matplotlib", "libopencor"]
+# native libraries required by the conversion
+REQUIRED_MODULES = ["libsbml", "libcellml"]
+# import time of the package without the required libraries [s], about 0.07 s
+# locally; a coarse guard against slow imports besides the heavy modules
+IMPORT_TIME_BUDGET = 0.2
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Cumulative import times [s] of all modules loaded by importing the module.
+
+    The module is imported in a fresh interpreter with `-X importtime`.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    times: dict[str, float] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) * 1e-6
+    return times
+
+
+def heavy_modules(times: dict[str, float]) -> list[str]:
+    return [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["sbml2cellml.cli", "sbml2cellml.cellml2sbml", "sbml2cellml.hierarchy", "sbml2cellml.watch"],
+)
+def test_conversion_imports(module: str) -> None:
+    times = import_times(module)
+    assert heavy_modules(times) == []
+    own_time = times[module] - sum(times.get(name, 0.0) for name in REQUIRED_MODULES)
+    assert own_time < IMPORT_TIME_BUDGET
+
+
+def test_cellml_simulator_imports() -> None:
+    # the results of the libopencor session are numpy arrays
+    times = import_times("sbml2cellml.simulator.cellml_simulator")
+    assert [name for name in heavy_modules(times) if not name.startswith("numpy")] == []
@@ -0,0 +1,157 @@
+"""Incremental re-conversion against full conversion."""
+
+from pathlib import Path
+
+import pytest
+
+from sbml2cellml.incremental import IncrementalConverter
+
+KINETIC_LAW = """              <ci> M1EX_k </ci>
+              <ci> m1_ext </ci>
+            </apply>
+          </math>"""
+URINE = 'id="Vurine" name="urine" spatialDimensions="3" size="1" units="litre" constant="true"'
+M1_URINE = 'id="m1_urine" name="M1 (urine)" compartment="Vurine" initialConcentration="0"'
+URINE_RULE = '''<assignmentRule variable="Vurine">
+        <math xmlns="http://www.w3.org/1998/Math/MathML">
+          <apply><times/><ci> f_renal_function </ci><cn> 3 </cn></apply>
+        </math>
+      </assignmentRule>
+      <assignmentRule name="estimated eGFR"'''
+
+
+def edit(sbml_path: Path, old: str, new: str) -> None:
+    """Replace the first occurrence of old in the SBML file."""
+    text = sbml_path.read_text(encoding="utf-8")
+    assert old in text
+    sbml_path.write_text(text.replace(old, new, 1), encoding="utf-8")
+
+
+def full_conversion(sbml_path: Path, tmp_path: Path) -> bytes:
+    cellml_path = tmp_path / "full" / "model.cellml"
+    cellml_path.parent.mkdir(exist_ok=True)
+    IncrementalConverter(sbml_path, cellml_path).convert(full=True)
+    return cellml_path.read_bytes()
+
+
+@pytest.fixture
+def converter(kidney_sbml: Path) -> IncrementalConverter:
+    converter = IncrementalConverter(kidney_sbml, kidney_sbml.with_suffix(".cellml"))
+    result = converter.convert()
+    assert result.full
+    return converter
+
+
+def test_unchanged(converter: IncrementalConverter) -> None:
+    result = converter.convert()
+    assert not result.full
+    assert result.changed == []
+
+
+@pytest.mark.parametrize(
+    "old, new, changed",
+    [
+        (
+            KINETIC_LAW,
+            KINETIC_LAW.replace("<ci> m1_ext </ci>", "<ci> m1_ext </ci>\n<cn> 2 </cn>"),
+            ["reaction:M1EX"],
+        ),
+        ('id="BSA" name="body surface area [m^2]" value="1.73"',
+         'id="BSA" name="body surface area [m^2]" value="1.9"', ["parameter:BSA"]),
+        ('id="f_renal_function" name="parameter for renal function" value="1"',
+         'id="f_renal_function" name="parameter for renal function" value="0.5"',
+         ["parameter:f_renal_function"]),
+    ],
+)
+def test_incremental_equals_full(
+    converter: IncrementalConverter, tmp_path: Path, old: str, new: str, changed: list[str]
+) -> None:
+    edit(converter.sbml_path, old, new)
+    result = converter.convert()
+    assert not result.full
+    assert result.changed == changed
+    assert converter.cellml_path.read_bytes() == full_conversion(converter.sbml_path, tmp_path)
+
+
+
+@pytest.mark.parametrize(
+    "setup, old, new",
+    [
+        # amount from concentration: m1_urine = 2 * Vurine
+        ([], URINE, URINE.replace('size="1"', 'size="3"')),
+        # compartment size from an assignment rule
+        (
+            [(URINE, URINE.replace('constant="true"', 'constant="false"')),
+             ('<assignmentRule name="estimated eGFR"', URINE_RULE)],
+            'id="f_renal_function" name="parameter for renal function" value="1"',
+            'id="f_renal_function" name="parameter for renal function" value="0.5"',
+        ),
+        (
+            [(URINE, URINE.replace('constant="true"', 'constant="false"')),
+             ('<assignmentRule name="estimated eGFR"', URINE_RULE)],
+            "<cn> 3 </cn>",
+            "<cn> 5 </cn>",
+        ),
+    ],
+)
+def test_dependent_initial_values(
+    kidney_sbml: Path, tmp_path: Path, setup: list, old: str, new: str
+) -> None:
+    """Changes of values other initial values depend on convert fully."""
+    edit(kidney_sbml, M1_URINE, M1_URINE.replace('Concentration="0"', 'Concentration="2"'))
+    for setup_old, setup_new in setup:
+        edit(kidney_sbml, setup_old, setup_new)
+    converter = IncrementalConverter(kidney_sbml, kidney_sbml.with_suffix(".cellml"))
+    converter.convert()
+    cellml = converter.cellml_path.read_bytes()
+
+    edit(kidney_sbml, old, new)
+    result = converter.convert()
+    assert result.full
+    assert converter.cellml_path.read_bytes() != cellml
+    assert converter.cellml_path.read_bytes() == full_conversion(kidney_sbml, tmp_path)
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        # local parameters of kinetic laws
+        ('<localParameter id="k_local" value="1"/>', '<localParameter id="k_local" value="2"/>'),
+        # attributes besides the value
+        ('id="BSA" name="body surface area [m^2]"', 'id="BSA" name="body surface area"'),
+        ('units="m2" constant="false">', 'units="dimensionless" constant="false">'),
+    ],
+)
+def test_structural_changes_convert_fully(
+    kidney_sbml: Path, tmp_path: Path, old: str, new: str
+) -> None:
+    edit(
+        kidney_sbml,
+        KINETIC_LAW,
+        KINETIC_LAW + "\n          <listOfLocalParameters>"
+        '<localParameter id="k_local" value="1"/></listOfLocalParameters>',
+    )
+    converter = IncrementalConverter(kidney_sbml, kidney_sbml.with_suffix(".cellml"))
+    assert converter.convert().full
+    assert not converter.convert().full
+
+    edit(kidney_sbml, old, new)
+    result = converter.convert()
+    assert result.full
+    assert converter.cellml_path.read_bytes() == full_conversion(kidney_sbml, tmp_path)
+    assert not converter.convert().full
+
+
+def test_notes_are_ignored(converter: IncrementalConverter) -> None:
+    text = converter.sbml_path.read_text(encoding="utf-8")
+    start = text.index('<reaction metaid="meta_M1EX"')
+    index = text.index("</annotation>", start) + len("</annotation>")
+    converter.sbml_path.write_text(
+        text[:index]
+        + '<notes><p xmlns="http://www.w3.org/1999/xhtml">M1 excretion</p></notes>'
+        + text[index:],
+        encoding="utf-8",
+    )
+    result = converter.convert()
+    assert not result.full
+    assert result.changed == []
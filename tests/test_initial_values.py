@@ -0,0 +1,85 @@
+"""Initial values from InitialAssignments and AssignmentRules."""
+
+import math
+
+import libsbml
+import pytest
+
+from sbml2cellml.console import console
+from sbml2cellml.initial_values import evaluate_initial_values
+
+
+def create_model() -> tuple[libsbml.SBMLDocument, libsbml.Model]:
+    doc = libsbml.SBMLDocument(3, 2)
+    model = doc.createModel()
+    model.setId("m")
+    compartment = model.createCompartment()
+    compartment.setId("V")
+    compartment.setSize(2.0)
+    compartment.setConstant(True)
+    for pid, value in [("a", 2.0), ("b", 3.0), ("c", None)]:
+        parameter = model.createParameter()
+        parameter.setId(pid)
+        if value is not None:
+            parameter.setValue(value)
+        parameter.setConstant(False)
+    return doc, model
+
+
+def add_initial_assignment(model: libsbml.Model, symbol: str, formula: str) -> None:
+    assignment = model.createInitialAssignment()
+    assignment.setSymbol(symbol)
+    assignment.setMath(libsbml.parseL3Formula(formula))
+
+
+def test_dependency_order() -> None:
+    doc, model = create_model()
+    add_initial_assignment(model, "b", "a * 2")
+    rule = model.createAssignmentRule()
+    rule.setVariable("c")
+    rule.setMath(libsbml.parseL3Formula("b + V"))
+    add_initial_assignment(model, "a", "10")
+    values = evaluate_initial_values(model)
+    assert values == {"V": 2.0, "a": 10.0, "b": 20.0, "c": 22.0}
+
+
+def test_species_amount_concentration() -> None:
+    doc, model = create_model()
+    for sid, amount, only_substance in [("s1", 4.0, False), ("s2", 4.0, True)]:
+        species = model.createSpecies()
+        species.setId(sid)
+        species.setCompartment("V")
+        species.setInitialAmount(amount)
+        species.setHasOnlySubstanceUnits(only_substance)
+    values = evaluate_initial_values(model)
+    assert values["s1"] == 2.0  # concentration
+    assert values["s2"] == 4.0  # amount
+
+
+def test_undetermined_value() -> None:
+    doc, model = create_model()
+    assert math.isnan(evaluate_initial_values(model)["c"])
+
+
+@pytest.mark.parametrize(
+    "formula, error",
+    [
+        ("1.0 / 0.0", "ZeroDivisionError"),
+        ("2 / (1 - 1)", "ZeroDivisionError"),
+        ("1 / (V - 2)", "ZeroDivisionError"),
+        ("ln(V - 2)", "ValueError"),
+        ("sqrt(-V)", "ValueError"),
+        ("(V - 2)^-1", "ValueError"),
+    ],
+)
+def test_invalid_operations_keep_declared_value(formula: str, error: str) -> None:
+    """Numbers and variables follow the same rule: declared value and a warning."""
+    doc, model = create_model()
+    add_initial_assignment(model, "a", formula)
+    add_initial_assignment(model, "b", "a * 2")
+    console.export_text(clear=True)
+    values = evaluate_initial_values(model)
+    assert values["a"] == 2.0
+    assert values["b"] == 4.0
+    output = console.export_text(clear=True)
+    assert f"Initial value of 'a' cannot be evaluated: {error}" in output
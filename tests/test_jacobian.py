@@ -0,0 +1,145 @@
+"""Analytic sparse Jacobian against finite differences."""
+
+from pathlib import Path
+
+import libsbml
+import numpy as np
+
+from conftest import MODELS_DIR
+from sbml2cellml.jacobian import (
+    create_symbolic_jacobian,
+    generate_jacobian_code,
+    read_symbolic_jacobian,
+)
+from sbml2cellml.simulator.native_simulator import NativeModel, compile_jacobian
+
+# rate rules with all functions and operators of the generated code
+RATE_RULES = {
+    "x": "piecewise(k1 * x, (x > y) && (y < 2) || !(x == k2), -x^2) + max(x, y, k2)"
+         " + min(x, 3) * xor(x > 1, y > 1)",
+    "y": "abs(x - y) * ln(x) + power(y, k2) + exp(-x) / sqrt(y) + floor(x) * y"
+         " + ceil(y) * sin(x) * cos(y) - tan(x / 10) + tanh(y) * cosh(x / 4)"
+         " + sinh(y / 5) + root(3, x * y) + log(2, y) + pi * k1 * time",
+}
+
+
+def finite_differences(model: NativeModel, t: float, y: np.ndarray) -> np.ndarray:
+    """Central finite differences of the right hand side."""
+    jac = np.empty((len(y), len(y)))
+    for k in range(len(y)):
+        h = 1e-6 * max(abs(y[k]), 1.0)
+        dy = np.zeros_like(y)
+        dy[k] = h
+        jac[:, k] = (model.rhs(t, y + dy) - model.rhs(t, y - dy)) / (2 * h)
+    return jac
+
+
+def test_jacobian_matches_finite_differences(cellml_path: Path) -> None:
+    jacobian = read_symbolic_jacobian(MODELS_DIR / f"{cellml_path.stem}.xml")
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    model.set_jacobian(jacobian)
+
+    rng = np.random.default_rng(42)
+    for _ in range(5):
+        y = rng.uniform(0.1, 10.0, len(model.state_names))
+        analytic = model.jacobian(0.0, y).toarray()
+        np.testing.assert_allclose(
+            analytic, finite_differences(model, 0.0, y), rtol=1e-5, atol=1e-8
+        )
+
+
+def test_sparsity_pattern(cellml_path: Path) -> None:
+    """Nonzeros of the finite differences are in the symbolic sparsity pattern."""
+    jacobian = read_symbolic_jacobian(MODELS_DIR / f"{cellml_path.stem}.xml")
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    states = [name.split("/", 1)[-1] for name in model.state_names]
+    pattern = jacobian.sparsity(states)
+    y = np.random.default_rng(0).uniform(0.1, 10.0, len(states))
+    assert not (np.abs(finite_differences(model, 0.0, y)) > 1e-12)[~pattern].any()
+
+
+def test_analytic_jacobian_integration(cellml_path: Path) -> None:
+    jacobian = read_symbolic_jacobian(MODELS_DIR / f"{cellml_path.stem}.xml")
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    y0 = np.ones(len(model.state_names))
+    reference = model.simulate(end=100, steps=20, method="BDF", y0=y0, rtol=1e-8, atol=1e-10)
+    model.set_jacobian(jacobian)
+    solution = model.simulate(end=100, steps=20, method="BDF", y0=y0, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(solution.y, reference.y, rtol=1e-5, atol=1e-8)
+
+
+def rule_model() -> libsbml.Model:
+    doc = libsbml.SBMLDocument(3, 2)
+    model = doc.createModel()
+    for pid, constant in [("x", False), ("y", False), ("k1", True), ("k2", True)]:
+        parameter = model.createParameter()
+        parameter.setId(pid)
+        parameter.setValue(1.0)
+        parameter.setConstant(constant)
+    for variable, formula in RATE_RULES.items():
+        rule = model.createRateRule()
+        rule.setVariable(variable)
+        ast = libsbml.parseL3Formula(formula)
+        assert ast is not None, libsbml.getLastParseL3Error()
+        rule.setMath(ast)
+    # keep the document alive with the model
+    model.document = doc
+    return model
+
+
+def test_c_code_matches_python_code() -> None:
+    jacobian = create_symbolic_jacobian(rule_model())
+    code = generate_jacobian_code(
+        jacobian, state_names=["m/x", "m/y"], constant_names=["m/k1", "m/k2"],
+        parameters=["m/k1", "m/k2"],
+    )
+    python_f = code.compile()
+    c_f = compile_jacobian(code, use_cache=False)
+
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        t = rng.uniform(0.0, 10.0)
+        y = rng.uniform(0.1, 4.0, 2)
+        c = rng.uniform(0.5, 3.0, 2)
+        results = []
+        for f in (python_f, c_f):
+            data, dfdp = np.empty(len(code.indices)), np.zeros((2, 2))
+            f(t, y, c, np.empty(0), data, dfdp)
+            results.append((data, dfdp))
+        np.testing.assert_allclose(results[1][0], results[0][0], rtol=1e-12)
+        np.testing.assert_allclose(results[1][1], results[0][1], rtol=1e-12)
+
+
+def test_jacobian_reaches_solver() -> None:
+    """The analytic Jacobian replaces the finite differences of the solver."""
+    from sbml2cellml.cellml2sbml import convert_sbml2cellml
+
+    model = NativeModel(
+        convert_sbml2cellml(MODELS_DIR / "glimepiride_liver.xml", verbose=False),
+        use_cache=False,
+    )
+    y0 = np.ones(len(model.state_names))
+    rhs = model.rhs
+    calls = {"rhs": 0, "jacobian": 0}
+
+    def count_rhs(t: float, y: np.ndarray) -> np.ndarray:
+        calls["rhs"] += 1
+        return rhs(t, y)
+
+    model.rhs = count_rhs
+    model.simulate(end=1000, method="LSODA", y0=y0)
+    rhs_fd = calls["rhs"]
+
+    model.set_jacobian(read_symbolic_jacobian(MODELS_DIR / "glimepiride_liver.xml"))
+    jacobian_dense = model.jacobian_dense
+
+    def count_jacobian(t: float, y: np.ndarray) -> np.ndarray:
+        calls["jacobian"] += 1
+        return jacobian_dense(t, y)
+
+    model.jacobian_dense = count_jacobian
+    calls["rhs"] = 0
+    solution = model.simulate(end=1000, method="LSODA", y0=y0)
+    assert calls["jacobian"] == solution.njev > 0
+    # finite differences need n evaluations of the right hand side per Jacobian
+    assert calls["rhs"] <= rhs_fd - len(y0) * solution.njev // 2
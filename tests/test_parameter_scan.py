@@ -0,0 +1,74 @@
+"""Parameter scans with libopencor sessions."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("xarray")
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator  # noqa: E402
+from sbml2cellml.simulator.parameter_scan import (  # noqa: E402
+    parameter_sets,
+    run_parameter_scan,
+)
+
+
+def test_parameter_sets() -> None:
+    sets = parameter_sets({"a": [1, 2], "b": [3, 4, 5]})
+    assert len(sets) == 6
+    assert sets[0] == {"a": 1, "b": 3} and sets[-1] == {"a": 2, "b": 5}
+    assert parameter_sets([{"a": 1}]) == [{"a": 1}]
+
+
+@pytest.fixture
+def grid(cellml_path: Path) -> dict[str, list[float]]:
+    simulator = CellMLSimulator(cellml_path)
+    constant = simulator._names("constant")[0]
+    state = simulator._names("state")[0]
+    return {constant: [0.5, 1.0, 2.0], state: [1.0, 3.0]}
+
+
+def test_scan_matches_simulations(cellml_path: Path, grid: dict) -> None:
+    dataset = run_parameter_scan(cellml_path, grid, end=10, steps=10, processes=1)
+    constant, state = grid
+    dims = (constant, f"{state}_initial", "time")
+    assert dict(dataset.sizes) == dict(zip(dims, (3, 2, 11)))
+    np.testing.assert_array_equal(dataset[constant].values, grid[constant])
+    np.testing.assert_array_equal(dataset[f"{state}_initial"].values, grid[state])
+    assert dataset.attrs["failed"] == []
+
+    simulator = CellMLSimulator(cellml_path)
+    for values in parameter_sets(grid):
+        simulator.reset()
+        simulator.set_values(values)
+        result = simulator.simulate(end=10, steps=10)
+        selection = {constant: values[constant], f"{state}_initial": values[state]}
+        for name in result.names[1:]:
+            assert dataset[name].dims == dims
+            np.testing.assert_allclose(dataset[name].sel(selection).values, result[name])
+
+
+def test_scan_processes(cellml_path: Path, grid: dict) -> None:
+    serial = run_parameter_scan(cellml_path, grid, end=10, steps=10, processes=1)
+    parallel = run_parameter_scan(
+        cellml_path, grid, end=10, steps=10, processes=2, chunk_size=1
+    )
+    for name in serial.data_vars:
+        np.testing.assert_array_equal(serial[name].values, parallel[name].values)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_scan_failures(cellml_path: Path, processes: int) -> None:
+    """Failed sets are NaN and reported without aborting the scan."""
+    sets = [{}, {"unknown_parameter": 1.0}, {}]
+    dataset = run_parameter_scan(
+        cellml_path, sets, end=10, steps=10, processes=processes, chunk_size=1
+    )
+    assert dataset.sizes["scan"] == 3
+    np.testing.assert_array_equal(dataset["unknown_parameter"].values, [np.nan, 1.0, np.nan])
+    assert dataset.attrs["failed"] == [1]
+    assert "unknown_parameter" in dataset.attrs["errors"][0]
+    name = next(iter(dataset.data_vars))
+    assert np.isnan(dataset[name].values[1]).all()
+    assert not np.isnan(dataset[name].values[[0, 2]]).any()
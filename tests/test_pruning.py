@@ -0,0 +1,47 @@
+"""Dead-equation elimination of the conversion."""
+
+import libcellml
+import libsbml
+import numpy as np
+import pytest
+
+from conftest import MODELS_DIR
+from sbml2cellml.cellml2sbml import convert_sbml2cellml
+from sbml2cellml.pruning import prune_variables
+from sbml2cellml.simulator.native_simulator import NativeModel
+
+KIDNEY = MODELS_DIR / "glimepiride_kidney.xml"
+
+
+def variable_names(model: libcellml.Model) -> set[str]:
+    component = model.component("sbml")
+    return {component.variable(k).name() for k in range(component.variableCount())}
+
+
+def test_pruned_model_has_same_trajectories() -> None:
+    full = convert_sbml2cellml(KIDNEY, verbose=False)
+    pruned = convert_sbml2cellml(KIDNEY, verbose=False, prune=True)
+    assert variable_names(pruned) < variable_names(full)
+
+    solutions = []
+    for model in [full, pruned]:
+        native = NativeModel(model, use_cache=False)
+        y0 = np.arange(1.0, len(native.state_names) + 1)
+        solutions.append((native.state_names, native.simulate(end=100, y0=y0, rtol=1e-10)))
+    (names_full, full_solution), (names_pruned, pruned_solution) = solutions
+    assert names_pruned == names_full
+    np.testing.assert_allclose(pruned_solution.y, full_solution.y, rtol=1e-12, atol=1e-15)
+
+
+def test_outputs_are_kept() -> None:
+    m_sbml = libsbml.readSBMLFromFile(str(KIDNEY)).getModel()
+    removed = prune_variables(m_sbml).removed["parameter"]
+    assert removed
+
+    report = prune_variables(m_sbml, outputs=[removed[0]])
+    assert removed[0] in report.kept
+    pruned = convert_sbml2cellml(KIDNEY, verbose=False, prune=True, outputs=[removed[0]])
+    assert removed[0] in variable_names(pruned)
+
+    with pytest.raises(KeyError, match="unknown_variable"):
+        prune_variables(m_sbml, outputs=["unknown_variable"])
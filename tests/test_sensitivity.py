@@ -0,0 +1,46 @@
+"""Forward sensitivities against finite differences of the parameters."""
+
+from pathlib import Path
+
+import numpy as np
+
+from conftest import MODELS_DIR
+from sbml2cellml.jacobian import read_symbolic_jacobian
+from sbml2cellml.simulator.native_simulator import NativeModel
+from sbml2cellml.simulator.sensitivity import simulate_sensitivities
+
+END, STEPS = 50.0, 10
+
+
+def test_sensitivities_match_finite_differences(cellml_path: Path) -> None:
+    jacobian = read_symbolic_jacobian(MODELS_DIR / f"{cellml_path.stem}.xml")
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    # nontrivial initial states
+    y0 = np.ones(len(model.state_names))
+    model.states[:] = y0
+    parameters = [name for k, name in enumerate(model.constant_names) if model.constants[k]]
+    parameters = parameters[:3]
+    result = simulate_sensitivities(
+        model, jacobian, parameters, end=END, steps=STEPS, rtol=1e-10, atol=1e-12
+    )
+    assert result.sensitivities.shape == (STEPS + 1, len(model.state_names), len(parameters))
+    assert np.abs(result.sensitivities).max() > 1e-3
+
+    scale = np.abs(result.sensitivities).max()
+    for j, name in enumerate(parameters):
+        value = model.constants[model.constant_names.index(name)]
+        h = 1e-5 * abs(value)
+        states = []
+        for p in [value + h, value - h]:
+            model.reset()
+            model.set_parameters({name: p})
+            states.append(
+                model.simulate(
+                    end=END, steps=STEPS, method="BDF", rtol=1e-10, atol=1e-12, y0=y0
+                ).y.T
+            )
+        model.reset()
+        finite_differences = (states[0] - states[1]) / (2 * h)
+        np.testing.assert_allclose(
+            result.sensitivities[:, :, j], finite_differences, rtol=1e-3, atol=1e-5 * scale
+        )
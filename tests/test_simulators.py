@@ -0,0 +1,72 @@
+"""Agreement of the simulator backends."""
+
+from pathlib import Path
+
+import numpy as np
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator
+from sbml2cellml.simulator.native_simulator import NativeModel
+from sbml2cellml.simulator.vectorized_simulator import VectorizedModel
+
+END, STEPS = 50.0, 50
+# libopencor integrates with its own solver settings
+ATOL = 1e-6
+
+
+def initial_values(names: list[str]) -> dict[str, float]:
+    """Nontrivial initial values (the models start with all states at 0)."""
+    return {name: 1.0 + k for k, name in enumerate(names)}
+
+
+def test_native_matches_libopencor(cellml_path: Path) -> None:
+    simulator = CellMLSimulator(cellml_path)
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    simulator.set_initial_values(initial_values(model.state_names))
+    model.set_initial_values(initial_values(model.state_names))
+    reference = simulator.simulate(end=END, steps=STEPS)
+    assert model.state_names == reference.names[1:]
+    assert np.ptp(reference.values, axis=0).max() > 1e-3
+    solution = model.simulate(end=END, steps=STEPS, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(solution.t, reference.time)
+    np.testing.assert_allclose(solution.y.T, reference.values, rtol=1e-4, atol=ATOL)
+
+
+def test_native_parameters(cellml_path: Path) -> None:
+    """Changed constants give the same results in both backends."""
+    simulator = CellMLSimulator(cellml_path)
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    name = model.constant_names[0]
+    value = 2 * model.constants[0] + 1.0
+    simulator.set_values({name: value, **initial_values(model.state_names)})
+    model.set_values({name: value, **initial_values(model.state_names)})
+    reference = simulator.simulate(end=END, steps=STEPS)
+    solution = model.simulate(end=END, steps=STEPS, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(solution.y.T, reference.values, rtol=1e-4, atol=ATOL)
+
+    model.reset()
+    simulator.reset()
+    model.set_initial_values(initial_values(model.state_names))
+    simulator.set_initial_values(initial_values(model.state_names))
+    np.testing.assert_allclose(
+        model.simulate(end=END, steps=STEPS, rtol=1e-8, atol=1e-10).y.T,
+        simulator.simulate(end=END, steps=STEPS).values, rtol=1e-4, atol=ATOL,
+    )
+
+
+def test_vectorized_matches_native(cellml_path: Path) -> None:
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    vectorized = VectorizedModel.from_file(cellml_path)
+    assert vectorized.state_names == model.state_names
+
+    name = model.constant_names[0]
+    values = np.array([0.5, 1.0, 2.0]) * model.constants[0] + 0.1
+    result = vectorized.simulate(
+        end=END, steps=STEPS, parameters={name: values},
+        initial_values=initial_values(model.state_names), rtol=1e-8, atol=1e-10,
+    )
+    assert result.states.shape == (STEPS + 1, len(model.state_names), len(values))
+    for k, value in enumerate(values):
+        model.reset()
+        model.set_values({name: value, **initial_values(model.state_names)})
+        solution = model.simulate(end=END, steps=STEPS, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(result.states[:, :, k], solution.y.T, rtol=1e-4, atol=1e-8)
@@ -0,0 +1,44 @@
+"""Steady states against long integrations of the models."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.integrate import solve_ivp
+
+from sbml2cellml.simulator.native_simulator import NativeModel
+from sbml2cellml.simulator.steady_state import _pseudo_transient, find_steady_state
+
+
+def integrated_steady_state(model: NativeModel, y0: np.ndarray) -> np.ndarray:
+    solution = solve_ivp(
+        model.rhs, (0.0, 1e7), y0, method="BDF", rtol=1e-10, atol=1e-14
+    )
+    assert solution.success
+    return solution.y[:, -1]
+
+
+@pytest.mark.parametrize("use_newton", [True, False])
+def test_steady_state_matches_integration(cellml_path: Path, use_newton: bool) -> None:
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    # nontrivial initial states, the steady state depends on the conserved totals
+    y0 = np.arange(1.0, len(model.state_names) + 1)
+    expected = integrated_steady_state(model, y0)
+    assert np.abs(expected).max() > 1.0
+
+    result = find_steady_state(model, y0, use_newton=use_newton)
+    assert result.residual <= 1e-10
+    np.testing.assert_allclose(result.states, expected, rtol=1e-6, atol=1e-6)
+    assert result.algebraic.shape == (len(model.algebraic_names),)
+
+
+def test_pseudo_transient_does_not_diverge(cellml_path: Path) -> None:
+    """Steps increasing the residual are rejected."""
+    model = NativeModel.from_file(cellml_path, use_cache=False)
+    y0 = np.arange(1.0, len(model.state_names) + 1)
+    f = lambda y: model.rhs(0.0, y)  # noqa: E731
+    y, residual, _ = _pseudo_transient(f, y0, tol=1e-10, max_iter=2000)
+    assert residual <= np.abs(f(y0)).max()
+    # states stay on the trajectory, i.e. bounded by the conserved totals
+    assert np.abs(y).max() <= y0.sum()
+
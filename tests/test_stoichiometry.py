@@ -0,0 +1,61 @@
+"""Sparse stoichiometric matrix of SBML models."""
+
+from pathlib import Path
+
+import libsbml
+import numpy as np
+import pytest
+
+from conftest import SBML_PATHS
+from sbml2cellml.stoichiometry import create_stoichiometric_matrix
+
+
+def dense_stoichiometry(m_sbml: libsbml.Model) -> np.ndarray:
+    """Dense stoichiometric matrix summed over all species references."""
+    species = [s.getId() for s in m_sbml.getListOfSpecies()]
+    matrix = np.zeros((len(species), m_sbml.getNumReactions()))
+    for j, r in enumerate(m_sbml.getListOfReactions()):
+        for sign, srefs in [(-1.0, r.getListOfReactants()), (1.0, r.getListOfProducts())]:
+            for sref in srefs:
+                value = sref.getStoichiometry() if sref.isSetStoichiometry() else 1.0
+                matrix[species.index(sref.getSpecies()), j] += sign * value
+    return matrix
+
+
+@pytest.mark.parametrize("sbml_path", SBML_PATHS, ids=lambda path: path.stem)
+def test_rows_match_dense_matrix(sbml_path: Path) -> None:
+    m_sbml = libsbml.readSBMLFromFile(str(sbml_path)).getModel()
+    stoichiometry = create_stoichiometric_matrix(m_sbml)
+    dense = dense_stoichiometry(m_sbml)
+
+    np.testing.assert_array_equal(stoichiometry.to_dense(), dense)
+    for i, sid in enumerate(stoichiometry.species):
+        expected = [
+            (stoichiometry.reactions[j], dense[i, j]) for j in np.flatnonzero(dense[i])
+        ]
+        assert stoichiometry.row(sid) == expected
+
+
+def test_net_stoichiometry() -> None:
+    """Species on both sides of a reaction contribute the net stoichiometry."""
+    doc = libsbml.SBMLDocument(3, 2)
+    m_sbml = doc.createModel()
+    for sid in ["A", "B"]:
+        m_sbml.createSpecies().setId(sid)
+    reaction = m_sbml.createReaction()
+    reaction.setId("r")
+    for sid, stoichiometry, create in [
+        ("A", 2.0, reaction.createReactant),
+        ("A", 2.0, reaction.createProduct),
+        ("B", 1.0, reaction.createReactant),
+        ("B", 3.0, reaction.createProduct),
+    ]:
+        sref = create()
+        sref.setSpecies(sid)
+        sref.setStoichiometry(stoichiometry)
+
+    stoichiometry = create_stoichiometric_matrix(m_sbml)
+    assert stoichiometry.row("A") == []
+    assert stoichiometry.row("B") == [("r", 2.0)]
+    assert stoichiometry.species_index is stoichiometry.species_index
+    np.testing.assert_array_equal(stoichiometry.to_dense(), [[0.0], [2.0]])
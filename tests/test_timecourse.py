@@ -0,0 +1,53 @@
+"""Timecourse results backed by a single NumPy array."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator
+from sbml2cellml.simulator.timecourse import TimecourseResult
+
+
+@pytest.fixture
+def result() -> TimecourseResult:
+    result = TimecourseResult.empty(
+        n_time=3, names=["time", "c/x", "c/y"], units={"time": "second", "c/x": "mM", "c/y": "mM"}
+    )
+    result.data[:] = np.arange(9.0).reshape(3, 3)
+    return result
+
+
+def test_columns(result: TimecourseResult) -> None:
+    assert result.voi_name == "time"
+    np.testing.assert_array_equal(result.time, [0.0, 3.0, 6.0])
+    np.testing.assert_array_equal(result["y"], [2.0, 5.0, 8.0])
+    assert result.values.shape == (3, 2)
+
+
+def test_to_pandas(result: TimecourseResult) -> None:
+    pytest.importorskip("pandas")
+    df = result.to_pandas()
+    assert list(df.columns) == result.names
+    np.testing.assert_array_equal(df.values, result.data)
+
+
+def test_to_pandas_without_copy(cellml_path: Path) -> None:
+    """Simulation results are Fortran ordered, columns of the data frame are views."""
+    pytest.importorskip("pandas")
+    result = CellMLSimulator(cellml_path).simulate(end=10, steps=10)
+    assert result.data.flags.f_contiguous
+    df = result.to_pandas()
+    for name in result.names:
+        assert np.shares_memory(df[name].to_numpy(), result.data)
+    result.data[0, -1] = -1.0
+    assert df[result.names[-1]].iloc[0] == -1.0
+
+
+def test_to_pandas_without_pandas(
+    result: TimecourseResult, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(sys.modules, "pandas", None)
+    with pytest.raises(ImportError, match=r"sbml2cellml\[pandas\]"):
+        result.to_pandas()
@@ -0,0 +1,37 @@
+"""Chunked timecourses in HDF5 files."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("h5py")
+
+from sbml2cellml.simulator.cellml_simulator import CellMLSimulator  # noqa: E402
+from sbml2cellml.simulator.timecourse_store import (  # noqa: E402
+    HDF5Timecourse,
+    simulate_to_hdf5,
+)
+
+
+@pytest.mark.parametrize("chunk_steps", [7, 50, 1000])
+def test_chunks_match_single_run(cellml_path: Path, tmp_path: Path, chunk_steps: int) -> None:
+    simulator = CellMLSimulator(cellml_path)
+    # nontrivial initial states
+    simulator.set_initial_values({name: 1.0 for name in simulator._names("state")})
+    changes = simulator.get_changes()
+    reference = simulator.simulate(end=100, steps=50)
+
+    h5_path = simulate_to_hdf5(
+        simulator, tmp_path / "timecourse.h5", end=100, steps=50, chunk_steps=chunk_steps
+    )
+    assert simulator.get_changes() == changes
+
+    with HDF5Timecourse(h5_path) as timecourse:
+        assert timecourse.names == reference.names
+        assert timecourse.units == reference.units
+        result = timecourse.load()
+    np.testing.assert_allclose(result.time, reference.time, rtol=1e-12)
+    # every segment restarts the solver, errors are relative to the scale of the values
+    scale = np.abs(reference.values).max()
+    np.testing.assert_allclose(result.values, reference.values, rtol=0, atol=6e-6 * scale)
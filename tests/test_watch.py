@@ -0,0 +1,50 @@
+"""Reconversion of changed models by the resident watcher."""
+
+from pathlib import Path
+
+from sbml2cellml.cellml2sbml import convert_sbml2cellml, write_model_to_string
+from sbml2cellml.watch import ModelWatcher
+
+F_RENAL = 'id="f_renal_function" name="parameter for renal function" value="1"'
+
+
+def test_process_modified_file(kidney_sbml: Path, tmp_path: Path) -> None:
+    watcher = ModelWatcher(
+        kidney_sbml.parent, cellml_dir=tmp_path / "cellml", cache_dir=tmp_path / "cache"
+    )
+    result = watcher.process(kidney_sbml)
+    assert result.error is None
+    assert not result.cached
+    assert result.cellml_path == tmp_path / "cellml" / f"{kidney_sbml.stem}.cellml"
+    assert not result.analyser_issues
+    cellml = result.cellml_path.read_text(encoding="utf-8")
+
+    assert watcher.process(kidney_sbml).cached
+
+    text = kidney_sbml.read_text(encoding="utf-8")
+    kidney_sbml.write_text(text.replace(F_RENAL, F_RENAL.replace('"1"', '"0.5"')))
+    result = watcher.process(kidney_sbml)
+    assert result.error is None
+    assert not result.cached
+    cellml_modified = result.cellml_path.read_text(encoding="utf-8")
+    assert cellml_modified != cellml
+    assert cellml_modified == write_model_to_string(
+        convert_sbml2cellml(kidney_sbml, verbose=False)
+    )
+
+
+def test_process_simulation(kidney_sbml: Path, tmp_path: Path) -> None:
+    watcher = ModelWatcher(kidney_sbml.parent, simulate=10, use_cache=False)
+    result = watcher.process(kidney_sbml)
+    assert result.error is None
+    assert result.time_simulation is not None
+
+
+def test_process_invalid_file(tmp_path: Path) -> None:
+    sbml_path = tmp_path / "invalid.xml"
+    sbml_path.write_text("<sbml>", encoding="utf-8")
+    watcher = ModelWatcher(tmp_path, cache_dir=tmp_path / "cache")
+    result = watcher.process(sbml_path)
+    assert result.error is not None
+    assert "\n" not in result.error
+    assert result.time_simulation is None
@@ -0,0 +1,47 @@
+"""Streaming CellML writer against the libcellml Printer."""
+
+import gzip
+import io
+from pathlib import Path
+
+import libcellml
+import pytest
+
+from conftest import SBML_PATHS
+from sbml2cellml.cellml2sbml import (
+    convert_sbml2cellml,
+    write_model_to_file,
+    write_model_to_string,
+)
+from sbml2cellml.hierarchy import convert_sbml2cellml_hierarchical
+from sbml2cellml.writer import can_stream_model, stream_model
+
+
+@pytest.mark.parametrize("sbml_path", SBML_PATHS, ids=lambda p: p.stem)
+@pytest.mark.parametrize("hierarchical", [False, True])
+def test_stream_model_matches_printer(sbml_path: Path, hierarchical: bool) -> None:
+    convert = convert_sbml2cellml_hierarchical if hierarchical else convert_sbml2cellml
+    model = convert(sbml_path, verbose=False)
+    assert can_stream_model(model)
+    f = io.StringIO()
+    stream_model(model, f)
+    assert f.getvalue() == write_model_to_string(model)
+
+
+def test_printer_fallback(tmp_path: Path) -> None:
+    model = libcellml.Model("m")
+    component = libcellml.Component("c")
+    model.addComponent(component)
+    component.setMath(
+        '<math xmlns="http://www.w3.org/1998/Math/MathML"><!-- comment --></math>'
+    )
+    assert not can_stream_model(model)
+    write_model_to_file(model, tmp_path / "m.cellml")
+    assert (tmp_path / "m.cellml").read_text(encoding="utf-8") == write_model_to_string(model)
+
+
+def test_write_gzip(tmp_path: Path) -> None:
+    model = convert_sbml2cellml(SBML_PATHS[0], verbose=False)
+    write_model_to_file(model, tmp_path / "m.cellml.gz")
+    with gzip.open(tmp_path / "m.cellml.gz", "rt", encoding="utf-8") as f:
+        assert f.read() == write_model_to_string(model)